@@ -0,0 +1,115 @@
+"""Measures the number of commands per second sent with AsyncCircusClient.
+
+A circusd running a watcher of N processes is started, then *list*
+commands are sent for a few seconds, first one at a time, as the calls
+had to be made before the replies were matched to their call, then with
+C calls in flight at once.
+
+Usage::
+
+    $ python benchmarks/bench_client.py -n 4 -c 16 -d 3
+"""
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from tornado import gen
+from zmq.eventloop import ioloop
+
+from circus.client import AsyncCircusClient, make_message
+from circus.exc import CallError
+from circus.util import tornado_sleep
+
+
+CONFIG = """\
+[circus]
+endpoint = %(endpoint)s
+pubsub_endpoint = %(pubsub_endpoint)s
+
+[watcher:bench]
+cmd = sleep 60
+numprocesses = %(numprocesses)d
+"""
+
+
+def _endpoint():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return 'tcp://127.0.0.1:%d' % port
+
+
+@gen.coroutine
+def bench(client, concurrency, duration):
+    calls = [0]
+    end = time.time() + duration
+
+    @gen.coroutine
+    def caller():
+        while time.time() < end:
+            yield client.call(make_message('list', name='bench'))
+            calls[0] += 1
+
+    start = time.time()
+    yield [caller() for index in range(concurrency)]
+    raise gen.Return(calls[0] / (time.time() - start))
+
+
+@gen.coroutine
+def run(client, args):
+    # waits for circusd to be up
+    while True:
+        try:
+            yield client.call(make_message('list'), timeout=1)
+            break
+        except CallError:
+            yield tornado_sleep(.1)
+
+    print('%-12s %12s' % ('in flight', 'commands/s'))
+    for concurrency in (1, args.concurrency):
+        rate = yield bench(client, concurrency, args.duration)
+        print('%-12d %12.1f' % (concurrency, rate))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--numprocesses', type=int, default=4,
+                        help='number of processes of the watcher')
+    parser.add_argument('-c', '--concurrency', type=int, default=16,
+                        help='number of calls in flight')
+    parser.add_argument('-d', '--duration', type=float, default=3.,
+                        help='duration in seconds of each measure')
+    args = parser.parse_args(args)
+
+    tmpdir = tempfile.mkdtemp()
+    config = os.path.join(tmpdir, 'circus.ini')
+    endpoint = _endpoint()
+    with open(config, 'w') as f:
+        f.write(CONFIG % {'endpoint': endpoint,
+                          'pubsub_endpoint': _endpoint(),
+                          'numprocesses': args.numprocesses})
+    circusd = subprocess.Popen([sys.executable, '-c',
+                                'from circus.circusd import main; main()',
+                                config])
+    try:
+        ioloop.install()
+        loop = ioloop.IOLoop.instance()
+        client = AsyncCircusClient(endpoint=endpoint)
+        try:
+            loop.run_sync(lambda: run(client, args))
+        finally:
+            client.stop()
+    finally:
+        circusd.terminate()
+        circusd.wait()
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Measures the time spent formatting the arguments of the processes.
+
+The arguments of N processes of a watcher are formatted, first formatting
+all the options for each process as before the arguments templates, then
+reusing the template of the watcher, which only substitutes the wid and
+the fds of the sockets.
+
+Usage::
+
+    $ python benchmarks/bench_format_args.py -n 10000
+"""
+import argparse
+import sys
+import time
+
+from circus.process import Process
+from circus.watcher import Watcher
+
+
+CMD = 'python -m app.worker --env $(circus.env.app_env)'
+ARGS = ('--fd $(circus.sockets.web) --worker $(circus.wid) '
+        '--name "$(circus.name) worker" --timeout $(circus.graceful_timeout)')
+
+
+def format_args(watcher, numprocesses, cached):
+    sockets_fds = {'web': 5}
+    start = time.time()
+    for wid in range(1, numprocesses + 1):
+        if not cached:
+            watcher._args_template = None
+        process = Process(watcher.name, wid, watcher.cmd, watcher.args,
+                          env=watcher.env, watcher=watcher, spawn=False)
+        process.format_args(sockets_fds=sockets_fds)
+    return time.time() - start
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--numprocesses', type=int, default=10000,
+                        help='number of processes to format the arguments '
+                             'of')
+    args = parser.parse_args(args)
+
+    env = dict(('VAR_%d' % i, 'value %d' % i) for i in range(50))
+    env['APP_ENV'] = 'production'
+    watcher = Watcher('bench', CMD, args=ARGS, env=env)
+
+    print('%-10s %10s %12s' % ('mode', 'total s', 'per call us'))
+    for mode, cached in (('uncached', False), ('template', True)):
+        duration = format_args(watcher, args.numprocesses, cached)
+        print('%-10s %10.3f %12.1f' % (
+            mode, duration, duration / args.numprocesses * 1e6))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
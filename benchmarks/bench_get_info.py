@@ -0,0 +1,88 @@
+"""Measures the cost of util.get_info on many processes.
+
+N sleeping children are spawned and get_info is called on each of their
+pids, first with an empty handle cache (cold) and then again with the
+handles cached by the first pass (warm). The time per pass and per
+process is reported, along with the number of /proc files opened.
+
+Usage::
+
+    $ python benchmarks/bench_get_info.py -n 100,500 --passes 5
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+from six.moves import builtins
+
+from circus import util
+
+
+SLEEPER = 'import time; time.sleep(3600)'
+
+
+class CountingOpen(object):
+    """Wraps open(), counting the files opened under /proc."""
+
+    def __init__(self, real_open):
+        self.real_open = real_open
+        self.calls = 0
+
+    def __call__(self, name, *args, **kw):
+        if str(name).startswith('/proc'):
+            self.calls += 1
+        return self.real_open(name, *args, **kw)
+
+
+def run_pass(pids):
+    start = time.time()
+    for pid in pids:
+        util.get_info(pid)
+    return time.time() - start
+
+
+def bench(pids, passes):
+    util._PROCS.clear()
+    counting = CountingOpen(builtins.open)
+    builtins.open = counting
+    try:
+        cold = run_pass(pids)
+        cold_opens = counting.calls
+        counting.calls = 0
+        warm = min(run_pass(pids) for _ in range(passes))
+        warm_opens = counting.calls / float(passes)
+    finally:
+        builtins.open = counting.real_open
+    return cold, cold_opens, warm, warm_opens
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--numprocesses', default='100,500',
+                        help='comma-separated numbers of processes')
+    parser.add_argument('--passes', type=int, default=5,
+                        help='number of warm passes, the best one is kept')
+    args = parser.parse_args(args)
+
+    print('%8s %10s %12s %12s %10s %12s %12s' % (
+        'procs', 'cold ms', 'cold us/pid', 'opens/pid', 'warm ms',
+        'warm us/pid', 'opens/pid'))
+    for count in [int(num) for num in args.numprocesses.split(',')]:
+        children = [subprocess.Popen([sys.executable, '-c', SLEEPER])
+                    for _ in range(count)]
+        try:
+            pids = [child.pid for child in children]
+            cold, cold_opens, warm, warm_opens = bench(pids, args.passes)
+        finally:
+            for child in children:
+                child.kill()
+            for child in children:
+                child.wait()
+        print('%8d %10.1f %12.1f %12.1f %10.1f %12.1f %12.1f' % (
+            count, cold * 1000, cold * 1e6 / count, cold_opens / count,
+            warm * 1000, warm * 1e6 / count, warm_opens / count))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
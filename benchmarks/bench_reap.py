@@ -0,0 +1,101 @@
+"""Measures the loop latency while a watcher reaps stubborn children.
+
+N children are spawned, each one exiting after a random delay, and
+Watcher.reap_processes() is called right away. A periodic probe records
+how late the loop runs its callbacks while the children are being reaped.
+
+Usage::
+
+    $ python benchmarks/bench_reap.py -n 1000 --max-delay 2
+"""
+import argparse
+import random
+import sys
+import time
+
+from tornado import gen
+from zmq.eventloop import ioloop
+
+from circus.process import Process
+from circus.watcher import Watcher
+
+
+class LagProbe(object):
+    """Schedules a callback every *interval* seconds and records how late
+    the loop was to run it."""
+
+    def __init__(self, loop, interval=0.005):
+        self.loop = loop
+        self.interval = interval
+        self.lags = []
+        self._timeout = None
+
+    def start(self):
+        self._schedule()
+
+    def stop(self):
+        if self._timeout is not None:
+            self.loop.remove_timeout(self._timeout)
+            self._timeout = None
+
+    def _schedule(self):
+        deadline = time.time() + self.interval
+        self._timeout = self.loop.add_timeout(deadline, self._run, deadline)
+
+    def _run(self, deadline):
+        self.lags.append(time.time() - deadline)
+        self._schedule()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100.))]
+
+
+@gen.coroutine
+def bench(loop, numprocesses, max_delay):
+    watcher = Watcher('bench', 'sleep', numprocesses=numprocesses, loop=loop)
+    watcher._status = 'active'
+
+    for wid in range(1, numprocesses + 1):
+        delay = '%.3f' % random.uniform(0, max_delay)
+        process = Process('bench', wid, 'sleep', args=[delay],
+                          pipe_stdout=False, pipe_stderr=False)
+        # as after a kill, so that the reap waits for the exit
+        process.stopping = True
+        watcher.processes[process.pid] = process
+
+    probe = LagProbe(loop)
+    probe.start()
+    start = time.time()
+    yield watcher.reap_processes()
+    duration = time.time() - start
+    probe.stop()
+
+    print('children:       %d' % numprocesses)
+    print('left over:      %d' % len(watcher.processes))
+    print('reap time:      %.3fs' % duration)
+    print('probe samples:  %d' % len(probe.lags))
+    print('loop lag p50:   %.2fms' % (percentile(probe.lags, 50) * 1000))
+    print('loop lag p99:   %.2fms' % (percentile(probe.lags, 99) * 1000))
+    print('loop lag max:   %.2fms' % (max(probe.lags or [0]) * 1000))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--numprocesses', type=int, default=1000,
+                        help='number of children to reap')
+    parser.add_argument('--max-delay', type=float, default=2.,
+                        help='children exit after a random delay up to '
+                             'this many seconds')
+    args = parser.parse_args(args)
+
+    ioloop.install()
+    loop = ioloop.IOLoop.instance()
+    loop.run_sync(lambda: bench(loop, args.numprocesses, args.max_delay))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Measures the stream redirection throughput and the circusd CPU usage.
+
+N children write to their stdout at a given aggregate rate for a few
+seconds. Their output is redirected to a FileStream, with the default
+redirector settings and with a larger read size and buffered writes.
+The CPU time used by this process is reported for each output rate.
+
+Usage::
+
+    $ python benchmarks/bench_redirector.py -n 10 --rates 1,10,50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from tornado import gen
+from zmq.eventloop import ioloop
+
+from circus.process import Process
+from circus.stream import FileStream, Redirector
+from circus.util import tornado_sleep
+
+
+# writes argv[1] bytes per second for argv[2] seconds, in 80 bytes lines
+WRITER = """
+import os, sys, time
+rate, duration = float(sys.argv[1]), float(sys.argv[2])
+line = b'x' * 79 + b'\\n'
+chunk = line * max(1, int(rate / 100 / len(line)))
+start = time.time()
+sent = 0
+while time.time() - start < duration:
+    while sent < rate * (time.time() - start):
+        os.write(1, chunk)
+        sent += len(chunk)
+    time.sleep(0.01)
+"""
+
+MODES = (
+    ('default', {}),
+    ('buffered', {'buffer': 65536, 'flush_interval': 0.05}),
+)
+
+
+def cpu_time():
+    times = os.times()
+    return times[0] + times[1]
+
+
+@gen.coroutine
+def bench(loop, numprocesses, rate, duration, time_format, options):
+    fd, filename = tempfile.mkstemp()
+    os.close(fd)
+    stream = FileStream(filename, time_format=time_format)
+    redirector = Redirector(stream, None, loop=loop, **options)
+    redirector.start()
+
+    start, start_cpu = time.time(), cpu_time()
+    processes = []
+    for wid in range(1, numprocesses + 1):
+        process = Process('bench', wid, sys.executable,
+                          args=['-c', WRITER, str(rate / numprocesses),
+                                str(duration)],
+                          pipe_stderr=False)
+        redirector.add_redirections(process)
+        processes.append(process)
+
+    # the children are over once all the pipes are closed
+    while redirector.pipes:
+        yield tornado_sleep(0.05)
+    redirector.stop()
+    elapsed, cpu = time.time() - start, cpu_time() - start_cpu
+
+    for process in processes:
+        process.wait()
+    stream.close()
+    size = os.path.getsize(filename)
+    os.unlink(filename)
+    raise gen.Return((size, elapsed, cpu))
+
+
+@gen.coroutine
+def run(loop, args):
+    print('%-10s %10s %12s %10s %8s' % ('mode', 'rate MB/s', 'written MB',
+                                        'MB/s', 'cpu %'))
+    for rate in args.rates:
+        for mode, options in MODES:
+            size, elapsed, cpu = yield bench(
+                loop, args.numprocesses, rate * 1024 * 1024, args.duration,
+                args.time_format, options)
+            print('%-10s %10.1f %12.1f %10.1f %8.1f' % (
+                mode, rate, size / 1024. / 1024.,
+                size / 1024. / 1024. / elapsed, cpu / elapsed * 100))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--numprocesses', type=int, default=10,
+                        help='number of children writing')
+    parser.add_argument('--rates', default='1,10,50',
+                        help='comma-separated aggregate output rates in MB/s')
+    parser.add_argument('--duration', type=float, default=3.,
+                        help='how long the children write, in seconds')
+    parser.add_argument('--time-format', default=None,
+                        help='time_format of the FileStream')
+    args = parser.parse_args(args)
+    args.rates = [float(rate) for rate in args.rates.split(',')]
+
+    ioloop.install()
+    loop = ioloop.IOLoop.instance()
+    loop.run_sync(lambda: run(loop, args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Measures the cost of reading the stats of N processes.
+
+N sleeping processes are started, then their info is read with
+circus.util.get_info, as the stats command does without sampling, then
+sampled once by circus.sampler and read from the samples.
+
+Usage::
+
+    $ python benchmarks/bench_sampler.py -n 500
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+from circus.sampler import Sampler
+from circus.util import get_info
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--numprocesses', type=int, default=500,
+                        help='number of processes to read the stats of')
+    parser.add_argument('-r', '--reads', type=int, default=10,
+                        help='number of reads of the stats of each process')
+    args = parser.parse_args(args)
+
+    processes = [subprocess.Popen(['sleep', '60'])
+                 for i in range(args.numprocesses)]
+    pids = [process.pid for process in processes]
+    try:
+        start = time.time()
+        for i in range(args.reads):
+            for pid in pids:
+                get_info(pid)
+        get_info_duration = time.time() - start
+
+        sampler = Sampler()
+        sampler._get_pids = lambda: pids
+        sampler.sample()
+        start = time.time()
+        sampler.sample()
+        sample_duration = time.time() - start
+        start = time.time()
+        for i in range(args.reads):
+            for pid in pids:
+                sampler.get_info(pid)
+        read_duration = time.time() - start
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
+
+    reads = args.numprocesses * args.reads
+    print('%-20s %10s %12s' % ('', 'total s', 'per pid us'))
+    print('%-20s %10.3f %12.1f' % ('get_info', get_info_duration,
+                                   get_info_duration / reads * 1e6))
+    print('%-20s %10.3f %12.1f' % ('sample', sample_duration,
+                                   sample_duration / args.numprocesses * 1e6))
+    print('%-20s %10.3f %12.1f' % ('read the samples', read_duration,
+                                   read_duration / reads * 1e6))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Measures the spawn latency of Process against the size of circusd.
+
+This process grows to several resident sizes, and at each size spawns N
+processes with the preexec function of Process.spawn, then with the
+Popen options replacing it. Forking copies the page tables of the parent,
+which vfork avoids, so the gap widens as the parent grows.
+
+Usage::
+
+    $ python benchmarks/bench_spawn.py -n 200 --sizes 0,512,2048
+"""
+import argparse
+import sys
+import time
+
+import psutil
+
+from circus import process as process_module
+from circus.process import Process
+
+
+def spawn_latency(numprocesses, without_preexec):
+    process_module.SPAWN_WITHOUT_PREEXEC = without_preexec
+    durations = []
+    for wid in range(1, numprocesses + 1):
+        start = time.time()
+        process = Process('bench', wid, 'true', pipe_stdout=False,
+                          pipe_stderr=False)
+        durations.append(time.time() - start)
+        process.wait()
+    return durations
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100.))]
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--numprocesses', type=int, default=200,
+                        help='number of processes spawned per measure')
+    parser.add_argument('--sizes', default='0,512,2048',
+                        help='comma-separated memory grown before each '
+                             'measure, in MB')
+    args = parser.parse_args(args)
+
+    if not process_module.SPAWN_WITHOUT_PREEXEC:
+        print('Popen cannot replace the preexec function on this python')
+        return 1
+
+    ballast = []
+    print('%8s %-10s %10s %10s' % ('rss MB', 'mode', 'p50 ms', 'p99 ms'))
+    for size in [int(size) for size in args.sizes.split(',')]:
+        # touch every page so they are resident
+        ballast.append(bytearray(b'x' * (size * 1024 * 1024)))
+        rss = psutil.Process().memory_info().rss / 1024. / 1024.
+        for mode, without_preexec in (('preexec', False), ('popen', True)):
+            durations = spawn_latency(args.numprocesses, without_preexec)
+            print('%8d %-10s %10.2f %10.2f' % (
+                rss, mode, percentile(durations, 50) * 1000,
+                percentile(durations, 99) * 1000))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
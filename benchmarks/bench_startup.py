@@ -0,0 +1,76 @@
+"""Measures the time it takes to start N watchers of M processes each.
+
+The watchers all have the same priority and are started as circusd does
+at startup, once with the processes and watchers started one at a time
+and once with the given spawn_concurrency. The time until all the
+processes are running is reported for each mode.
+
+Usage::
+
+    $ python benchmarks/bench_startup.py -n 40 -m 16 --warmup-delay 0.05
+"""
+import argparse
+import sys
+import time
+
+from tornado import gen
+from zmq.eventloop import ioloop
+
+from circus.arbiter import Arbiter
+from circus.watcher import Watcher
+
+
+@gen.coroutine
+def bench(loop, numwatchers, numprocesses, warmup_delay, concurrency):
+    watchers = [Watcher('bench%d' % index, 'sleep', args=['60'],
+                        numprocesses=numprocesses, warmup_delay=warmup_delay,
+                        spawn_concurrency=concurrency, graceful_timeout=1,
+                        loop=loop)
+                for index in range(numwatchers)]
+    arbiter = Arbiter(watchers, 'tcp://127.0.0.1:0', 'tcp://127.0.0.1:0',
+                      loop=loop, warmup_delay=warmup_delay,
+                      spawn_concurrency=concurrency)
+    for watcher in watchers:
+        watcher.initialize(None, None, arbiter)
+
+    start = time.time()
+    yield arbiter._start_watchers()
+    duration = time.time() - start
+    running = sum(len(watcher.processes) for watcher in watchers)
+
+    yield [watcher._stop() for watcher in watchers]
+    raise gen.Return((running, duration))
+
+
+@gen.coroutine
+def run(loop, args):
+    total = args.numwatchers * args.numprocesses
+    print('%-12s %12s %10s %10s' % ('concurrency', 'processes', 'running',
+                                     'seconds'))
+    for concurrency in (1, args.concurrency):
+        running, duration = yield bench(loop, args.numwatchers,
+                                        args.numprocesses, args.warmup_delay,
+                                        concurrency)
+        print('%-12d %12d %10d %10.3f' % (concurrency, total, running,
+                                          duration))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--numwatchers', type=int, default=40,
+                        help='number of watchers')
+    parser.add_argument('-m', '--numprocesses', type=int, default=16,
+                        help='number of processes per watcher')
+    parser.add_argument('--warmup-delay', type=float, default=0.,
+                        help='warmup_delay of the arbiter and the watchers')
+    parser.add_argument('-c', '--concurrency', type=int, default=16,
+                        help='spawn_concurrency of the concurrent mode')
+    args = parser.parse_args(args)
+
+    ioloop.install()
+    loop = ioloop.IOLoop.instance()
+    loop.run_sync(lambda: run(loop, args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
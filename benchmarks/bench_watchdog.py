@@ -0,0 +1,105 @@
+"""Measures the number of heartbeats per second the WatchDog plugin reads.
+
+A WatchDog monitoring N pids is run for a few seconds while another
+process sends it R heartbeats per second, spread over the N pids. The
+heartbeats read and the pids the plugin would have killed are counted: no
+pid should be killed if the plugin keeps up.
+
+Usage::
+
+    $ python benchmarks/bench_watchdog.py -n 5000 -r 50000 -d 5
+"""
+import argparse
+import multiprocessing
+import socket
+import sys
+import time
+
+from circus.plugins.watchdog import WatchDog
+
+
+class CountingWatchDog(WatchDog):
+
+    def __init__(self, *args, **config):
+        super(CountingWatchDog, self).__init__(*args, **config)
+        self.received = 0
+        self.killed = 0
+        self.look_after_durations = []
+
+    def _decode_received_udp_message(self, data):
+        self.received += 1
+        return super(CountingWatchDog, self)._decode_received_udp_message(
+            data)
+
+    def cast(self, command, **props):
+        self.killed += 1
+
+    def look_after(self):
+        start = time.time()
+        super(CountingWatchDog, self).look_after()
+        self.look_after_durations.append(time.time() - start)
+
+
+def send_heartbeats(address, numpids, rate, duration, sent):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    messages = [('%d;0' % pid).encode('utf8')
+                for pid in range(1, numpids + 1)]
+    # sends the heartbeats by bursts of 10ms
+    per_burst = max(1, rate // 100)
+    count = 0
+    start = time.time()
+    while time.time() - start < duration:
+        for i in range(per_burst):
+            sock.sendto(messages[count % numpids], address)
+            count += 1
+        delay = start + count / float(rate) - time.time()
+        if delay > 0:
+            time.sleep(delay)
+    sock.close()
+    sent.value = count
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--numpids', type=int, default=5000,
+                        help='number of monitored pids')
+    parser.add_argument('-r', '--rate', type=int, default=50000,
+                        help='heartbeats sent per second')
+    parser.add_argument('-d', '--duration', type=float, default=5.,
+                        help='duration in seconds of the measure')
+    args = parser.parse_args(args)
+
+    plugin = CountingWatchDog('tcp://127.0.0.1:0', 'tcp://127.0.0.1:0', 1,
+                              None, ip='127.0.0.1', port=0, loop_rate=0.5,
+                              max_count=2)
+    plugin.starting = False
+    for pid in range(1, args.numpids + 1):
+        plugin._add_pid(str(pid), 'bench')
+    plugin.handle_init()
+
+    sent = multiprocessing.Value('l', 0)
+    sender = multiprocessing.Process(
+        target=send_heartbeats,
+        args=(plugin.sock.getsockname(), args.numpids, args.rate,
+              args.duration, sent))
+    start = time.time()
+    sender.start()
+    plugin.loop.add_timeout(start + args.duration + .5, plugin.loop.stop)
+    try:
+        plugin.loop.start()
+    finally:
+        sender.join()
+        plugin.handle_stop()
+    elapsed = time.time() - start
+
+    durations = plugin.look_after_durations
+    print('%-24s %12d' % ('heartbeats sent', sent.value))
+    print('%-24s %12d' % ('heartbeats read', plugin.received))
+    print('%-24s %12.1f' % ('heartbeats read/s', plugin.received / elapsed))
+    print('%-24s %12d' % ('pids killed', plugin.killed))
+    if durations:
+        print('%-24s %12.1f' % ('look_after max us', max(durations) * 1e6))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
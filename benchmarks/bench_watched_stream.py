@@ -0,0 +1,87 @@
+"""Compares the cost of the rotation checks of WatchedFileStream.
+
+The same amount of data is written in small chunks with a check before
+each write, with a time-throttled check and with inotify. The system
+calls made by the checks (stat and inotify reads) are counted and
+reported per MB written.
+
+Usage::
+
+    $ python benchmarks/bench_watched_stream.py --size 20 --chunk 100
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from circus.stream import file_stream
+from circus.stream.file_stream import WatchedFileStream
+
+
+MODES = (
+    ('every write', {}),
+    ('every 100ms', {'check_interval': 0.1}),
+    ('inotify', {'use_inotify': True}),
+)
+
+
+class CountingOS(object):
+    """Proxies the os module, counting the calls to some functions."""
+
+    counted = ('stat', 'read')
+
+    def __init__(self):
+        self.calls = 0
+
+    def __getattr__(self, name):
+        func = getattr(os, name)
+        if name not in self.counted:
+            return func
+
+        def counting(*args, **kw):
+            self.calls += 1
+            return func(*args, **kw)
+        return counting
+
+
+def bench(size, chunk, options):
+    fd, filename = tempfile.mkstemp()
+    os.close(fd)
+    stream = WatchedFileStream(filename, **options)
+    data = {'data': b'x' * (chunk - 1) + b'\n', 'pid': 1}
+    counting_os = CountingOS()
+    file_stream.os = counting_os
+    try:
+        start = time.time()
+        for _ in range(size // chunk):
+            stream(data)
+        elapsed = time.time() - start
+    finally:
+        file_stream.os = os
+    stream.close()
+    os.unlink(filename)
+    return counting_os.calls, elapsed
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size', type=float, default=20,
+                        help='MB to write')
+    parser.add_argument('--chunk', type=int, default=100,
+                        help='size of each write in bytes')
+    args = parser.parse_args(args)
+    size = int(args.size * 1024 * 1024)
+
+    if file_stream._libc is None:
+        print('inotify is not available, it falls back to a stat per write')
+
+    print('%-12s %16s %10s' % ('mode', 'syscalls / MB', 'MB/s'))
+    for mode, options in MODES:
+        calls, elapsed = bench(size, args.chunk, options)
+        print('%-12s %16.1f %10.1f' % (mode, calls / args.size,
+                                       args.size / elapsed))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
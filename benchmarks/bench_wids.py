@@ -0,0 +1,52 @@
+"""Measures the allocation of the wids when a watcher scales.
+
+The watcher is scaled up one process at a time from 1 to N processes, then
+back down to 1, taking the wid of each new process from Watcher._nextwid.
+No process is actually spawned.
+
+Usage::
+
+    $ python benchmarks/bench_wids.py -n 5000
+"""
+import argparse
+import sys
+import time
+
+from circus.watcher import Watcher
+
+
+class FakeProcess(object):
+
+    def __init__(self, pid, wid):
+        self.pid = pid
+        self.wid = wid
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--numprocesses', type=int, default=5000,
+                        help='number of processes to scale to')
+    args = parser.parse_args(args)
+
+    watcher = Watcher('bench', 'true', numprocesses=0)
+
+    start = time.time()
+    for pid in range(1, args.numprocesses + 1):
+        watcher.numprocesses = pid
+        watcher._add_process(FakeProcess(pid, watcher._nextwid))
+    scale_up = time.time() - start
+
+    start = time.time()
+    for pid in range(args.numprocesses, 1, -1):
+        watcher.numprocesses = pid - 1
+        watcher._remove_process(pid)
+    scale_down = time.time() - start
+
+    print('%-12s %10s %12s' % ('scale', 'total s', 'per wid us'))
+    for name, duration in (('up', scale_up), ('down', scale_down)):
+        print('%-12s %10.3f %12.1f' % (
+            name, duration, duration / args.numprocesses * 1e6))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,6 +2,7 @@ import errno
 import logging
 import os
 import gc
+from itertools import groupby
 from circus.fixed_threading import Thread, get_ident
 import sys
 import select
@@ -19,7 +20,10 @@ from circus.util import debuglog, _setproctitle, parse_env_dict
 from circus.util import DictDiffer, synchronized, tornado_sleep, papa
 from circus.util import IS_WINDOWS
 from circus.config import get_config
-from circus.plugins import get_plugin_cmd
+from circus.plugins import get_plugin_cmd, get_host_config
+from circus.profiler import profiler
+from circus.pubsub import Publisher
+from circus.sampler import sampler
 from circus.sockets import CircusSocket, CircusSockets
 
 
@@ -56,6 +60,9 @@ class Arbiter(object):
 
         - **use** -- Fully qualified name that points to the plugin class
         - every other value is passed to the plugin in the **config** option
+    - **plugins_host** -- if True, all the plugins are run in a single
+      *plugin:host* watcher, sharing one process, one subscription to the
+      events and one connection to circusd. (default: False)
     - **sockets** -- a mapping of sockets. Each key is the socket name,
       and each value a :class:`CircusSocket` class. (default: None)
     - **warmup_delay** -- a delay in seconds between two watchers startup.
@@ -75,6 +82,36 @@ class Arbiter(object):
                          instance on the cluster.
     - **endpoint_owner** -- unix user to chown the endpoint to if using ipc.
     - **papa_endpoint** -- the papa process kernel endpoint
+    - **reap_on_sigchld** -- if True, exited processes are reaped and
+      respawned as soon as SIGCHLD is received instead of waiting for the
+      next controller point. (default: False)
+    - **profile** -- if True, latency histograms of the event loop, the
+      commands, the stream redirections, the processes management and the
+      hooks are collected. See the *profile* command. (default: False)
+    - **profile_interval** -- delay in seconds between two publications of
+      the histograms on the *arbiter.profile* topic. 0 disables the
+      publication. (default: 5)
+    - **stats_pool_size** -- number of threads circusd-stats collects the
+      processes stats in. 0 collects them in its main thread. (default: 4)
+    - **stats_history_size** -- memory in MB circusd-stats uses to keep
+      the history of the stats. 0 keeps none. (default: 0)
+    - **stats_history_endpoint** -- the endpoint the history of the stats
+      is queried on. (default: tcp://127.0.0.1:5558)
+    - **spawn_concurrency** -- number of watchers of the same priority
+      started together before waiting for *warmup_delay*. (default: 1)
+    - **pubsub_encoding** -- encoding of the events and stats published,
+      *json* or *msgpack*. (default: json)
+    - **pubsub_batch_delay** -- if not 0, the events and stats published
+      are sent by batches, gathered during this delay in seconds. The
+      subscribers must then read all the bodies of a message, see
+      :mod:`circus.pubsub`. (default: 0)
+    - **sample_interval** -- if not 0, the resources used by the processes
+      are sampled every *sample_interval* seconds, and the *stats* and
+      *dstats* commands answer from the last samples. (default: 0)
+    - **sample_history** -- number of samples kept for each process.
+      (default: 60)
+    - **sample_children** -- if True, the children of the processes are
+      sampled too. (default: False)
     """
 
     def __init__(self, watchers, endpoint, pubsub_endpoint, check_delay=1.0,
@@ -87,9 +124,19 @@ class Arbiter(object):
                  ssh_server=None, proc_name='circusd', pidfile=None,
                  loglevel=None, logoutput=None, loggerconfig=None,
                  fqdn_prefix=None, umask=None, endpoint_owner=None,
-                 papa_endpoint=None):
+                 papa_endpoint=None, reap_on_sigchld=False, profile=False,
+                 profile_interval=5., stats_pool_size=4,
+                 spawn_concurrency=1, pubsub_encoding='json',
+                 pubsub_batch_delay=0., sample_interval=0.,
+                 sample_history=60, sample_children=False,
+                 stats_history_size=0, stats_history_endpoint=None,
+                 plugins_host=False):
 
         self.watchers = watchers
+        # watchers sorted by priority, see iter_watchers()
+        self._sorted_watchers = {}
+        # pid -> (watcher, process) for all the managed processes
+        self._pids = {}
         self.endpoint = endpoint
         self.check_delay = check_delay
         self.prereload_fn = prereload_fn
@@ -98,12 +145,21 @@ class Arbiter(object):
         self.proc_name = proc_name
         self.ssh_server = ssh_server
         self.evpub_socket = None
+        self.pubsub_encoding = pubsub_encoding
+        self.pubsub_batch_delay = pubsub_batch_delay
         self.pidfile = pidfile
         self.loglevel = loglevel
         self.logoutput = logoutput
         self.loggerconfig = loggerconfig
         self.umask = umask
         self.endpoint_owner = endpoint_owner
+        self.reap_on_sigchld = reap_on_sigchld
+        self.profile = profile
+        self.profile_interval = profile_interval
+        self.sample_interval = sample_interval
+        self.sample_history = sample_history
+        self.sample_children = sample_children
+        self.plugins_host = plugins_host
         self._running = False
         try:
             # getfqdn appears to fail in Python3.3 in the unittest
@@ -160,6 +216,14 @@ class Arbiter(object):
             cmd += ' --endpoint %s' % self.endpoint
             cmd += ' --pubsub %s' % self.pubsub_endpoint
             cmd += ' --statspoint %s' % self.stats_endpoint
+            cmd += ' --pool-size %d' % stats_pool_size
+            cmd += ' --encoding %s' % pubsub_encoding
+            if pubsub_batch_delay:
+                cmd += ' --batch-delay %s' % pubsub_batch_delay
+            if stats_history_size:
+                cmd += ' --history-size %d' % stats_history_size
+                if stats_history_endpoint is not None:
+                    cmd += ' --historypoint %s' % stats_history_endpoint
             if ssh_server is not None:
                 cmd += ' --ssh %s' % ssh_server
             if debug:
@@ -209,6 +273,7 @@ class Arbiter(object):
         ch_stdout = self.stdout_stream is None
 
         if plugins is not None:
+            plugins = self._get_plugins({'plugins': plugins})
             for plugin in plugins:
                 fqn = plugin['use']
                 cmd, args = get_plugin_cmd(plugin, self.endpoint,
@@ -231,6 +296,7 @@ class Arbiter(object):
 
         self.sockets = CircusSockets(sockets)
         self.warmup_delay = warmup_delay
+        self.spawn_concurrency = max(1, int(spawn_concurrency))
 
     @property
     def running(self):
@@ -243,7 +309,7 @@ class Arbiter(object):
             self.loop = ioloop.IOLoop.instance()
         self.ctrl = Controller(self.endpoint, self.multicast_endpoint,
                                self.context, self.loop, self, self.check_delay,
-                               self.endpoint_owner)
+                               self.endpoint_owner, self.reap_on_sigchld)
 
     def get_socket(self, name):
         return self.sockets.get(name, None)
@@ -260,8 +326,14 @@ class Arbiter(object):
                 return i.copy()
         return None
 
+    def _get_plugins(self, config):
+        plugins = config.get('plugins', [])
+        if self.plugins_host and plugins:
+            return [get_host_config(plugins)]
+        return plugins
+
     def get_plugin_config(self, config, name):
-        for i in config.get('plugins', []):
+        for i in self._get_plugins(config):
             if i['name'] == name:
                 cfg = i.copy()
                 cmd, args = get_plugin_cmd(cfg, self.endpoint,
@@ -353,7 +425,7 @@ class Arbiter(object):
         # Gather watcher names.
         current_wn = set([i.name for i in self.iter_watchers()]) - ignore_wn
         new_wn = set([i['name'] for i in new_cfg.get('watchers', [])])
-        new_wn = new_wn | set([i['name'] for i in new_cfg.get('plugins', [])])
+        new_wn = new_wn | set([i['name'] for i in self._get_plugins(new_cfg)])
         added_wn = (new_wn - current_wn) | wn_with_changed_socket
         deleted_wn = current_wn - new_wn - wn_with_changed_socket
         maybechanged_wn = current_wn - deleted_wn
@@ -403,6 +475,7 @@ class Arbiter(object):
             yield w._stop()
             del self._watchers_names[w.name.lower()]
             self.watchers.remove(w)
+            self._forget_watcher(w)
 
         # add watchers
         for n in added_wn:
@@ -414,6 +487,7 @@ class Arbiter(object):
             yield self.start_watcher(w)
             self.watchers.append(w)
             self._watchers_names[w.name.lower()] = w
+            self.watchers_changed()
 
     @classmethod
     def load_from_config(cls, config_file, loop=None):
@@ -458,7 +532,21 @@ class Arbiter(object):
                       loggerconfig=cfg.get('loggerconfig', None),
                       fqdn_prefix=cfg.get('fqdn_prefix', None),
                       umask=cfg['umask'],
-                      endpoint_owner=cfg.get('endpoint_owner', None))
+                      endpoint_owner=cfg.get('endpoint_owner', None),
+                      reap_on_sigchld=cfg.get('reap_on_sigchld', False),
+                      profile=cfg.get('profile', False),
+                      profile_interval=cfg.get('profile_interval', 5.),
+                      stats_pool_size=cfg.get('stats_pool_size', 4),
+                      spawn_concurrency=cfg.get('spawn_concurrency', 1),
+                      pubsub_encoding=cfg.get('pubsub_encoding', 'json'),
+                      pubsub_batch_delay=cfg.get('pubsub_batch_delay', 0.),
+                      sample_interval=cfg.get('sample_interval', 0.),
+                      sample_history=cfg.get('sample_history', 60),
+                      sample_children=cfg.get('sample_children', False),
+                      stats_history_size=cfg.get('stats_history_size', 0),
+                      stats_history_endpoint=cfg.get(
+                          'stats_history_endpoint'),
+                      plugins_host=cfg.get('plugins_host', False))
 
         # store the cfg which will be used, so it can be used later
         # for checking if the cfg has been changed
@@ -468,7 +556,40 @@ class Arbiter(object):
         return arbiter
 
     def iter_watchers(self, reverse=True):
-        return sorted(self.watchers, key=lambda a: a.priority, reverse=reverse)
+        # sorting is cached until a watcher is added, removed or
+        # has its priority changed
+        if reverse not in self._sorted_watchers:
+            self._sorted_watchers[reverse] = sorted(
+                self.watchers, key=lambda a: a.priority, reverse=reverse)
+        return list(self._sorted_watchers[reverse])
+
+    def watchers_changed(self):
+        """Invalidate the cached watchers order."""
+        self._sorted_watchers = {}
+
+    def register_process(self, watcher, process):
+        """Index *process* by its pid."""
+        self._pids[process.pid] = watcher, process
+
+    def unregister_process(self, process):
+        """Remove *process* from the pid index."""
+        if self._pids.get(process.pid, (None, None))[1] is process:
+            del self._pids[process.pid]
+
+    def _get_sampled_pids(self):
+        return [self.pid] + list(self._pids)
+
+    def get_process(self, pid):
+        """Return the (watcher, process) tuple managing *pid*.
+
+        (None, None) is returned if the pid is unknown.
+        """
+        return self._pids.get(pid, (None, None))
+
+    def _forget_watcher(self, watcher):
+        self.watchers_changed()
+        for process in watcher.processes.values():
+            self.unregister_process(process)
 
     @debuglog
     def initialize(self):
@@ -480,9 +601,11 @@ class Arbiter(object):
             os.umask(self.umask)
 
         # event pub socket
-        self.evpub_socket = self.context.socket(zmq.PUB)
-        self.evpub_socket.bind(self.pubsub_endpoint)
-        self.evpub_socket.linger = 0
+        evpub_socket = self.context.socket(zmq.PUB)
+        evpub_socket.bind(self.pubsub_endpoint)
+        evpub_socket.linger = 0
+        self.evpub_socket = Publisher(evpub_socket, self.pubsub_encoding,
+                                      self.pubsub_batch_delay, self.loop)
 
         # initialize sockets
         if len(self.sockets) > 0:
@@ -493,6 +616,8 @@ class Arbiter(object):
         for watcher in self.iter_watchers():
             self._watchers_names[watcher.name.lower()] = watcher
             watcher.initialize(self.evpub_socket, self.sockets, self)
+        # priorities may have changed before the watchers knew the arbiter
+        self.watchers_changed()
 
     @gen.coroutine
     def start_watcher(self, watcher):
@@ -524,6 +649,13 @@ class Arbiter(object):
 
         # start controller
         self.ctrl.start()
+        if self.profile:
+            profiler.start(self.loop, self.evpub_socket,
+                           self.profile_interval)
+        if self.sample_interval:
+            sampler.start(self.loop, self._get_sampled_pids,
+                          self.sample_interval, self.sample_history,
+                          self.sample_children)
         self._restarting = False
         try:
             # initialize processes
@@ -548,6 +680,8 @@ class Arbiter(object):
 
     def stop_controller_and_close_sockets(self):
         self.ctrl.stop()
+        profiler.stop()
+        sampler.stop()
         self.evpub_socket.close()
 
         if len(self.sockets) > 0:
@@ -598,12 +732,9 @@ class Arbiter(object):
             self.loop.add_callback(self.loop.stop)
 
     def reap_processes(self):
-        # map watcher to pids
-        watchers_pids = {}
-        for watcher in self.iter_watchers():
-            if not watcher.is_stopped():
-                for process in watcher.processes.values():
-                    watchers_pids[process.pid] = watcher
+        """Reap the dead children and return the watchers they belonged to.
+        """
+        reaped = []
 
         # detect dead children
         if not IS_WINDOWS:
@@ -614,15 +745,18 @@ class Arbiter(object):
                     if not pid:
                         break
 
-                    if pid in watchers_pids:
-                        watcher = watchers_pids[pid]
+                    watcher, _ = self.get_process(pid)
+                    if watcher is not None and not watcher.is_stopped():
                         watcher.reap_process(pid, status)
+                        if watcher not in reaped:
+                            reaped.append(watcher)
                 except OSError as e:
                     if e.errno == errno.ECHILD:
                         # process already reaped
-                        return
+                        break
                     else:
                         raise
+        return reaped
 
     @synchronized("manage_watchers")
     @gen.coroutine
@@ -649,6 +783,18 @@ class Arbiter(object):
                 self._start_watchers()
                 self.socket_event = False
 
+    @synchronized("manage_watchers")
+    @gen.coroutine
+    def manage_reaped_watchers(self):
+        """Reap the dead children and manage only the watchers they
+        belonged to, so their processes get respawned right away."""
+        if self._stopping:
+            return
+
+        watchers = self.reap_processes()
+        if watchers:
+            yield [watcher.manage_processes() for watcher in watchers]
+
     @synchronized("arbiter_reload")
     @gen.coroutine
     @debuglog
@@ -713,6 +859,7 @@ class Arbiter(object):
             watcher.initialize(self.evpub_socket, self.sockets, self)
         self.watchers.append(watcher)
         self._watchers_names[watcher.name.lower()] = watcher
+        self.watchers_changed()
         return watcher
 
     @synchronized("arbiter_rm_watcher")
@@ -729,10 +876,12 @@ class Arbiter(object):
         # remove the watcher from the list
         watcher = self._watchers_names.pop(name.lower())
         del self.watchers[self.watchers.index(watcher)]
+        self.watchers_changed()
 
         if not nostop:
             # stop the watcher
             yield watcher._stop()
+        self._forget_watcher(watcher)
 
     @synchronized("arbiter_start_watchers")
     @gen.coroutine
@@ -745,9 +894,13 @@ class Arbiter(object):
             watchers = self.iter_watchers()
         else:
             watchers = watcher_iter_func()
-        for watcher in watchers:
-            if watcher.autostart:
-                yield watcher._start()
+        # the watchers of a same priority are started by batches of
+        # spawn_concurrency, with warmup_delay between two batches
+        for priority, group in groupby(watchers, lambda w: w.priority):
+            group = [watcher for watcher in group if watcher.autostart]
+            for i in range(0, len(group), self.spawn_concurrency):
+                batch = group[i:i + self.spawn_concurrency]
+                yield [watcher._start() for watcher in batch]
                 yield tornado_sleep(self.warmup_delay)
 
     @gen.coroutine
@@ -23,6 +23,7 @@ from circus.client import CircusClient
 from circus.commands import get_commands
 from circus.consumer import CircusConsumer
 from circus.exc import CallError, ArgumentError
+from circus.pubsub import decode
 from circus.util import DEFAULT_ENDPOINT_SUB, DEFAULT_ENDPOINT_DEALER
 
 
@@ -159,7 +160,8 @@ class ControllerApp(object):
                    ssh_keyfile):
         consumer = CircusConsumer(topics, endpoint=endpoint)
         for topic, msg in consumer:
-            print("%s: %s" % (topic, msg))
+            # the msgpack messages are shown as json too
+            print("%s: %s" % (topic, json.dumps(decode(msg))))
         return 0
 
     def _console(self, client, command, opts, msg):
@@ -1,13 +1,16 @@
 
 # -*- coding: utf-8 -
 import errno
+import time
 import uuid
 
 import zmq
 import zmq.utils.jsonapi as json
 from zmq.eventloop.zmqstream import ZMQStream
 import tornado
+import tornado.concurrent
 
+from circus import logger
 from circus.exc import CallError
 from circus.py3compat import string_types, b
 from circus.util import DEFAULT_ENDPOINT_DEALER, get_connection
@@ -21,11 +24,28 @@ def cast_message(command, **props):
     return {"command": command, "msg_type": "cast", "properties": props or {}}
 
 
+def batch_message(commands, concurrent=False):
+    """Builds a message executing all the *commands* in one round-trip.
+
+    *commands* is a list of messages built with :func:`make_message`. If
+    *concurrent* is true, circusd doesn't wait for a command to be over
+    before executing the next one.
+    """
+    return {"msg_type": "batch", "commands": list(commands),
+            "concurrent": concurrent}
+
+
 def make_json(command, **props):
     return json.dumps(make_message(command, **props))
 
 
 class AsyncCircusClient(object):
+    """Sends commands to circusd from the tornado IOLoop.
+
+    Many calls can be waiting for their reply at once: the replies are
+    matched to the calls by their id. A call raises a CallError if its
+    reply didn't come in *timeout* seconds, unless *timeout* is None.
+    """
 
     def __init__(self, context=None, endpoint=DEFAULT_ENDPOINT_DEALER,
                  timeout=5.0, ssh_server=None, ssh_keyfile=None):
@@ -37,8 +57,11 @@ class AsyncCircusClient(object):
         self.socket.setsockopt(zmq.LINGER, 0)
         get_connection(self.socket, endpoint, ssh_server, ssh_keyfile)
         self._timeout = timeout
-        self.timeout = timeout * 1000
+        self.timeout = timeout * 1000 if timeout is not None else None
         self.stream = ZMQStream(self.socket, tornado.ioloop.IOLoop.instance())
+        # call id -> Future of the calls waiting for their reply
+        self._pending = {}
+        self.stream.on_recv(self._handle_replies)
 
     def _init_context(self, context):
         self.context = context or zmq.Context.instance()
@@ -50,13 +73,46 @@ class AsyncCircusClient(object):
             self.socket.disconnect(self.endpoint)
         self.stream.close()
 
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(CallError('The client was stopped.'))
+
+    def _handle_replies(self, messages):
+        for message in messages:
+            try:
+                res = json.loads(message)
+            except ValueError:
+                logger.error('Invalid reply from circusd: %r', message)
+                continue
+            future = self._pending.pop(res.get('id'), None)
+            if future is None:
+                # the call timed out
+                logger.debug('Reply to an unknown call: %r', message)
+                continue
+            future.set_result(res)
+
+    def _timed_out(self, call_id):
+        future = self._pending.pop(call_id, None)
+        if future is not None:
+            future.set_exception(CallError('Timed out.'))
+
     @tornado.gen.coroutine
     def send_message(self, command, **props):
         res = yield self.call(make_message(command, **props))
         raise tornado.gen.Return(res)
 
     @tornado.gen.coroutine
-    def call(self, cmd):
+    def send_batch(self, commands, concurrent=False):
+        res = yield self.call(batch_message(commands, concurrent))
+        raise tornado.gen.Return(res)
+
+    @tornado.gen.coroutine
+    def call(self, cmd, timeout=None):
+        """Send *cmd* and return its reply.
+
+        The call times out after *timeout* seconds, the timeout of the
+        client by default.
+        """
         if isinstance(cmd, string_types):
             raise DeprecationWarning('call() takes a mapping')
 
@@ -67,22 +123,27 @@ class AsyncCircusClient(object):
         except ValueError as e:
             raise CallError(str(e))
 
+        future = tornado.concurrent.Future()
+        self._pending[call_id] = future
         try:
-            yield tornado.gen.Task(self.stream.send, cmd)
+            self.stream.send(cmd)
         except zmq.ZMQError as e:
+            del self._pending[call_id]
             raise CallError(str(e))
 
-        while True:
-            messages = yield tornado.gen.Task(self.stream.on_recv)
-            for message in messages:
-                try:
-                    res = json.loads(message)
-                    if res.get('id') != call_id:
-                        # we got the wrong message
-                        continue
-                    raise tornado.gen.Return(res)
-                except ValueError as e:
-                    raise CallError(str(e))
+        if timeout is None:
+            timeout = self._timeout
+        loop = self.stream.io_loop
+        timer = None
+        if timeout is not None:
+            timer = loop.add_timeout(time.time() + timeout,
+                                     lambda: self._timed_out(call_id))
+        try:
+            res = yield future
+        finally:
+            if timer is not None:
+                loop.remove_timeout(timer)
+        raise tornado.gen.Return(res)
 
 
 class CircusClient(object):
@@ -115,6 +176,9 @@ class CircusClient(object):
     def send_message(self, command, **props):
         return self.call(make_message(command, **props))
 
+    def send_batch(self, commands, concurrent=False):
+        return self.call(batch_message(commands, concurrent))
+
     def call(self, cmd):
         if isinstance(cmd, string_types):
             raise DeprecationWarning('call() takes a mapping')
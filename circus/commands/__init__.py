@@ -13,6 +13,7 @@ from circus.commands import (   # NOQA
     numprocesses,
     numwatchers,
     options,
+    profile,
     quit,
     reload,
     reloadconfig,
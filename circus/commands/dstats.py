@@ -1,5 +1,8 @@
+import os
+
 from circus.exc import ArgumentError
 from circus.commands.base import Command
+from circus.sampler import sampler
 from circus.util import get_info
 
 _INFOLINE = ("%(pid)s  %(cmdline)s %(username)s %(nice)s %(mem_info1)s "
@@ -61,7 +64,10 @@ class Daemontats(Command):
         return self.make_message()
 
     def execute(self, arbiter, props):
-        return {'info': get_info(interval=0.01)}
+        info = sampler.get_info(os.getpid())
+        if info is None:
+            info = get_info(interval=0.01)
+        return {'info': info}
 
     def _to_str(self, info):
         children = info.pop("children", [])
@@ -60,6 +60,8 @@ class Options(Command):
         - numprocesses: integer, number of processes
         - warmup_delay: integer or number, delay to wait between process
           spawning in seconds
+        - spawn_concurrency: integer, number of processes spawned before
+          waiting for warmup_delay
         - working_dir: string, directory where the process will be executed
         - uid: string or integer, user ID used to launch the process
         - gid: string or integer, group ID used to launch the process
@@ -0,0 +1,93 @@
+from circus.exc import ArgumentError
+from circus.commands.base import Command
+from circus.profiler import profiler
+
+_LINE = ("%(name)s: count=%(count)d avg=%(avg).3fms p50<=%(p50).3fms "
+         "p99<=%(p99).3fms max=%(max).3fms")
+
+
+class Profile(Command):
+    """\
+       Get the circusd latency histograms
+       ==================================
+
+       When circusd runs with the **profile** option, it keeps latency
+       histograms for the event loop lag, each command, the stream
+       redirections, the processes management of each watcher and the
+       hooks. This command returns them.
+
+       ZMQ Message
+       -----------
+
+       ::
+
+            {
+                "command": "profile",
+                "properties": {
+                    "reset": false
+                }
+            }
+
+       If **reset** is true, the histograms are cleared once returned.
+
+       The response contains the histograms, keyed by name. Durations are
+       given in seconds and each bucket is a pair made of its upper bound
+       and its count::
+
+            {
+              "enabled": true,
+              "since": 1332265650.12,
+              "stats": {
+                "loop.lag": {
+                  "avg": 0.00012,
+                  "buckets": [[0.00025, 530], [0.0005, 12]],
+                  "count": 542,
+                  "max": 0.00049,
+                  "p50": 0.00025,
+                  "p99": 0.0005,
+                  "total": 0.065
+                },
+                ...
+              },
+              "status": "ok",
+              "time": 1332265655.897085
+            }
+
+       The same mapping is published every **profile_interval** seconds on
+       the *arbiter.profile* topic.
+
+       Command Line
+       ------------
+
+       ::
+
+            $ circusctl profile [--reset]
+
+    """
+
+    name = "profile"
+    options = [('', 'reset', False, "clear the histograms once returned")]
+
+    def message(self, *args, **opts):
+        if len(args) > 0:
+            raise ArgumentError("Invalid message")
+        return self.make_message(reset=opts.get('reset', False))
+
+    def execute(self, arbiter, props):
+        res = profiler.snapshot()
+        if props.get('reset', False):
+            profiler.reset()
+        return res
+
+    def console_msg(self, msg):
+        if msg['status'] != "ok":
+            return self.console_error(msg)
+        if not msg.get('enabled'):
+            return "profiling is disabled, see the 'profile' option"
+        ret = []
+        for name, stats in sorted(msg.get('stats', {}).items()):
+            values = dict((key, stats[key] * 1000)
+                          for key in ('avg', 'p50', 'p99', 'max'))
+            values.update(name=name, count=stats['count'])
+            ret.append(_LINE % values)
+        return "\n".join(ret)
@@ -17,6 +17,8 @@ def convert_option(key, val):
         return int(val)
     elif key == "warmup_delay":
         return float(val)
+    elif key == "spawn_concurrency":
+        return int(val)
     elif key == "working_dir":
         return val
     elif key == "uid":
@@ -99,7 +101,8 @@ def validate_option(key, val):
                   'max_retry', 'graceful_timeout', 'stdout_stream',
                   'stderr_stream', 'max_age', 'max_age_variance', 'respawn',
                   'singleton', 'hooks', 'close_child_stdin',
-                  'close_child_stdout', 'close_child_stderr')
+                  'close_child_stdout', 'close_child_stderr',
+                  'spawn_concurrency')
 
     valid_prefixes = ('stdout_stream.', 'stderr_stream.', 'hooks.', 'rlimit_')
 
@@ -113,7 +116,7 @@ def validate_option(key, val):
         raise MessageError('unknown key %r' % key)
 
     if key in ('numprocesses', 'max_retry', 'max_age', 'max_age_variance',
-               'stop_signal'):
+               'stop_signal', 'spawn_concurrency'):
         if not isinstance(val, int):
             raise MessageError("%r isn't an integer" % key)
 
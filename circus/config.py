@@ -14,6 +14,7 @@ from circus import logger
 from circus.py3compat import sort_by_field
 from circus.util import (DEFAULT_ENDPOINT_DEALER, DEFAULT_ENDPOINT_SUB,
                          DEFAULT_ENDPOINT_MULTICAST, DEFAULT_ENDPOINT_STATS,
+                         DEFAULT_ENDPOINT_STATS_HISTORY,
                          StrictConfigParser, replace_gnu_args, to_signum,
                          to_bool, papa)
 
@@ -152,6 +153,9 @@ def get_config(config_file):
 
     # main circus options
     config['check_delay'] = dget('circus', 'check_delay', 5., float)
+    config['reap_on_sigchld'] = dget('circus', 'reap_on_sigchld', False, bool)
+    config['profile'] = dget('circus', 'profile', False, bool)
+    config['profile_interval'] = dget('circus', 'profile_interval', 5., float)
     config['endpoint'] = dget('circus', 'endpoint', DEFAULT_ENDPOINT_DEALER)
     config['endpoint_owner'] = dget('circus', 'endpoint_owner', None, str)
     config['pubsub_endpoint'] = dget('circus', 'pubsub_endpoint',
@@ -160,6 +164,18 @@ def get_config(config_file):
                                         DEFAULT_ENDPOINT_MULTICAST)
     config['stats_endpoint'] = dget('circus', 'stats_endpoint', None)
     config['statsd'] = dget('circus', 'statsd', False, bool)
+    config['stats_pool_size'] = dget('circus', 'stats_pool_size', 4, int)
+    config['stats_history_size'] = dget('circus', 'stats_history_size', 0,
+                                        int)
+    config['stats_history_endpoint'] = dget(
+        'circus', 'stats_history_endpoint', DEFAULT_ENDPOINT_STATS_HISTORY)
+    config['pubsub_encoding'] = dget('circus', 'pubsub_encoding', 'json')
+    config['pubsub_batch_delay'] = dget('circus', 'pubsub_batch_delay', 0.,
+                                        float)
+    config['sample_interval'] = dget('circus', 'sample_interval', 0., float)
+    config['sample_history'] = dget('circus', 'sample_history', 60, int)
+    config['sample_children'] = dget('circus', 'sample_children', False, bool)
+    config['plugins_host'] = dget('circus', 'plugins_host', False, bool)
     config['umask'] = dget('circus', 'umask', None)
     if config['umask']:
         config['umask'] = int(config['umask'], 8)
@@ -173,6 +189,7 @@ def get_config(config_file):
         config['statsd'] = True
 
     config['warmup_delay'] = dget('circus', 'warmup_delay', 0, int)
+    config['spawn_concurrency'] = dget('circus', 'spawn_concurrency', 1, int)
     config['httpd'] = dget('circus', 'httpd', False, bool)
     config['httpd_host'] = dget('circus', 'httpd_host', 'localhost', str)
     config['httpd_port'] = dget('circus', 'httpd_port', 8080, int)
@@ -229,7 +246,8 @@ def get_config(config_file):
                 # default bool to False
                 elif opt in ('shell', 'send_hup', 'stop_children',
                              'close_child_stderr', 'use_sockets', 'singleton',
-                             'copy_env', 'copy_path', 'close_child_stdout'):
+                             'copy_env', 'copy_path', 'close_child_stdout',
+                             'use_zygote'):
                     watcher[opt] = dget(section, opt, False, bool)
                 elif opt == 'stop_signal':
                     watcher['stop_signal'] = to_signum(val)
@@ -238,6 +256,12 @@ def get_config(config_file):
                 elif opt == 'graceful_timeout':
                     watcher['graceful_timeout'] = dget(
                         section, "graceful_timeout", 30, int)
+                elif opt in ('stream_read_size', 'stream_flush_size'):
+                    watcher[opt] = dget(section, opt, None, int)
+                elif opt == 'stream_flush_interval':
+                    watcher[opt] = dget(section, opt, 0., float)
+                elif opt == 'spawn_concurrency':
+                    watcher[opt] = dget(section, opt, 1, int)
                 elif opt.startswith('stderr_stream') or \
                         opt.startswith('stdout_stream'):
                     stream_name, stream_opt = opt.split(".", 1)
@@ -1,6 +1,7 @@
 import errno
 import zmq
 
+from circus.pubsub import split_frames
 from circus.util import DEFAULT_ENDPOINT_SUB, get_connection
 from circus.py3compat import b
 
@@ -37,7 +38,11 @@ class CircusConsumer(object):
         self.poller.register(self.pubsub_socket, zmq.POLLIN)
 
     def iter_messages(self):
-        """ Yields tuples of (topic, message) """
+        """ Yields tuples of (topic, message)
+
+        The messages of a batch are yielded one by one. Use
+        :func:`circus.pubsub.decode` to decode them.
+        """
         with self:
             while True:
                 try:
@@ -50,8 +55,9 @@ class CircusConsumer(object):
                 if len(events) == 0:
                     continue
 
-                topic, message = self.pubsub_socket.recv_multipart()
-                yield topic, message
+                frames = self.pubsub_socket.recv_multipart()
+                for topic, message in split_frames(frames):
+                    yield topic, message
 
     def stop(self):
         if self.keep_context:
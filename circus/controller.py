@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 import traceback
 import functools
 try:
@@ -13,6 +14,7 @@ except ImportError:
 import zmq
 import zmq.utils.jsonapi as json
 from zmq.eventloop import ioloop, zmqstream
+from tornado import gen
 from tornado.concurrent import Future
 
 from circus.util import create_udp_socket
@@ -20,15 +22,21 @@ from circus.util import check_future_exception_and_log
 from circus.util import to_uid
 from circus.commands import get_commands, ok, error, errors
 from circus import logger
+from circus.profiler import profiler
 from circus.exc import MessageError, ConflictError
 from circus.py3compat import string_types
 from circus.sighandler import SysHandler
 
 
+# delay before retrying a SIGCHLD pass which conflicted with a command
+_SIGCHLD_RETRY_DELAY = 0.1
+
+
 class Controller(object):
 
     def __init__(self, endpoint, multicast_endpoint, context, loop, arbiter,
-                 check_delay=1.0, endpoint_owner=None):
+                 check_delay=1.0, endpoint_owner=None,
+                 reap_on_sigchld=False):
         self.arbiter = arbiter
         self.caller = None
         self.endpoint = endpoint
@@ -39,6 +47,9 @@ class Controller(object):
         self.endpoint_owner = endpoint_owner
         self.started = False
         self._managing_watchers_future = None
+        self.reap_on_sigchld = reap_on_sigchld
+        self._pending_sigchld = False
+        self._sigchld_retry = None
 
         # initialize the sys handler
         self._init_syshandler()
@@ -47,7 +58,7 @@ class Controller(object):
         self.commands = get_commands()
 
     def _init_syshandler(self):
-        self.sys_hdl = SysHandler(self)
+        self.sys_hdl = SysHandler(self, handle_chld=self.reap_on_sigchld)
 
     def _init_stream(self):
         self.stream = zmqstream.ZMQStream(self.ctrl_socket, self.loop)
@@ -105,6 +116,38 @@ class Controller(object):
 
     def _manage_watchers_cb(self, future):
         self._managing_watchers_future = None
+        if self._pending_sigchld:
+            self.handle_sigchld()
+
+    def handle_sigchld(self):
+        """Reap the exited children and respawn their watchers right away.
+
+        Called from the loop after a SIGCHLD was received. If another
+        pass is already running it may have missed the exited children,
+        so we run again once it's over.
+        """
+        self._pending_sigchld = False
+        if not self.started:
+            return
+        if self._managing_watchers_future is not None:
+            self._pending_sigchld = True
+            return
+        try:
+            self._managing_watchers_future = \
+                self.arbiter.manage_reaped_watchers()
+            self.loop.add_future(self._managing_watchers_future,
+                                 self._manage_watchers_cb)
+        except ConflictError:
+            # an exclusive command is running, retry a bit later
+            self._pending_sigchld = True
+            if self._sigchld_retry is None:
+                self._sigchld_retry = self.loop.add_timeout(
+                    time.time() + _SIGCHLD_RETRY_DELAY, self._retry_sigchld)
+
+    def _retry_sigchld(self):
+        self._sigchld_retry = None
+        if self._pending_sigchld:
+            self.handle_sigchld()
 
     def start(self):
         self.initialize()
@@ -121,6 +164,9 @@ class Controller(object):
         if self.started:
             if self.caller is not None:
                 self.caller.stop()
+            if self._sigchld_retry is not None:
+                self.loop.remove_timeout(self._sigchld_retry)
+                self._sigchld_retry = None
             try:
                 self.stream.flush()
                 self.stream.close()
@@ -145,7 +191,8 @@ class Controller(object):
                                address)
 
     def _dispatch_callback_future(self, msg, cid, mid, cast, cmd_name,
-                                  send_resp, future):
+                                  send_resp, started, future):
+        self._record_latency(cmd_name, started)
         exception = check_future_exception_and_log(future)
         if exception is not None:
             if send_resp:
@@ -178,6 +225,7 @@ class Controller(object):
             self.arbiter.stop()
 
     def dispatch(self, job, future=None):
+        started = time.time()
         cid, msg = job
         try:
             json_msg = json.loads(msg)
@@ -190,6 +238,9 @@ class Controller(object):
         properties = json_msg.get('properties', {})
         cast = json_msg.get('msg_type') == "cast"
 
+        if json_msg.get('msg_type') == "batch":
+            return self.dispatch_batch(cid, mid, msg, json_msg)
+
         try:
             cmd = self.commands[cmd_name.lower()]
         except KeyError:
@@ -203,17 +254,20 @@ class Controller(object):
             if isinstance(resp, Future):
                 if properties.get('waiting', False):
                     cb = functools.partial(self._dispatch_callback_future, msg,
-                                           cid, mid, cast, cmd_name, True)
+                                           cid, mid, cast, cmd.name, True,
+                                           started)
                     resp.add_done_callback(cb)
                 else:
                     cb = functools.partial(self._dispatch_callback_future, msg,
-                                           cid, mid, cast, cmd_name, False)
+                                           cid, mid, cast, cmd.name, False,
+                                           started)
                     resp.add_done_callback(cb)
                     self._dispatch_callback(msg, cid, mid, cast,
                                             cmd_name, None)
             else:
                 self._dispatch_callback(msg, cid, mid, cast,
                                         cmd_name, resp)
+                self._record_latency(cmd.name, started)
         except MessageError as e:
             return self.send_error(mid, cid, msg, str(e), cast=cast,
                                    errno=errors.MESSAGE_ERROR)
@@ -239,6 +293,130 @@ class Controller(object):
             return self.send_error(mid, cid, msg, reason, tb, cast=cast,
                                    errno=errors.COMMAND_ERROR)
 
+    def dispatch_batch(self, cid, mid, msg, json_msg):
+        """Executes the commands of a batch message and sends back a
+        single response holding the response of each command.
+
+        The commands are executed in order, waiting for each one to be over
+        before executing the next one, unless *concurrent* is true.
+        """
+        commands = json_msg.get('commands')
+        if not isinstance(commands, list):
+            return self.send_error(mid, cid, msg,
+                                   "a batch needs a list of commands",
+                                   errno=errors.MESSAGE_ERROR)
+
+        future = self._execute_batch(commands,
+                                     json_msg.get('concurrent', False))
+        cb = functools.partial(self._dispatch_batch_callback, msg, cid, mid)
+        self.loop.add_future(future, cb)
+
+    def _dispatch_batch_callback(self, msg, cid, mid, future):
+        exception = check_future_exception_and_log(future)
+        if exception is not None:
+            self.send_error(mid, cid, msg, "server error",
+                            errno=errors.BAD_MSG_DATA_ERROR)
+        else:
+            self.send_ok(mid, cid, msg, {"results": future.result()})
+
+    @gen.coroutine
+    def _execute_batch(self, commands, concurrent=False):
+        if concurrent:
+            responses = yield [self._execute_batch_item(item, False)
+                               for item in commands]
+        else:
+            responses = []
+            for item in commands:
+                response = yield self._execute_batch_item(item, True)
+                responses.append(response)
+        raise gen.Return(responses)
+
+    @gen.coroutine
+    def _execute_batch_item(self, item, sequential):
+        """Executes one command of a batch and returns its response.
+
+        Errors are returned as error responses so they don't affect the
+        other commands of the batch. When *sequential* is true, the command
+        is over when the returned future is resolved, even if its result
+        isn't waited for.
+        """
+        started = time.time()
+        if not isinstance(item, dict):
+            raise gen.Return(error("invalid batch item: %r" % (item,),
+                                   errno=errors.MESSAGE_ERROR))
+
+        cmd_name = item.get('command')
+        properties = item.get('properties', {})
+        try:
+            cmd = self.commands[cmd_name.lower()]
+        except (KeyError, AttributeError):
+            raise gen.Return(error("unknown command: %r" % cmd_name,
+                                   errno=errors.UNKNOWN_COMMAND))
+
+        if cmd.name == "quit":
+            raise gen.Return(error("the quit command can't be batched",
+                                   errno=errors.MESSAGE_ERROR))
+
+        while True:
+            try:
+                cmd.validate(properties)
+                resp = cmd.execute(self.arbiter, properties)
+                break
+            except ConflictError as e:
+                if self._managing_watchers_future is None:
+                    raise gen.Return(error(str(e),
+                                           errno=errors.COMMAND_ERROR))
+                # re-executing it once manage_watchers is over
+                try:
+                    yield self._managing_watchers_future
+                except Exception:
+                    pass
+            except MessageError as e:
+                raise gen.Return(error(str(e), errno=errors.MESSAGE_ERROR))
+            except OSError as e:
+                raise gen.Return(error(str(e), errno=errors.OS_ERROR))
+            except Exception:
+                value = sys.exc_info()[1]
+                tb = traceback.format_exc()
+                reason = "command %r: %s" % (item, value)
+                logger.debug("error: command %r: %s\n\n%s", item, value, tb)
+                raise gen.Return(error(reason, tb,
+                                       errno=errors.COMMAND_ERROR))
+
+        if isinstance(resp, Future):
+            waiting = properties.get('waiting', False)
+            if waiting or sequential:
+                # commands may return a TransformableFuture, which can't be
+                # yielded directly
+                done = Future()
+                resp.add_done_callback(done.set_result)
+                yield done
+                if check_future_exception_and_log(resp) is not None:
+                    if waiting:
+                        raise gen.Return(error(
+                            "server error", errno=errors.BAD_MSG_DATA_ERROR))
+                    resp = None
+                elif waiting:
+                    resp = resp.result()
+                else:
+                    resp = None
+            else:
+                resp.add_done_callback(check_future_exception_and_log)
+                resp = None
+        self._record_latency(cmd.name, started)
+
+        if isinstance(resp, list):
+            resp = {"results": resp}
+        elif resp is not None and not isinstance(resp, dict):
+            logger.error("msg %r tried to send a non-dict: %s", item,
+                         str(resp))
+            raise gen.Return(error("server error",
+                                   errno=errors.BAD_MSG_DATA_ERROR))
+        raise gen.Return(ok(resp))
+
+    def _record_latency(self, cmd_name, started):
+        profiler.record('command.' + cmd_name, time.time() - started)
+
     def send_error(self, mid, cid, msg, reason="unknown", tb=None, cast=False,
                    errno=errors.NOT_SPECIFIED):
         resp = error(reason=reason, tb=tb, errno=errno)
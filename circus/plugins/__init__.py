@@ -2,15 +2,20 @@
 """
 import sys
 import errno
+import time
 import uuid
 import argparse
+import functools
 
 import zmq
 import zmq.utils.jsonapi as json
 from zmq.eventloop import ioloop, zmqstream
+from tornado import gen, concurrent
 
 from circus import logger, __version__
-from circus.client import make_message, cast_message
+from circus.exc import CallError
+from circus.client import make_message, cast_message, batch_message
+from circus.pubsub import decode, split_frames
 from circus.py3compat import b, s
 from circus.util import (debuglog, to_bool, resolve_name, configure_logger,
                          DEFAULT_ENDPOINT_DEALER, DEFAULT_ENDPOINT_SUB,
@@ -26,7 +31,8 @@ class CircusPlugin(object):
     - **endpoint** -- the circusd ZMQ endpoint
     - **pubsub_endpoint** -- the circusd ZMQ pub/sub endpoint
     - **check_delay** -- the configured check delay
-    - **config** -- free config mapping
+    - **config** -- free config mapping. Its *call_timeout* is the number
+      of seconds :meth:`call_async` waits for a reply (default: 5).
     """
     name = ''
 
@@ -42,6 +48,9 @@ class CircusPlugin(object):
         self._id = b(uuid.uuid4().hex)
         self.running = False
         self.loop = ioloop.IOLoop()
+        self.call_timeout = float(config.get('call_timeout', 5))
+        # call id -> Future of the calls waiting for their reply
+        self._pending = {}
 
     @debuglog
     def initialize(self):
@@ -50,11 +59,13 @@ class CircusPlugin(object):
         self.client.setsockopt(zmq.IDENTITY, self._id)
         get_connection(self.client, self.endpoint, self.ssh_server)
         self.client.linger = 0
+        self.loop.add_handler(self.client, self._read_replies,
+                              ioloop.IOLoop.READ)
         self.sub_socket = self.context.socket(zmq.SUB)
         self.sub_socket.setsockopt(zmq.SUBSCRIBE, b'watcher.')
         self.sub_socket.connect(self.pubsub_endpoint)
         self.substream = zmqstream.ZMQStream(self.sub_socket, self.loop)
-        self.substream.on_recv(self.handle_recv)
+        self.substream.on_recv(self._handle_frames)
 
     @debuglog
     def start(self):
@@ -82,6 +93,7 @@ class CircusPlugin(object):
                 break
 
         self.substream.close()
+        self.loop.remove_handler(self.client)
         self.client.close()
         self.sub_socket.close()
         self.context.destroy()
@@ -98,21 +110,107 @@ class CircusPlugin(object):
             self.loop.stop()
 
         self.running = False
+        # emptied in place, as the plugins of a host share it
+        while self._pending:
+            call_id, future = self._pending.popitem()
+            future.set_exception(CallError('The plugin was stopped.'))
+
+    @staticmethod
+    def _make_call(command, props):
+        if isinstance(command, list):
+            msg = batch_message(command, **props)
+        else:
+            msg = make_message(command, **props)
+        msg['id'] = uuid.uuid4().hex
+        return msg
 
     def call(self, command, **props):
         """Sends the command to **circusd**
 
         Options:
 
-        - **command** -- the command to call
-        - **props** -- keyword arguments to add to the call
+        - **command** -- the command to call, or a list of messages built
+          with :func:`circus.client.make_message` to send them as a batch.
+        - **props** -- keyword arguments to add to the call. For a batch,
+          only *concurrent* is accepted.
+
+        Returns the JSON mapping sent back by **circusd**. For a batch, its
+        *results* key holds the response of each command.
 
-        Returns the JSON mapping sent back by **circusd**
+        The call blocks until the reply comes, the IOLoop included: the
+        callbacks of the plugin should use :meth:`call_async`.
         """
-        msg = make_message(command, **props)
+        msg = self._make_call(command, props)
         self.client.send(json.dumps(msg))
-        msg = self.client.recv()
-        return json.loads(msg)
+        while True:
+            res = json.loads(self.client.recv())
+            if res.get('id') == msg['id']:
+                break
+            # the reply of a call_async sent before
+            self._handle_reply(res)
+        if self._pending:
+            # the replies received meanwhile are not signaled anymore
+            self.loop.add_callback(self._read_replies)
+        return res
+
+    @gen.coroutine
+    def call_async(self, command, **props):
+        """Sends the command to **circusd** without blocking the IOLoop.
+
+        Takes the same options as :meth:`call`. Returns a Future of the
+        JSON mapping sent back by **circusd**, which fails with a
+        :class:`circus.exc.CallError` if the reply didn't come within
+        *call_timeout* seconds.
+        """
+        msg = self._make_call(command, props)
+        call_id = msg['id']
+        future = concurrent.Future()
+        self._pending[call_id] = future
+        try:
+            self.client.send(json.dumps(msg), zmq.NOBLOCK)
+        except zmq.ZMQError as e:
+            del self._pending[call_id]
+            raise CallError(str(e))
+
+        timer = self.loop.add_timeout(time.time() + self.call_timeout,
+                                      functools.partial(self._timed_out,
+                                                        call_id))
+        try:
+            res = yield future
+        finally:
+            self.loop.remove_timeout(timer)
+        raise gen.Return(res)
+
+    def _read_replies(self, *args):
+        while True:
+            try:
+                msg = self.client.recv(zmq.NOBLOCK)
+            except zmq.Again:
+                return
+            try:
+                res = json.loads(msg)
+            except ValueError:
+                logger.error('Invalid reply from circusd: %r', msg)
+                continue
+            self._handle_reply(res)
+
+    def _handle_reply(self, res):
+        future = self._pending.pop(res.get('id'), None)
+        if future is None:
+            # the call timed out
+            logger.debug('Reply to an unknown call: %r', res)
+            return
+        future.set_result(res)
+
+    def _timed_out(self, call_id):
+        future = self._pending.pop(call_id, None)
+        if future is not None:
+            future.set_exception(CallError('Timed out.'))
+
+    def _handle_frames(self, frames):
+        # the events of a batch are handled one by one
+        for topic, msg in split_frames(frames):
+            self.handle_recv([topic, msg])
 
     def cast(self, command, **props):
         """Fire-and-forget a command to **circusd**
@@ -155,7 +253,7 @@ class CircusPlugin(object):
 
     @staticmethod
     def load_message(msg):
-        return json.loads(msg)
+        return decode(msg)
 
 
 def _cfg2str(cfg):
@@ -179,6 +277,28 @@ def _str2cfg(data):
     return cfg
 
 
+def get_host_config(plugins, name='plugin:host'):
+    """Returns the config of a :class:`circus.plugins.host.PluginHost`
+    running all the *plugins* in one process.
+
+    The config of each plugin is passed to the host with the name of the
+    plugin as a prefix, as in *statsd.use*.
+    """
+    config = {'name': name, 'use': 'circus.plugins.host.PluginHost'}
+    names = []
+    for plugin in plugins:
+        # makes sure the name exists
+        resolve_name(plugin['use'])
+        prefix = plugin.get('name', plugin['use'])
+        if prefix.startswith('plugin:'):
+            prefix = prefix[len('plugin:'):]
+        names.append(prefix)
+        for key, value in plugin.items():
+            config['%s.%s' % (prefix, key)] = value
+    config['plugins'] = ','.join(names)
+    return config
+
+
 def get_plugin_cmd(config, endpoint, pubsub, check_delay, ssh_server,
                    debug=False, loglevel=None, logoutput=None):
     fqn = config['use']
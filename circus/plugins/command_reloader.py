@@ -1,7 +1,9 @@
 import os
 
+from circus.exc import CallError
 from circus.plugins import CircusPlugin
 from circus import logger
+from tornado import gen
 from zmq.eventloop import ioloop
 
 
@@ -24,8 +26,16 @@ class CommandReloader(CircusPlugin):
             return True
         return False
 
+    @gen.coroutine
     def look_after(self):
-        list_ = self.call('list')
+        try:
+            yield self._look_after()
+        except CallError as e:
+            logger.error('Could not check the watchers commands: %s', e)
+
+    @gen.coroutine
+    def _look_after(self):
+        list_ = yield self.call_async('list')
         watchers = [watcher for watcher in list_['watchers']
                     if not watcher.startswith('plugin:')]
 
@@ -34,13 +44,14 @@ class CommandReloader(CircusPlugin):
                 del self.cmd_files[watcher]
 
         for watcher in watchers:
-            watcher_info = self.call('get', name=watcher, keys=['cmd'])
+            watcher_info = yield self.call_async('get', name=watcher,
+                                                 keys=['cmd'])
             cmd = watcher_info['options']['cmd']
             cmd_path = os.path.realpath(cmd)
             cmd_mtime = os.stat(cmd_path).st_mtime
             if self.is_modified(watcher, cmd_mtime, cmd_path):
                 logger.info('%s modified. Restarting.', cmd_path)
-                self.call('restart', name=watcher)
+                yield self.call_async('restart', name=watcher)
             self.cmd_files[watcher] = {
                 'path': cmd_path,
                 'mtime': cmd_mtime,
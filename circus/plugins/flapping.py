@@ -1,12 +1,19 @@
 from circus.fixed_threading import Timer
 import time
 
+from tornado import gen
+
 from circus import logger
+from circus.exc import CallError
 from circus.plugins import CircusPlugin
 from circus.util import to_bool
 
 
 INFINITE_RETRY = -1
+# seconds to wait before looking up again the conf of a watcher, doubled
+# after each failure
+LOOKUP_RETRY_DELAY = 1
+MAX_LOOKUP_RETRY_DELAY = 60
 
 
 class Flapping(CircusPlugin):
@@ -40,6 +47,10 @@ class Flapping(CircusPlugin):
         self.timelines = {}
         self.timers = {}
         self.configs = {}
+        # watcher name -> Future of the lookup of its conf
+        self._lookups = {}
+        # watcher name -> (failed lookups, time of the next lookup)
+        self._failed_lookups = {}
         self.tries = {}
 
         # default options
@@ -63,9 +74,22 @@ class Flapping(CircusPlugin):
         elif action == "updated":
             self.update_conf(watcher_name)
 
+    @gen.coroutine
     def update_conf(self, watcher_name):
-        msg = self.call("options", name=watcher_name)
         conf = self.configs.get(watcher_name, {})
+        try:
+            msg = yield self.call_async("options", name=watcher_name)
+        except CallError as e:
+            logger.error("Could not get the options of %s: %s",
+                         watcher_name, e)
+            # the defaults are used until a lookup succeeds
+            failures = self._failed_lookups.get(watcher_name, (0, 0))[0]
+            delay = min(LOOKUP_RETRY_DELAY * 2 ** failures,
+                        MAX_LOOKUP_RETRY_DELAY)
+            self._failed_lookups[watcher_name] = (failures + 1,
+                                                  time.time() + delay)
+            raise gen.Return(dict(conf))
+        self._failed_lookups.pop(watcher_name, None)
         for key, value in msg.get('options', {}).items():
             key = key.split('.')
             if key[0] != self.name:
@@ -79,7 +103,7 @@ class Flapping(CircusPlugin):
             conf[key] = value
 
         self.configs[watcher_name] = conf
-        return conf
+        raise gen.Return(conf)
 
     def reset(self, watcher_name):
         self.timelines[watcher_name] = []
@@ -91,12 +115,24 @@ class Flapping(CircusPlugin):
     def _get_conf(self, conf, name):
         return conf.get(name, getattr(self, name))
 
+    @gen.coroutine
     def check(self, watcher_name):
-        timeline = self.timelines[watcher_name]
+        failed_lookup = self._failed_lookups.get(watcher_name)
         if watcher_name in self.configs:
             conf = self.configs[watcher_name]
+        elif (watcher_name not in self._lookups and
+              failed_lookup is not None and time.time() < failed_lookup[1]):
+            conf = {}
         else:
-            conf = self.update_conf(watcher_name)
+            # the reaps received during the lookup wait for the same one
+            lookup = self._lookups.get(watcher_name)
+            if lookup is None:
+                lookup = self.update_conf(watcher_name)
+                self._lookups[watcher_name] = lookup
+            try:
+                conf = yield lookup
+            finally:
+                self._lookups.pop(watcher_name, None)
 
         # if the watcher is not activated, we skip it
         if not to_bool(self._get_conf(conf, 'active')):
@@ -104,9 +140,12 @@ class Flapping(CircusPlugin):
             return
 
         tries = self.tries.get(watcher_name, 0)
+        # read after the lookup, a check that ran meanwhile may have reset it
+        timeline = self.timelines.get(watcher_name, [])
+        attempts = self._get_conf(conf, 'attempts')
 
-        if len(timeline) == self._get_conf(conf, 'attempts'):
-            duration = timeline[-1] - timeline[0] - self.check_delay
+        if len(timeline) >= attempts:
+            duration = timeline[-1] - timeline[-attempts] - self.check_delay
 
             if duration <= self._get_conf(conf, 'window'):
                 max_retry = self._get_conf(conf, 'max_retry')
@@ -0,0 +1,99 @@
+from circus import logger
+from circus.plugins import CircusPlugin
+from circus.util import resolve_name
+
+
+class PluginHost(CircusPlugin):
+    """Plugin that runs several plugins in its process.
+
+    The hosted plugins share the IOLoop, the subscription to the events of
+    **circusd** and the socket the commands are sent on. Each event is
+    passed to the :meth:`handle_recv` of every plugin, and an error raised
+    by a plugin is logged without affecting the others.
+
+    Plugin Options --
+
+    - **plugins** -- comma-separated names of the hosted plugins
+    - **<name>.use** -- the fully qualified name of the class of the plugin
+      *name*. Every other **<name>.*** option is passed to the plugin in its
+      **config** mapping.
+
+    :func:`circus.plugins.get_host_config` builds these options from a list
+    of plugins.
+    """
+    name = 'host'
+
+    def __init__(self, endpoint, pubsub_endpoint, check_delay, ssh_server=None,
+                 **config):
+        super(PluginHost, self).__init__(endpoint, pubsub_endpoint,
+                                         check_delay, ssh_server=ssh_server,
+                                         **config)
+        names = [name for name in config.get('plugins', '').split(',')
+                 if name]
+        configs = dict((name, {}) for name in names)
+        # the longest names first, in case a name prefixes another one
+        prefixes = sorted(names, key=len, reverse=True)
+        for key, value in config.items():
+            for name in prefixes:
+                if key.startswith(name + '.'):
+                    configs[name][key[len(name) + 1:]] = value
+                    break
+
+        self.plugins = []
+        for name in names:
+            plugin = self._load_plugin(name, configs[name])
+            if plugin is not None:
+                self.plugins.append(plugin)
+
+    def _load_plugin(self, name, config):
+        try:
+            factory = resolve_name(config.pop('use'))
+            plugin = factory(self.endpoint, self.pubsub_endpoint,
+                             self.check_delay, self.ssh_server, **config)
+        except Exception:
+            logger.exception('Could not load the plugin %s', name)
+            return None
+
+        plugin.loop.close()
+        if not plugin.active:
+            logger.info('The plugin %s is not active', name)
+            return None
+        plugin.loop = self.loop
+        # the replies to the calls of all the plugins are read by the host
+        plugin._pending = self._pending
+        logger.info('Loaded the plugin %s', name)
+        return plugin
+
+    def _dispatch(self, plugins, method, *args):
+        """Calls *method* on each of the *plugins* and returns the ones
+        which didn't fail."""
+        succeeded = []
+        for plugin in plugins:
+            try:
+                getattr(plugin, method)(*args)
+            except Exception:
+                logger.exception('The plugin %s failed in %s',
+                                 plugin.name, method)
+            else:
+                succeeded.append(plugin)
+        return succeeded
+
+    def initialize(self):
+        super(PluginHost, self).initialize()
+        for plugin in self.plugins:
+            plugin.context = self.context
+            plugin.client = self.client
+
+    def handle_init(self):
+        # a plugin that couldn't initialize is left out
+        self.plugins = self._dispatch(self.plugins, 'handle_init')
+        for plugin in self.plugins:
+            plugin.running = True
+
+    def handle_recv(self, data):
+        self._dispatch(self.plugins, 'handle_recv', data)
+
+    def handle_stop(self):
+        # stop() and not handle_stop(), as some plugins release their
+        # resources in it
+        self._dispatch(self.plugins, 'stop')
@@ -1,5 +1,7 @@
 import signal
 import warnings
+from tornado import gen
+from circus.exc import CallError
 from circus.plugins.statsd import BaseObserver
 from circus.util import to_bool
 from circus.util import human2bytes
@@ -60,8 +62,12 @@ class ResourceWatcher(BaseObserver):
         self._count_under_mem = {}
         self._count_health = {}
 
+    @gen.coroutine
     def look_after(self):
-        info = self.call("stats", name=self.watcher)
+        try:
+            info = yield self.call_async("stats", name=self.watcher)
+        except CallError:
+            info = {"status": "error"}
 
         if info["status"] == "error":
             self.statsd.increment("_resource_watcher.%s.error" % self.watcher)
@@ -1,7 +1,9 @@
 import socket
 
+from tornado import gen
 from zmq.eventloop import ioloop
 
+from circus.exc import CallError
 from circus.plugins import CircusPlugin
 from circus.util import human2bytes
 
@@ -99,8 +101,12 @@ class FullStats(BaseObserver):
 
     name = 'full_stats'
 
+    @gen.coroutine
     def look_after(self):
-        info = self.call("stats")
+        try:
+            info = yield self.call_async("stats")
+        except CallError:
+            info = {"status": "error"}
         if info["status"] == "error":
             self.statsd.increment("_stats.error")
             return
@@ -1,9 +1,14 @@
+import errno
+import heapq
 import re
 import socket
 import time
 
+from tornado import gen
 from zmq.eventloop import ioloop
+from circus.exc import CallError
 from circus.plugins import CircusPlugin
+from circus.py3compat import s
 from circus import logger
 from circus import util
 
@@ -42,6 +47,10 @@ class WatchDog(CircusPlugin):
       any heartbeat before restarting process (default: 3)
     - **ip** -- ip the watchdog will bind on (default: 127.0.0.1)
     - **port** -- port the watchdog will bind on (default: 1664)
+    - **rcvbuf** -- size of the receive buffer of the udp socket, in bytes
+      or with a unit like 4M. The heartbeats which don't fit are lost.
+      The kernel caps it at net.core.rmem_max on Linux. 0 keeps the system
+      default. (default: 4M)
     - **watchers_stop_signal** -- optionally override the stop_signal used
       when killing the processes
     - **watchers_graceful_timeout** -- optionally override the graceful_timeout
@@ -59,8 +68,15 @@ class WatchDog(CircusPlugin):
         self.msg_regex = config.get("msg_regex",
                                     "^(?P<pid>.*);(?P<timestamp>.*)$")
         self.max_count = int(config.get("max_count", 3))
+        self._watchers_regex = re.compile(self.watchers_regex)
+        self._msg_regex = re.compile(self.msg_regex)
         self.watchdog_ip = config.get("ip", "127.0.0.1")
         self.watchdog_port = int(config.get("port", 1664))
+        rcvbuf = config.get("rcvbuf", "4M")
+        try:
+            self.rcvbuf = int(rcvbuf)
+        except ValueError:
+            self.rcvbuf = util.human2bytes(rcvbuf)
         self.stop_signal = config.get("watchers_stop_signal")
         if self.stop_signal:
             self.stop_signal = util.to_signum(self.stop_signal)
@@ -69,6 +85,12 @@ class WatchDog(CircusPlugin):
             self.graceful_timeout = float(self.graceful_timeout)
 
         self.pid_status = dict()
+        # heap of the (deadline, pid) of the monitored pids. The deadline of
+        # a pid is only pushed back when it is reached, so a heartbeat
+        # doesn't touch the heap and look_after only sees the pids which
+        # may have expired.
+        self._deadlines = []
+        self.sock = None
         self.period = None
         self.starting = True
 
@@ -87,8 +109,10 @@ class WatchDog(CircusPlugin):
     def handle_stop(self):
         if self.period is not None:
             self.period.stop()
-        self.sock.close()
-        self.sock = None
+        if self.sock is not None:
+            self.loop.remove_handler(self.sock.fileno())
+            self.sock.close()
+            self.sock = None
 
     def handle_recv(self, data):
         """Handle received message from circusd
@@ -113,8 +137,7 @@ class WatchDog(CircusPlugin):
                     return
                 pid = str(message.get("process_pid"))
                 if action == "spawn":
-                    self.pid_status[pid] = dict(watcher=watcher_name,
-                                                last_activity=time.time())
+                    self._add_pid(pid, watcher_name)
                     logger.info("added new monitored pid for %s:%s",
                                 watcher_name,
                                 pid)
@@ -126,6 +149,7 @@ class WatchDog(CircusPlugin):
                                 old_pid['watcher'],
                                 pid)
 
+    @gen.coroutine
     def _discover_monitored_pids(self):
         """Try to discover all the monitored pids.
 
@@ -134,19 +158,26 @@ class WatchDog(CircusPlugin):
         from circusd which is handled by self.handle_recv
         """
         self.pid_status = dict()
-        all_watchers = self.call("list")
+        self._deadlines = []
+        all_watchers = yield self.call_async("list")
         for watcher_name in all_watchers['watchers']:
             if self._match_watcher_name(watcher_name):
-                processes = self.call("list", name=watcher_name)
+                processes = yield self.call_async("list", name=watcher_name)
                 if 'pids' in processes:
                     for pid in processes['pids']:
                         pid = str(pid)
-                        self.pid_status[pid] = dict(watcher=watcher_name,
-                                                    last_activity=time.time())
+                        self._add_pid(pid, watcher_name)
                         logger.info("discovered: %s, pid:%s",
                                     watcher_name,
                                     pid)
 
+    def _add_pid(self, pid, watcher_name):
+        now = time.time()
+        deadline = now + self.loop_rate * self.max_count
+        self.pid_status[pid] = dict(watcher=watcher_name, last_activity=now,
+                                    deadline=deadline)
+        heapq.heappush(self._deadlines, (deadline, pid))
+
     def _bind_socket(self):
         """bind the listening socket for watchdog udp and start an event
         handler for handling udp received messages.
@@ -162,7 +193,10 @@ class WatchDog(CircusPlugin):
                 str(socket_error))
             self.sock = None
         else:
-            self.sock.settimeout(1)
+            self.sock.setblocking(False)
+            if self.rcvbuf:
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                                     self.rcvbuf)
             self.loop.add_handler(self.sock.fileno(),
                                   self.receive_udp_socket,
                                   ioloop.IOLoop.READ)
@@ -174,7 +208,7 @@ class WatchDog(CircusPlugin):
 
         :return: re.match object or None
         """
-        return re.match(self.watchers_regex, name)
+        return self._watchers_regex.match(name)
 
     def _decode_received_udp_message(self, data):
         """decode the received message according to the msg_regex
@@ -182,55 +216,86 @@ class WatchDog(CircusPlugin):
         :return: decoded message
         :rtype: dict or None
         """
-        result = re.match(self.msg_regex, data)
+        result = self._msg_regex.match(s(data))
         if result is not None:
             return result.groupdict()
 
     def receive_udp_socket(self, fd, events):
-        """Check the socket for received UDP message.
-        This method is periodically called by the ioloop.
+        """Read all the UDP messages received by the socket.
+        This method is called by the ioloop when the socket is readable.
         If messages are received and parsed, update the status of
-        the corresponing pid.
+        the corresponing pids.
         """
-        data, _ = self.sock.recvfrom(1024)
-        heartbeat = self._decode_received_udp_message(data)
-        if "pid" in heartbeat:
-            if heartbeat['pid'] in self.pid_status:
+        now = time.time()
+        pid_status = self.pid_status
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(1024)
+            except socket.error as e:
+                if e.errno == errno.EINTR:
+                    continue
+                if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    logger.error("Could not read the watchdog socket: %s",
+                                 e)
+                return
+
+            heartbeat = self._decode_received_udp_message(data)
+            if heartbeat is None or "pid" not in heartbeat:
+                logger.debug("invalid watchdog message: %r", data)
+                continue
+            detail = pid_status.get(heartbeat["pid"])
+            if detail is not None:
                 # TODO: check and compare received time
                 # with our own time.time()
-                self.pid_status[heartbeat["pid"]][
-                    'last_activity'] = time.time()
+                detail['last_activity'] = now
             else:
-                logger.warning("received watchdog for a"
+                logger.warning("received watchdog for a "
                                "non monitored process:%s",
                                heartbeat)
-        logger.debug("watchdog message: %s", heartbeat)
 
+    @gen.coroutine
     def look_after(self):
         """Checks for the watchdoged watchers and restart a process if no
         received watchdog after the loop_rate * max_count period.
         """
         # if first check, do a full discovery first.
         if self.starting:
-            self._discover_monitored_pids()
+            try:
+                yield self._discover_monitored_pids()
+            except CallError as e:
+                logger.error("Could not discover the monitored pids: %s", e)
+                return
             self.starting = False
 
         max_timeout = self.loop_rate * self.max_count
-        too_old_time = time.time() - max_timeout
-        for pid, detail in self.pid_status.items():
-            if detail['last_activity'] < too_old_time:
-                logger.info("watcher:%s, pid:%s is not responding. Kill it !",
-                            detail['watcher'],
-                            pid)
-
-                props = dict(name=detail['watcher'], pid=int(pid))
-                if self.stop_signal is not None:
-                    props['signum'] = self.stop_signal
-                if self.graceful_timeout is not None:
-                    props['graceful_timeout'] = self.graceful_timeout
-
-                self.cast('kill', **props)
-
-                # Trusting watcher to eventually stop the process after
-                # graceful timeout
-                del self.pid_status[pid]
+        now = time.time()
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now:
+            deadline, pid = heapq.heappop(deadlines)
+            detail = self.pid_status.get(pid)
+            if detail is None or detail['deadline'] != deadline:
+                # the pid was reaped, or spawned again since
+                continue
+
+            deadline = detail['last_activity'] + max_timeout
+            if deadline > now:
+                # a heartbeat was received in time
+                detail['deadline'] = deadline
+                heapq.heappush(deadlines, (deadline, pid))
+                continue
+
+            logger.info("watcher:%s, pid:%s is not responding. Kill it !",
+                        detail['watcher'],
+                        pid)
+
+            props = dict(name=detail['watcher'], pid=int(pid))
+            if self.stop_signal is not None:
+                props['signum'] = self.stop_signal
+            if self.graceful_timeout is not None:
+                props['graceful_timeout'] = self.graceful_timeout
+
+            self.cast('kill', **props)
+
+            # Trusting watcher to eventually stop the process after
+            # graceful timeout
+            del self.pid_status[pid]
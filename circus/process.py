@@ -11,6 +11,7 @@ except ImportError:
 import sys
 import errno
 import os
+import subprocess
 from subprocess import PIPE, CREATE_NEW_PROCESS_GROUP
 import signal
 import time
@@ -28,8 +29,10 @@ from circus.py3compat import bytestring, string_types, quote
 from circus.sockets import CircusSocket
 from circus.util import (get_info, to_uid, to_gid, debuglog, get_working_dir,
                          ObjectDict, replace_gnu_args, get_default_gid,
-                         get_username_from_uid, IS_WINDOWS)
+                         get_username_from_uid, IS_WINDOWS, _CIRCUS_VAR,
+                         pidfd_open)
 from circus import logger
+from circus.sampler import sampler
 
 
 _INFOLINE = ("%(pid)s  %(cmdline)s %(username)s %(nice)s %(mem_info1)s "
@@ -42,6 +45,15 @@ UNEXISTING = 2
 OTHER = 3
 
 
+# when Popen can do all the work of the preexec function of Process.spawn,
+# no python code is run in the child. It is much faster for a large
+# circusd, since Popen can then use vfork, and safe with threads.
+SPAWN_WITHOUT_PREEXEC = hasattr(subprocess, 'DEVNULL')
+
+# Popen sets the uid, gid and groups of the child since python 3.9
+_POPEN_SETS_IDS = sys.version_info >= (3, 9)
+
+
 # psutil < 2.x compat
 def get_children(proc, recursive=False):
     try:
@@ -204,6 +216,9 @@ class Process(object):
         # sockets created before fork, should be let go after.
         self._sockets = []
         self._worker = None
+        # refers to the process until it is closed, even once its pid
+        # was reused, see pidfd_open()
+        self._pidfd = None
         self.redirected = False
         self.started = 0
 
@@ -265,6 +280,41 @@ class Process(object):
         if self.watcher is not None:
             return self.watcher._get_stdin_socket_fd()
 
+    def _get_popen_options(self):
+        """Return the Popen arguments doing the work of the preexec function
+        of spawn(), or None if some of it needs python code in the child.
+        """
+        if not SPAWN_WITHOUT_PREEXEC or self.rlimits:
+            return None
+        if (self.uid or self.gid) and not _POPEN_SETS_IDS:
+            return None
+        # the pipes would be replaced by /dev/null after the fork
+        if self.pipe_stdout and self.close_child_stdout:
+            return None
+        if self.pipe_stderr and self.close_child_stderr:
+            return None
+
+        options = {'start_new_session': True}
+        stdin_socket_fd = self._get_stdin_socket_fd()
+        if stdin_socket_fd is not None:
+            options['stdin'] = stdin_socket_fd
+        elif self.close_child_stdin:
+            options['stdin'] = subprocess.DEVNULL
+        if self.close_child_stdout:
+            options['stdout'] = subprocess.DEVNULL
+        if self.close_child_stderr:
+            options['stderr'] = subprocess.DEVNULL
+
+        if self.gid:
+            options['group'] = self.gid
+            # initgroups() only works for root, its failure is ignored
+            if self.username is not None and os.geteuid() == 0:
+                options['extra_groups'] = os.getgrouplist(self.username,
+                                                          self.gid)
+        if self.uid:
+            options['user'] = self.uid
+        return options
+
     def spawn(self):
         self.started = time.time()
         sockets_fds = self._get_sockets_fds()
@@ -352,7 +402,12 @@ class Process(object):
             preexec_fn = None
             extra['creationflags'] = CREATE_NEW_PROCESS_GROUP
         else:
-            preexec_fn = preexec
+            options = self._get_popen_options()
+            if options is None:
+                preexec_fn = preexec
+            else:
+                preexec_fn = None
+                extra.update(options)
 
         if self.pipe_stdout:
             extra['stdout'] = PIPE
@@ -364,6 +419,9 @@ class Process(object):
                              shell=self.shell, preexec_fn=preexec_fn,
                              env=self.env, close_fds=not self.use_fds,
                              executable=self.executable, **extra)
+        # opened before the process is reaped, so it can't refer to another
+        # process
+        self._pidfd = pidfd_open(self._worker.pid)
 
         # let go of sockets created only for self._worker to inherit
         self._sockets = []
@@ -375,68 +433,42 @@ class Process(object):
         logger.debug('cmd: ' + bytestring(self.cmd))
         logger.debug('args: ' + str(self.args))
 
-        current_env = ObjectDict(self.env.copy())
-
-        format_kwargs = {
-            'wid': self.wid, 'shell': self.shell, 'args': self.args,
-            'env': current_env, 'working_dir': self.working_dir,
-            'uid': self.uid, 'gid': self.gid, 'rlimits': self.rlimits,
-            'executable': self.executable, 'use_fds': self.use_fds}
-
-        if sockets_fds is not None:
-            format_kwargs['sockets'] = sockets_fds
-
-        if self.watcher is not None:
-            for option in self.watcher.optnames:
-                if option not in format_kwargs\
-                        and hasattr(self.watcher, option):
-                    format_kwargs[option] = getattr(self.watcher, option)
-
-        cmd = replace_gnu_args(self.cmd, **format_kwargs)
-
-        if '$WID' in cmd or (self.args and '$WID' in self.args):
+        if self.watcher is None:
+            template = ArgsTemplate(self)
+        else:
+            # the template is shared by the processes of the watcher, which
+            # drops it when one of its options changes
+            template = self.watcher._args_template
+            if template is None or not template.matches(self):
+                template = ArgsTemplate(self)
+                self.watcher._args_template = template
+
+        if template.uses_old_wid:
             msg = "Using $WID in the command is deprecated. You should use "\
                   "the python string format instead. In your case, this "\
                   "means replacing the $WID in your command by $(WID)."
 
             warnings.warn(msg, DeprecationWarning)
-            self.cmd = cmd.replace('$WID', str(self.wid))
-
-        if self.args is not None:
-            if isinstance(self.args, string_types):
-                args = shlex.split(bytestring(replace_gnu_args(
-                    self.args, **format_kwargs)))
-            else:
-                args = [bytestring(replace_gnu_args(arg, **format_kwargs))
-                        for arg in self.args]
-            args = shlex.split(bytestring(cmd), posix=not IS_WINDOWS) + args
-        else:
-            args = shlex.split(bytestring(cmd), posix=not IS_WINDOWS)
-
-        if self.shell:
-            # subprocess.Popen(shell=True) implies that 1st arg is the
-            # requested command, remaining args are applied to sh.
-            args = [' '.join(quote(arg) for arg in args)]
-            shell_args = format_kwargs.get('shell_args', None)
-            if shell_args and IS_WINDOWS:
-                logger.warn("shell_args won't apply for "
-                            "windows platforms: %s", shell_args)
-            elif isinstance(shell_args, string_types):
-                args += shlex.split(bytestring(replace_gnu_args(
-                    shell_args, **format_kwargs)))
-            elif shell_args:
-                args += [bytestring(replace_gnu_args(arg, **format_kwargs))
-                         for arg in shell_args]
 
-        elif format_kwargs.get('shell_args', False):
-            logger.warn("shell_args is defined but won't be used "
-                        "in this context: %s", format_kwargs['shell_args'])
+        args = template.format(self.wid, sockets_fds)
         logger.debug("process args: %s", args)
         return args
 
     def returncode(self):
         return self._worker.returncode
 
+    @property
+    def pidfd(self):
+        """The pidfd of the process, readable once it exited, or None."""
+        return self._pidfd
+
+    def close_pidfd(self):
+        # while the process is being killed, the watcher waits for the pidfd
+        # to be readable, it is closed once it is done
+        if self._pidfd is not None and not self.stopping:
+            os.close(self._pidfd)
+            self._pidfd = None
+
     @debuglog
     def poll(self):
         return self._worker.poll()
@@ -451,6 +483,14 @@ class Process(object):
         logger.debug("sending signal %s to %s" % (sig, self.pid))
         if sig == signal.CTRL_BREAK_EVENT or sig == signal.CTRL_C_EVENT:
             return os.kill(self._worker.pid, sig)
+        elif self._pidfd is not None:
+            # can't signal another process which reused the pid
+            try:
+                return signal.pidfd_send_signal(self._pidfd, sig)
+            except OSError as e:
+                if e.errno == errno.ESRCH:
+                    raise NoSuchProcess(self.pid)
+                raise
         else:
             return self._worker.send_signal(sig)
 
@@ -478,6 +518,7 @@ class Process(object):
                         pass
             finally:
                 self.close_output_channels()
+                self.close_pidfd()
         except NoSuchProcess:
             pass
 
@@ -509,23 +550,34 @@ class Process(object):
         - **mem_info2**: Virtual Memory Size in bytes (VMS).
         - **cpu**: % of cpu usage.
         - **mem**: % of memory usage.
+        - **rss**: Resident Set Size Memory in bytes, as an integer.
         - **ctime**: process CPU (user + system) time in seconds.
         - **pid**: process id.
         - **username**: user name that owns the process.
         - **nice**: process niceness (between -20 and 20)
         - **cmdline**: the command line the process was run with.
         """
-        try:
-            info = get_info(self._worker)
-        except NoSuchProcess:
-            return "No such process (stopped?)"
+        # the last sample is used when circusd samples its processes
+        info = sampler.get_info(self.pid)
+        if info is None:
+            try:
+                info = get_info(self._worker)
+            except NoSuchProcess:
+                return "No such process (stopped?)"
 
         info["age"] = self.age()
         info["started"] = self.started
         info["children"] = []
         info['wid'] = self.wid
-        for child in get_children(self._worker):
-            info["children"].append(get_info(child))
+        children = sampler.get_children(self.pid)
+        if children is not None:
+            for child in children:
+                child_info = sampler.get_info(child)
+                if child_info is not None:
+                    info["children"].append(child_info)
+        else:
+            for child in get_children(self._worker):
+                info["children"].append(get_info(child))
 
         return info
 
@@ -603,3 +655,107 @@ class Process(object):
     def __gt__(self, other):
         return self.started > other.started
 
+
+def _format_kwargs(process):
+    """Return the variables the arguments of *process* are formatted with,
+    but the wid and the sockets."""
+    format_kwargs = {
+        'shell': process.shell, 'args': process.args,
+        'env': ObjectDict(process.env.copy()),
+        'working_dir': process.working_dir, 'uid': process.uid,
+        'gid': process.gid, 'rlimits': process.rlimits,
+        'executable': process.executable, 'use_fds': process.use_fds}
+
+    if process.watcher is not None:
+        for option in process.watcher.optnames:
+            if option not in format_kwargs and \
+                    option not in ('wid', 'sockets') and \
+                    hasattr(process.watcher, option):
+                format_kwargs[option] = getattr(process.watcher, option)
+    return format_kwargs
+
+
+class ArgsTemplate(object):
+    """The arguments of the processes of a watcher, formatted with all the
+    variables but the ones that differ from a process to another: the wid
+    and the fds of the sockets.
+
+    Building the arguments of a process then only substitutes those in the
+    few arguments using them.
+    """
+    def __init__(self, process):
+        self.cmd = process.cmd
+        self.args = process.args
+        self.shell = process.shell
+
+        format_kwargs = _format_kwargs(process)
+        cmd = replace_gnu_args(process.cmd, **format_kwargs)
+        self.uses_old_wid = '$WID' in cmd or bool(process.args and
+                                                  '$WID' in process.args)
+
+        args = shlex.split(bytestring(cmd), posix=not IS_WINDOWS)
+        if process.args is not None:
+            if isinstance(process.args, string_types):
+                args += shlex.split(bytestring(replace_gnu_args(
+                    process.args, **format_kwargs)))
+            else:
+                args += [bytestring(replace_gnu_args(arg, **format_kwargs))
+                         for arg in process.args]
+
+        shell_args = format_kwargs.get('shell_args', None)
+        if not process.shell:
+            if shell_args:
+                logger.warn("shell_args is defined but won't be used "
+                            "in this context: %s", shell_args)
+            shell_args = []
+        elif shell_args and IS_WINDOWS:
+            logger.warn("shell_args won't apply for "
+                        "windows platforms: %s", shell_args)
+            shell_args = []
+        elif isinstance(shell_args, string_types):
+            shell_args = shlex.split(bytestring(replace_gnu_args(
+                shell_args, **format_kwargs)))
+        else:
+            shell_args = [bytestring(replace_gnu_args(arg, **format_kwargs))
+                          for arg in shell_args or []]
+
+        # the wid and sockets variables are left in place by replace_gnu_args
+        # and contain no spaces once substituted, so they can be replaced
+        # after the split
+        self._args = args
+        self._shell_args = shell_args
+        self._variables = [i for i, arg in enumerate(args)
+                           if _CIRCUS_VAR.search(arg)]
+        self._shell_variables = [i for i, arg in enumerate(shell_args)
+                                 if _CIRCUS_VAR.search(arg)]
+
+    def matches(self, process):
+        """Return True if the arguments of *process* are the ones this
+        template was built for.
+
+        The watcher drops its template when one of its options changes, so
+        the options aren't compared here.
+        """
+        return (process.cmd == self.cmd and process.args == self.args and
+                process.shell == self.shell)
+
+    def _substitute(self, args, variables, options):
+        args = list(args)
+        for i in variables:
+            args[i] = replace_gnu_args(args[i], **options)
+        return args
+
+    def format(self, wid, sockets_fds=None):
+        """Return the arguments of the process *wid*."""
+        options = {'wid': wid}
+        if sockets_fds is not None:
+            options['sockets'] = sockets_fds
+
+        args = self._substitute(self._args, self._variables, options)
+        if self.shell:
+            # subprocess.Popen(shell=True) implies that 1st arg is the
+            # requested command, remaining args are applied to sh.
+            args = [' '.join(quote(arg) for arg in args)]
+            args += self._substitute(self._shell_args, self._shell_variables,
+                                     options)
+        return args
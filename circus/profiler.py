@@ -0,0 +1,195 @@
+"""Opt-in instrumentation of circusd hot paths.
+
+When the profiler is enabled, circusd keeps latency histograms for the
+IOLoop lag, the controller commands, the stream redirector handlers,
+``Watcher.manage_processes`` and the hooks. The histograms can be
+fetched with the ``profile`` command and are periodically published on
+the ``arbiter.profile`` pub/sub topic.
+
+When disabled, the instrumented code paths only pay for a flag check.
+"""
+import bisect
+import time
+
+import zmq.utils.jsonapi as json
+from zmq.eventloop import ioloop
+
+from circus import logger
+
+
+# upper bounds (in seconds) of the histograms buckets, the last bucket
+# collects everything above the last bound
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10.)
+
+PROFILE_TOPIC = b'arbiter.profile'
+
+
+class Histogram(object):
+    """Log-scale histogram of durations."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def add(self, duration):
+        self.counts[bisect.bisect_left(BUCKETS, duration)] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def percentile(self, pct):
+        """Returns the upper bound of the bucket holding the percentile.
+
+        Returns the max duration if it falls in the last bucket.
+        """
+        if self.count == 0:
+            return 0.
+        rank = self.count * pct / 100.
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index < len(BUCKETS):
+                    return min(BUCKETS[index], self.max)
+                break
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count,
+                'total': self.total,
+                'avg': self.total / self.count if self.count else 0.,
+                'max': self.max,
+                'p50': self.percentile(50),
+                'p99': self.percentile(99),
+                'buckets': [[bound, count] for bound, count
+                            in zip(BUCKETS + (None,), self.counts)
+                            if count]}
+
+
+class _Timer(object):
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, time.time() - self.start)
+
+
+class _NullTimer(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Profiler(object):
+    """Collects the histograms and publishes them.
+
+    Options:
+
+    - **lag_interval**: delay in seconds between two IOLoop lag probes.
+    """
+    def __init__(self, lag_interval=0.1):
+        self.enabled = False
+        self.lag_interval = lag_interval
+        self.histograms = {}
+        self.started_at = None
+        self.loop = None
+        self.evpub_socket = None
+        self._lag_timeout = None
+        self._publisher = None
+
+    def record(self, name, duration):
+        if not self.enabled:
+            return
+        try:
+            histogram = self.histograms[name]
+        except KeyError:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(duration)
+
+    def timer(self, *parts):
+        """Returns a context manager recording the duration of its block.
+
+        The name of the histogram is built by joining *parts* with dots,
+        which is only done when the profiler is enabled.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, '.'.join(parts))
+
+    def reset(self):
+        self.histograms = {}
+        self.started_at = time.time()
+
+    def snapshot(self):
+        return {'enabled': self.enabled,
+                'since': self.started_at,
+                'stats': dict((name, histogram.to_dict()) for name, histogram
+                              in self.histograms.items())}
+
+    def start(self, loop, evpub_socket=None, interval=5.):
+        """Enables the profiler.
+
+        If *evpub_socket* is given and *interval* is not 0, a snapshot is
+        published on it every *interval* seconds.
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        self.loop = loop
+        self.evpub_socket = evpub_socket
+        self.reset()
+        self._probe_lag()
+        if evpub_socket is not None and interval > 0:
+            self._publisher = ioloop.PeriodicCallback(self.publish,
+                                                      interval * 1000, loop)
+            self._publisher.start()
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        if self._lag_timeout is not None:
+            self.loop.remove_timeout(self._lag_timeout)
+            self._lag_timeout = None
+        if self._publisher is not None:
+            self._publisher.stop()
+            self._publisher = None
+        self.loop = self.evpub_socket = None
+
+    def _probe_lag(self, deadline=None):
+        if deadline is not None:
+            self.record('loop.lag', max(0., time.time() - deadline))
+        deadline = time.time() + self.lag_interval
+        self._lag_timeout = self.loop.add_timeout(deadline, self._probe_lag,
+                                                  deadline)
+
+    def publish(self):
+        if self.evpub_socket is None or self.evpub_socket.closed:
+            return
+        data = self.snapshot()
+        data['time'] = time.time()
+        try:
+            self.evpub_socket.send_multipart([PROFILE_TOPIC, json.dumps(data)])
+        except Exception:
+            logger.exception("Could not publish the profiler stats")
+
+
+profiler = Profiler()
@@ -0,0 +1,120 @@
+"""Encoding and batching of the messages published by circusd and
+circusd-stats.
+
+A message is a multipart zmq message: its topic, then its body, a json
+mapping, or a msgpack one if that encoding is chosen. The encoding of a
+body is recognized by its first byte, so subscribers read both.
+
+When batching is enabled, the messages published one after the other on
+the same topic during a short delay are sent as a single multipart
+message: the topic followed by all their bodies. The order of the
+messages is kept.
+"""
+import time
+
+import zmq.utils.jsonapi as json
+try:
+    import msgpack
+except ImportError:
+    msgpack = None      # NOQA
+
+
+ENCODINGS = ('json', 'msgpack')
+
+
+def _is_msgpack(body):
+    # json bodies start with "{", msgpack mappings with 0x8X, 0xde or 0xdf
+    if not isinstance(body, bytes) or not body:
+        return False
+    first = ord(body[:1])
+    return first & 0xf0 == 0x80 or first in (0xde, 0xdf)
+
+
+def encode(msg, encoding='json'):
+    """Encode the mapping *msg* as a message body."""
+    if encoding == 'msgpack':
+        return msgpack.packb(msg, use_bin_type=True)
+    return json.dumps(msg)
+
+
+def decode(body):
+    """Decode a message body, whatever its encoding."""
+    if _is_msgpack(body):
+        if msgpack is None:
+            raise ValueError('msgpack is needed to decode this message')
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
+
+
+def split_frames(frames):
+    """Return the (topic, body) pairs of a received multipart message,
+    batched or not."""
+    topic = frames[0]
+    return [(topic, body) for body in frames[1:]]
+
+
+class Publisher(object):
+    """Publishes messages on a zmq PUB socket.
+
+    Options:
+
+    - **socket** -- the PUB socket.
+    - **encoding** -- the encoding of the bodies, *json* or *msgpack*.
+      (default: json)
+    - **batch_delay** -- if not 0, the messages are kept this long, in
+      seconds, and sent in batches. (default: 0)
+    - **loop** -- the IOLoop sending the batches. Needed for batching.
+    """
+    def __init__(self, socket, encoding='json', batch_delay=0., loop=None):
+        if encoding not in ENCODINGS:
+            raise ValueError('Unknown encoding %r' % encoding)
+        if encoding == 'msgpack' and msgpack is None:
+            raise NotImplementedError('The msgpack encoding needs the '
+                                      'msgpack package')
+        if batch_delay and loop is None:
+            raise ValueError('Batching needs an IOLoop')
+        self.socket = socket
+        self.encoding = encoding
+        self.batch_delay = batch_delay
+        self.loop = loop
+        # [topic, bodies...] messages waiting for the end of the batch
+        self._batch = []
+        self._flush_timeout = None
+
+    @property
+    def closed(self):
+        return self.socket.closed
+
+    def publish(self, topic, msg):
+        """Encode and publish the mapping *msg* on *topic*."""
+        self.send_multipart([topic, encode(msg, self.encoding)])
+
+    def send_multipart(self, frames):
+        """Publish the bodies in *frames*, which are already encoded,
+        on the topic in their first frame."""
+        if not self.batch_delay:
+            self.socket.send_multipart(frames)
+            return
+
+        if self._batch and self._batch[-1][0] == frames[0]:
+            self._batch[-1].extend(frames[1:])
+        else:
+            self._batch.append(list(frames))
+        if self._flush_timeout is None:
+            self._flush_timeout = self.loop.add_timeout(
+                time.time() + self.batch_delay, self.flush)
+
+    def flush(self):
+        """Send the batched messages now."""
+        if self._flush_timeout is not None:
+            self.loop.remove_timeout(self._flush_timeout)
+            self._flush_timeout = None
+        batch, self._batch = self._batch, []
+        if self.socket.closed:
+            return
+        for frames in batch:
+            self.socket.send_multipart(frames)
+
+    def close(self):
+        self.flush()
+        self.socket.close()
@@ -0,0 +1,305 @@
+"""Samples the resources used by the processes of circusd.
+
+Every *interval* seconds, the sampler reads the cpu times, memory, io
+counters and number of file descriptors of the processes, from /proc on
+Linux and with psutil elsewhere. The last samples of each process are kept
+in a ring buffer.
+
+The cpu percentage of a sample is computed from the cpu time used since
+the previous sample, so it is always relative to the same, known, window,
+whoever reads it. Reading the info of a process is done from its last
+sample, without any system call.
+
+The processes are sampled by batches of BATCH_SIZE, the loop running its
+other callbacks between two batches.
+"""
+import os
+import time
+from collections import deque, namedtuple
+
+import psutil
+from psutil import AccessDenied, NoSuchProcess
+from tornado import gen
+from tornado.concurrent import Future
+from zmq.eventloop import ioloop
+
+from circus import logger
+from circus.util import (get_info, bytes2human, memory_percent,
+                         format_cpu_time, forget_process, _oneshot)
+
+
+Sample = namedtuple('Sample', ['time', 'cpu_time', 'cpu', 'rss', 'vms',
+                               'threads', 'fds', 'read_bytes',
+                               'write_bytes'])
+
+# number of processes sampled without giving the loop back
+BATCH_SIZE = 50
+
+_PROC = '/proc'
+USE_PROC = os.path.isfile(os.path.join(_PROC, 'self', 'stat'))
+if USE_PROC:
+    _CLOCK_TICKS = float(os.sysconf('SC_CLK_TCK'))
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def _read_proc(pid):
+    """Return the (start_time, cpu_time, rss, vms, threads, fds,
+    read_bytes, write_bytes) of *pid*, read from /proc.
+
+    The start time is only meant to tell apart the processes which had the
+    same pid.
+    """
+    path = os.path.join(_PROC, str(pid))
+    try:
+        with open(os.path.join(path, 'stat'), 'rb') as f:
+            stat = f.read()
+    except (IOError, OSError):
+        raise NoSuchProcess(pid)
+
+    # the fields following the command name, which may contain spaces
+    fields = stat[stat.rindex(b')') + 2:].split()
+    cpu_time = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+    threads = int(fields[17])
+    start_time = int(fields[19])
+    vms = int(fields[20])
+    rss = int(fields[21]) * _PAGE_SIZE
+
+    # those are only readable for the processes of the same user
+    try:
+        fds = len(os.listdir(os.path.join(path, 'fd')))
+    except OSError:
+        fds = None
+
+    read_bytes = write_bytes = None
+    try:
+        with open(os.path.join(path, 'io'), 'rb') as f:
+            for line in f:
+                name, value = line.split(b':', 1)
+                if name == b'read_bytes':
+                    read_bytes = int(value)
+                elif name == b'write_bytes':
+                    write_bytes = int(value)
+    except (IOError, OSError):
+        pass
+
+    return (start_time, cpu_time, rss, vms, threads, fds, read_bytes,
+            write_bytes)
+
+
+def _read_psutil(process):
+    """Same as _read_proc(), with a psutil.Process."""
+    with _oneshot(process):
+        start_time = process.create_time()
+        cpu_time = sum(process.cpu_times()[:2])
+        rss, vms = process.memory_info()[:2]
+        threads = process.num_threads()
+        try:
+            fds = process.num_fds()
+        except (AccessDenied, AttributeError):
+            fds = None
+        try:
+            read_bytes, write_bytes = process.io_counters()[2:4]
+        except (AccessDenied, AttributeError):
+            read_bytes = write_bytes = None
+    return (start_time, cpu_time, rss, vms, threads, fds, read_bytes,
+            write_bytes)
+
+
+class Sampler(object):
+    """Samples the processes of circusd periodically.
+
+    Options:
+
+    - **history**: number of samples kept for each process.
+    """
+    def __init__(self, history=60):
+        self.enabled = False
+        self.history = history
+        self.interval = None
+        self.children = False
+        self._loop = None
+        self._get_pids = None
+        self._callback = None
+        self._sampling = False
+        # pid -> deque of Samples
+        self._samples = {}
+        # pid -> the info of the process which doesn't change, as
+        # returned by get_info()
+        self._static = {}
+        # pid -> start time of the sampled process, see _read_proc()
+        self._started = {}
+        # pid -> pids of its children, when they are sampled
+        self._children = {}
+        # pid -> psutil.Process, when /proc can't be read
+        self._processes = {}
+
+    def start(self, loop, get_pids, interval=1., history=60, children=False):
+        """Samples the pids returned by *get_pids* every *interval* seconds,
+        and their children if *children* is True."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.interval = interval
+        self.history = history
+        self.children = children
+        self._loop = loop
+        self._get_pids = get_pids
+        self._callback = ioloop.PeriodicCallback(self.sample,
+                                                 interval * 1000, loop)
+        self._callback.start()
+        self.sample()
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._callback.stop()
+        self._callback = self._loop = self._get_pids = None
+        self._samples = {}
+        self._static = {}
+        self._started = {}
+        self._children = {}
+        self._processes = {}
+
+    def _read(self, pid):
+        if USE_PROC:
+            return _read_proc(pid)
+        process = self._processes.get(pid)
+        # is_running() is False once the pid is reused
+        if process is None or not process.is_running():
+            process = self._processes[pid] = psutil.Process(pid)
+        return _read_psutil(process)
+
+    def _sample(self, pid, now):
+        values = self._read(pid)
+        started, values = values[0], values[1:]
+        if self._started.get(pid, started) != started:
+            # another process got the pid
+            self._forget(pid)
+        self._started[pid] = started
+        if pid not in self._static:
+            info = get_info(pid)
+            info.pop('children', None)
+            self._static[pid] = info
+
+        samples = self._samples.get(pid)
+        if samples is None:
+            samples = self._samples[pid] = deque(maxlen=self.history)
+        cpu = 0.
+        if samples:
+            previous = samples[-1]
+            elapsed = now - previous.time
+            if elapsed > 0:
+                cpu = round((values[0] - previous.cpu_time) * 100. / elapsed,
+                            1)
+        samples.append(Sample(now, values[0], cpu, *values[1:]))
+
+    def _pause(self, count):
+        # gives the loop back every BATCH_SIZE processes
+        if self._loop is None or not count or count % BATCH_SIZE:
+            return None
+        future = Future()
+        self._loop.add_callback(future.set_result, None)
+        return future
+
+    @gen.coroutine
+    def sample(self):
+        """Take a sample of every process."""
+        if self._sampling:
+            # the previous sample is not over yet
+            return
+        self._sampling = True
+        try:
+            yield self._sample_all()
+        finally:
+            self._sampling = False
+
+    @gen.coroutine
+    def _sample_all(self):
+        get_pids = self._get_pids
+        pids = set(get_pids())
+        children = {}
+        count = 0
+        if self.children:
+            for pid in pids:
+                pause = self._pause(count)
+                if pause is not None:
+                    yield pause
+                    if self._get_pids is not get_pids:
+                        # stopped meanwhile
+                        return
+                count += 1
+                try:
+                    children[pid] = [child.pid for child in
+                                     psutil.Process(pid).children()]
+                except NoSuchProcess:
+                    continue
+        sampled = pids.union(*children.values())
+
+        now = time.time()
+        for pid in list(sampled):
+            pause = self._pause(count)
+            if pause is not None:
+                yield pause
+                if self._get_pids is not get_pids:
+                    # stopped meanwhile
+                    return
+                now = time.time()
+            count += 1
+            try:
+                self._sample(pid, now)
+            except NoSuchProcess:
+                sampled.discard(pid)
+            except Exception:
+                logger.exception('Could not sample the process %d', pid)
+                sampled.discard(pid)
+
+        for pid in set(self._samples) - sampled:
+            self._forget(pid)
+        self._children = children
+
+    def _forget(self, pid):
+        self._samples.pop(pid, None)
+        self._static.pop(pid, None)
+        self._started.pop(pid, None)
+        self._processes.pop(pid, None)
+        forget_process(pid)
+
+    def get_samples(self, pid):
+        """Return the samples of *pid*, oldest first."""
+        return list(self._samples.get(pid, ()))
+
+    def get_children(self, pid):
+        """Return the sampled children of *pid*, or None if they are not
+        sampled."""
+        return self._children.get(pid)
+
+    def get_info(self, pid):
+        """Return the info of *pid* from its last sample, in the format of
+        circus.util.get_info(), or None if it wasn't sampled.
+
+        The info has the number of file descriptors, **fds**, and the bytes
+        read and written, **read_bytes** and **write_bytes**, on top of it.
+        They are None when they can't be read.
+        """
+        samples = self._samples.get(pid)
+        if not samples:
+            return None
+        sample = samples[-1]
+        info = dict(self._static[pid])
+        info['mem_info1'] = bytes2human(sample.rss)
+        info['mem_info2'] = bytes2human(sample.vms)
+        info['mem'] = memory_percent(sample.rss)
+        info['rss'] = sample.rss
+        info['cpu'] = sample.cpu
+        info['ctime'] = format_cpu_time(sample.cpu_time)
+        if info['create_time'] != 'N/A':
+            info['age'] = time.time() - info['create_time']
+        info['fds'] = sample.fds
+        info['read_bytes'] = sample.read_bytes
+        info['write_bytes'] = sample.write_bytes
+        info['children'] = []
+        return info
+
+
+sampler = Sampler()
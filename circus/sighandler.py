@@ -19,8 +19,9 @@ class SysHandler(object):
         if name[:3] == "SIG" and name[3] != "_"
     )
 
-    def __init__(self, controller):
+    def __init__(self, controller, handle_chld=False):
         self.controller = controller
+        self.handle_chld = handle_chld and hasattr(signal, 'SIGCHLD')
 
         # init signals
         logger.info('Registering signals...')
@@ -45,6 +46,12 @@ class SysHandler(object):
             signal.siginterrupt(signal.SIGQUIT, False)
             signal.siginterrupt(signal.SIGUSR1, False)
 
+        if self.handle_chld:
+            self._old[signal.SIGCHLD] = signal.getsignal(signal.SIGCHLD)
+            signal.signal(signal.SIGCHLD, self.signal_chld)
+            # children exit all the time, don't interrupt system calls
+            signal.siginterrupt(signal.SIGCHLD, False)
+
     def signal(self, sig, frame=None):
         signame = self.SIG_NAMES.get(sig)
         logger.info('Got signal SIG_%s' % signame.upper())
@@ -60,6 +67,12 @@ class SysHandler(object):
                 logger.error("error: %s [%s]" % (e, tb))
                 sys.exit(1)
 
+    def signal_chld(self, sig, frame=None):
+        # No logging here: this is called for every single child exit.
+        # The loop's waker is used as a self-pipe to get back to its thread
+        self.controller.loop.add_callback_from_signal(
+            self.controller.handle_sigchld)
+
     def quit(self):
         # We need to transfer the control to the loop's thread
         self.controller.loop.add_callback_from_signal(
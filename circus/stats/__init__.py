@@ -3,9 +3,11 @@
 Stats architecture:
 
  * streamer.StatsStreamer listens to circusd events and maintain a list of pids
- * collector.StatsCollector runs a pool of threads that compute stats for each
-   pid in the list. Each stat is pushed in a queue
+ * collector.ProcessesStatsCollector computes stats for all the pids in the
+   list at once, in a pool of threads, and aggregates them by watcher.
  * publisher.StatsPublisher continuously pushes those stats in a zmq PUB socket
+ * history.History keeps the stats published at several resolutions, they
+   are queried on a zmq ROUTER socket of the streamer
  * client.StatsClient is a simple subscriber that can be used to intercept the
    stream of stats.
 """
@@ -17,6 +19,7 @@ from circus.stats.streamer import StatsStreamer
 from circus.util import configure_logger
 from circus.sighandler import SysHandler
 from circus import logger
+from circus import pubsub
 from circus import util
 from circus import __version__
 
@@ -49,6 +52,30 @@ def main():
 
     parser.add_argument('--ssh', default=None, help='SSH Server')
 
+    parser.add_argument('--pool-size', dest='pool_size', type=int, default=4,
+                        help='Number of threads collecting the stats, '
+                             '0 to collect them in the main thread')
+
+    parser.add_argument('--encoding', default='json',
+                        choices=pubsub.ENCODINGS,
+                        help='Encoding of the stats published')
+
+    parser.add_argument('--batch-delay', dest='batch_delay', type=float,
+                        default=0.,
+                        help='Delay in seconds during which the stats are '
+                             'gathered to be published by batches, 0 to '
+                             'publish them one by one')
+
+    parser.add_argument('--history-size', dest='history_size', type=int,
+                        default=0,
+                        help='Memory in MB used to keep the history of the '
+                             'stats, 0 to keep none')
+
+    parser.add_argument('--historypoint',
+                        help='The ZeroMQ socket the history of the stats is '
+                             'queried on',
+                        default=util.DEFAULT_ENDPOINT_STATS_HISTORY)
+
     args = parser.parse_args()
 
     if args.version:
@@ -59,7 +86,10 @@ def main():
     configure_logger(logger, args.loglevel, args.logoutput)
 
     stats = StatsStreamer(args.endpoint, args.pubsub, args.statspoint,
-                          args.ssh)
+                          args.ssh, pool_size=args.pool_size,
+                          encoding=args.encoding, batch_delay=args.batch_delay,
+                          history_size=args.history_size * 1024 * 1024,
+                          history_endpoint=args.historypoint)
 
     # Register some sighandlers to stop the loop when killed
     for sig in SysHandler.SIGNALS:
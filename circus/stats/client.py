@@ -8,9 +8,9 @@ import time
 import logging
 
 import zmq
-import zmq.utils.jsonapi as json
 
 from circus.consumer import CircusConsumer
+from circus.pubsub import decode, split_frames
 from circus import __version__
 from circus.util import DEFAULT_ENDPOINT_STATS
 from circus.py3compat import s
@@ -37,7 +37,7 @@ class StatsClient(CircusConsumer):
                     continue
 
                 try:
-                    topic, stat = recv()
+                    frames = recv()
                 except zmq.core.error.ZMQError as e:
                     if e.errno != errno.EINTR:
                         raise
@@ -48,13 +48,47 @@ class StatsClient(CircusConsumer):
                             pass
                         continue
 
-                topic = s(topic).split('.')
-                if len(topic) == 3:
-                    __, watcher, subtopic = topic
-                    yield watcher, subtopic, json.loads(stat)
-                elif len(topic) == 2:
-                    __, watcher = topic
-                    yield watcher, None, json.loads(stat)
+                for topic, stat in split_frames(frames):
+                    topic = s(topic).split('.')
+                    stat = decode(stat)
+                    if len(topic) == 3:
+                        __, watcher, subtopic = topic
+                        yield watcher, subtopic, stat
+                    elif len(topic) == 2:
+                        __, watcher = topic
+                        yield watcher, None, stat
+
+
+def _paint_queues(addstr, line, stats):
+    """Paints the accept queues of the sockets, return the next line."""
+    addstr(line, 3, 'ADDRESS')
+    addstr(line, 28, 'QUEUED')
+    addstr(line, 48, 'BACKLOG')
+    line += 1
+
+    total = None
+    queues = []
+    for stat in stats:
+        if 'addresses' in stat:
+            total = stat
+        else:
+            queues.append((stat['queued'] or 0, stat['address'],
+                           stat['backlog']))
+
+    # the fullest first
+    queues.sort(key=lambda queue: queue[0], reverse=True)
+    for queued, address, backlog in queues:
+        addstr(line, 2, str(address))
+        addstr(line, 29, '%3d' % queued)
+        addstr(line, 49, 'N/A' if backlog is None else '%3d' % backlog)
+        line += 1
+
+    if total is not None:
+        addstr(line, 29, '%3d (sum)' % total['queued'])
+        overflows = total.get('listen_overflows')
+        if overflows is not None:
+            addstr(line, 49, '%3d overflows' % overflows)
+    return line + 2
 
 
 def _paint(stdscr, watchers=None, old_h=None, old_w=None):
@@ -103,6 +137,11 @@ def _paint(stdscr, watchers=None, old_h=None, old_w=None):
         line += 1
 
         if name == 'sockets':
+            stats = list(watchers[name].values())
+            if any('queued' in stat for stat in stats):
+                line = _paint_queues(addstr, line, stats)
+                continue
+
             addstr(line, 3, 'ADDRESS')
             addstr(line, 28, 'HITS')
 
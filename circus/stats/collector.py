@@ -1,13 +1,28 @@
 import errno
 from collections import defaultdict
+from itertools import chain
 import select
 import socket
+import struct
+import sys
+import time
 
 from circus import util
 from circus import logger
 from zmq.eventloop import ioloop
 
 
+def _read_info(pid):
+    try:
+        return util.get_info(pid)
+    except util.NoSuchProcess:
+        # the process is gone !
+        return None
+    except Exception as e:
+        logger.exception('Failed to get info for %d. %s' % (pid, str(e)))
+        return None
+
+
 class BaseStatsCollector(ioloop.PeriodicCallback):
 
     def __init__(self, streamer, name, callback_time=1., io_loop=None):
@@ -51,6 +66,12 @@ class WatcherStatsCollector(BaseStatsCollector):
         else:
             res['mem'] = sum(mem)
 
+        rss = [stat.get('rss', 'N/A') for stat in stats]
+        if 'N/A' in rss:
+            res['rss'] = 'N/A'
+        else:
+            res['rss'] = sum(rss)
+
         # finding out the older process
         ages = [stat['age'] for stat in stats if stat['age'] != 'N/A']
         if len(ages) == 0:
@@ -60,34 +81,141 @@ class WatcherStatsCollector(BaseStatsCollector):
 
         return res
 
+    def _get_info(self, pid):
+        name = None
+
+        if self.name == 'circus':
+            if pid in self.streamer.circus_pids:
+                name = self.streamer.circus_pids[pid]
+
+        info = _read_info(pid)
+        if info is None:
+            return None
+
+        info['subtopic'] = pid
+        info['name'] = name
+        return info
+
     def collect_stats(self):
         aggregate = {}
 
         # sending by pids
         for pid in self.streamer.get_pids(self.name):
-            name = None
-
-            if self.name == 'circus':
-                if pid in self.streamer.circus_pids:
-                    name = self.streamer.circus_pids[pid]
-
-            try:
-                info = util.get_info(pid)
+            info = self._get_info(pid)
+            if info is not None:
                 aggregate[pid] = info
-                info['subtopic'] = pid
-                info['name'] = name
                 yield info
-            except util.NoSuchProcess:
-                # the process is gone !
-                pass
-            except Exception as e:
-                logger.exception('Failed to get info for %d. %s' % (pid,
-                                                                    str(e)))
 
         # now sending the aggregation
         yield self._aggregate(aggregate)
 
 
+class ProcessesStatsCollector(WatcherStatsCollector):
+    """Collects the stats of the processes of all the watchers at once.
+
+    At each tick, the pids of the watchers and of circus are read once,
+    and each process is read once, in the streamer thread pool if it has
+    one. The stats of the processes and the aggregated stats of each
+    watcher are then published on its topic from the IOLoop. A tick is
+    skipped if the previous collection is still running.
+
+    The aggregated stats hold a *collector* mapping with the tick
+    **budget**, the **duration** of the last collection and the number
+    of collections that took longer than the budget (**overruns**).
+    """
+    def __init__(self, streamer, name='processes', callback_time=1.,
+                 io_loop=None):
+        super(ProcessesStatsCollector, self).__init__(
+            streamer, name, callback_time, io_loop)
+        self.budget = callback_time
+        self.duration = 0.
+        self.overruns = 0
+        self.collecting = False
+        self._started = None
+
+    def _get_watchers_pids(self):
+        watchers = {'circus': list(self.streamer.get_pids('circus'))}
+        for watcher in list(self.streamer.get_watchers()):
+            pids = list(self.streamer.get_pids(watcher))
+            if pids:
+                watchers[watcher] = pids
+        return watchers
+
+    def _callback(self):
+        if self.collecting:
+            logger.debug('Still collecting the stats of the processes')
+            return
+
+        watchers = self._get_watchers_pids()
+        pids = list(set(chain(*watchers.values())))
+        self._started = time.time()
+        if self.streamer.pool is None:
+            self._publish(watchers, [self._get_infos(pids)],
+                          time.time() - self._started)
+            return
+
+        size = max(1, min(self.streamer.pool_size, len(pids)))
+        chunks = [pids[index::size] for index in range(size)]
+        self.collecting = True
+        self.streamer.pool.map_async(
+            self._get_infos, chunks,
+            callback=lambda results: self._collected_in_pool(watchers,
+                                                             results))
+
+    def _get_infos(self, pids):
+        # called in the pool threads
+        infos = {}
+        for pid in pids:
+            info = _read_info(pid)
+            if info is not None:
+                infos[pid] = info
+        return infos
+
+    def _collected_in_pool(self, watchers, results):
+        # called in the pool result thread
+        self.io_loop.add_callback(self._publish, watchers, results,
+                                  time.time() - self._started)
+
+    def _publish(self, watchers, results, duration):
+        self.collecting = False
+        self.duration = duration
+        if duration > self.budget:
+            self.overruns += 1
+            logger.warning('Collecting the stats of the processes took '
+                           '%.3fs' % duration)
+
+        if not self._running:
+            return
+
+        infos = {}
+        for result in results:
+            infos.update(result)
+
+        publish = self.streamer.publisher.publish
+        collector = {'budget': self.budget, 'duration': self.duration,
+                     'overruns': self.overruns}
+        circus_pids = self.streamer.circus_pids
+        for watcher, pids in watchers.items():
+            logger.debug('Publishing stats about {0}'.format(watcher))
+            aggregate = {}
+            for pid in pids:
+                if pid not in infos:
+                    continue
+                # the info of a process is copied, as it could be
+                # published for several watchers
+                info = dict(infos[pid])
+                info['subtopic'] = pid
+                info['name'] = None
+                if watcher == 'circus':
+                    info['name'] = circus_pids.get(pid)
+                aggregate[pid] = info
+                publish(watcher, info)
+
+            stats = self._aggregate(aggregate)
+            stats['collector'] = collector
+            publish(watcher, stats)
+
+
 # RESOLUTION is a value in seconds that will be used
 # to determine the poller timeout of the sockets stats collector
 #
@@ -183,3 +311,98 @@ class SocketStatsCollector(BaseStatsCollector):
                 yield info
 
             yield total
+
+
+# On Linux, the tcp_info of a listening socket holds the number of
+# connections waiting to be accepted in tcpi_unacked and the backlog of the
+# socket in tcpi_sacked.
+USE_TCP_INFO = (sys.platform.startswith('linux') and
+                hasattr(socket, 'TCP_INFO'))
+# tcpi_state, 7 bytes, tcpi_rto, tcpi_ato, tcpi_snd_mss, tcpi_rcv_mss,
+# tcpi_unacked and tcpi_sacked
+_TCP_INFO = struct.Struct('B7x6I')
+_TCP_LISTEN = 10
+_NETSTAT = '/proc/net/netstat'
+
+
+def get_listen_queue(sock):
+    """Return the number of connections waiting to be accepted on the
+    listening TCP socket *sock* and its backlog, or None if *sock* is not
+    one."""
+    try:
+        info = sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO,
+                               _TCP_INFO.size)
+    except socket.error:
+        # not a TCP socket
+        return None
+    state, __, __, __, __, queued, backlog = _TCP_INFO.unpack_from(info)
+    if state != _TCP_LISTEN:
+        return None
+    return queued, backlog
+
+
+def get_listen_drops():
+    """Return the number of connections dropped by the listening sockets
+    of the system because their accept queue was full (ListenOverflows)
+    and for any reason (ListenDrops), or None if they can't be read."""
+    try:
+        with open(_NETSTAT) as f:
+            lines = f.readlines()
+    except (IOError, OSError):
+        return None
+    # the names of the counters are on a line, their values on the next one
+    for names, values in zip(lines[::2], lines[1::2]):
+        if names.startswith('TcpExt:'):
+            counters = dict(zip(names.split(), values.split()))
+            return (int(counters['ListenOverflows']),
+                    int(counters['ListenDrops']))
+    return None
+
+
+class ListenQueueStatsCollector(BaseStatsCollector):
+    """Collects the accept queues of the sockets, from their tcp_info.
+
+    The stats of a socket hold the number of connections waiting to be
+    accepted, **queued**, and its **backlog**, which are None if it is not
+    a TCP socket. A socket whose queue reaches its backlog drops the new
+    connections: its workers don't accept them fast enough.
+
+    The aggregated stats hold the sum of the queues, and the number of
+    connections the system dropped since the previous collection because
+    an accept queue was full (**listen_overflows**) and for any reason
+    (**listen_drops**). Linux doesn't count them by socket.
+    """
+    def __init__(self, streamer, name, callback_time=1., io_loop=None):
+        super(ListenQueueStatsCollector, self).__init__(
+            streamer, name, callback_time, io_loop)
+        self._drops = get_listen_drops()
+
+    def _aggregate(self, aggregate):
+        raise NotImplementedError()
+
+    def collect_stats(self):
+        sockets = self.streamer.sockets
+        if len(sockets) == 0:
+            yield None
+            return
+
+        total = {'addresses': [], 'queued': 0}
+        for sock, address, fd in sockets:
+            queue = get_listen_queue(sock)
+            if queue is None:
+                queued = backlog = None
+            else:
+                queued, backlog = queue
+                total['queued'] += queued
+            total['addresses'].append(address)
+            yield {'fd': fd, 'subtopic': fd, 'address': address,
+                   'queued': queued, 'backlog': backlog}
+
+        drops = get_listen_drops()
+        if drops is None or self._drops is None:
+            total['listen_overflows'] = total['listen_drops'] = None
+        else:
+            total['listen_overflows'] = drops[0] - self._drops[0]
+            total['listen_drops'] = drops[1] - self._drops[1]
+        self._drops = drops
+        yield total
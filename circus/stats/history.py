@@ -0,0 +1,180 @@
+"""In-memory history of the stats published by circusd-stats.
+
+The cpu, memory percentage and RSS of each watcher and of each of its
+processes are kept at three resolutions: the values published during a
+bucket of 1 second, 10 seconds and 1 minute are averaged in one slot of a
+ring buffer. The ring buffers are arrays of doubles, so a slot costs 8
+bytes and no Python object.
+
+The memory used by the buffers is capped. When a new series doesn't fit,
+the series updated the least recently are dropped, which are usually the
+ones of the processes that exited.
+"""
+import time
+from array import array
+from collections import OrderedDict
+
+from circus import logger
+from circus.py3compat import integer_types
+
+
+# (resolution in seconds, number of slots) of the ring buffers: the last
+# 10 minutes by second, the last hour by 10 seconds and the last day by
+# minute.
+RESOLUTIONS = ((1, 600), (10, 360), (60, 1440))
+METRICS = ('cpu', 'mem', 'rss')
+
+_NAN = float('nan')
+
+
+class RingBuffer(object):
+    """The average of the values added during each bucket of *resolution*
+    seconds, for the last *size* buckets."""
+
+    __slots__ = ('resolution', 'size', 'values', 'last', 'count')
+
+    def __init__(self, resolution, size):
+        self.resolution = resolution
+        self.size = size
+        self.values = array('d', [_NAN]) * size
+        # the last bucket and the number of values averaged in it
+        self.last = None
+        self.count = 0
+
+    def add(self, timestamp, value):
+        bucket = int(timestamp // self.resolution)
+        last = self.last
+        if last is not None and bucket == last:
+            index = bucket % self.size
+            self.count += 1
+            self.values[index] += (value - self.values[index]) / self.count
+            return
+        if last is not None and bucket < last:
+            # the clock went backward
+            return
+
+        # the buckets without values since the last one are emptied
+        start = bucket if last is None else last + 1
+        for missing in range(max(start, bucket - self.size + 1), bucket):
+            self.values[missing % self.size] = _NAN
+        self.values[bucket % self.size] = value
+        self.last = bucket
+        self.count = 1
+
+    def points(self, since=None):
+        """Return the [timestamp, value] of the buckets, oldest first.
+
+        The timestamp is the start of the bucket. If *since* is given, only
+        the buckets ending after it are returned.
+        """
+        if self.last is None:
+            return []
+        first = self.last - self.size + 1
+        if since is not None:
+            first = max(first, int(since // self.resolution))
+        points = []
+        values = self.values
+        for bucket in range(first, self.last + 1):
+            value = values[bucket % self.size]
+            if value == value:  # not NaN
+                points.append([bucket * self.resolution, value])
+        return points
+
+
+class History(object):
+    """Keeps the stats of the watchers and their processes.
+
+    Options:
+
+    - **max_size**: the maximum number of bytes used by the ring buffers.
+    - **resolutions**: the (resolution, size) of the ring buffers of each
+      metric.
+    - **metrics**: the stats kept.
+    """
+    def __init__(self, max_size=10 * 1024 * 1024, resolutions=RESOLUTIONS,
+                 metrics=METRICS):
+        self.max_size = max_size
+        self.resolutions = resolutions
+        self.metrics = metrics
+        # bytes used by the ring buffers of a watcher or a process
+        self.series_size = 8 * len(metrics) * sum(
+            size for resolution, size in resolutions)
+        # (watcher, pid or None) -> {metric: [RingBuffer, ...]}, the least
+        # recently updated first
+        self._series = OrderedDict()
+
+    @property
+    def size(self):
+        """The number of bytes used by the ring buffers."""
+        return len(self._series) * self.series_size
+
+    def add(self, watcher, stat, timestamp=None):
+        """Add the *stat* of *watcher* published at *timestamp*.
+
+        The stats of a process are recognized by their *subtopic*, the
+        others are the aggregated stats of the watcher.
+        """
+        values = []
+        for metric in self.metrics:
+            value = stat.get(metric)
+            if isinstance(value, (float, integer_types)):
+                values.append((metric, value))
+        if not values:
+            return
+        if timestamp is None:
+            timestamp = time.time()
+
+        key = watcher, stat.get('subtopic')
+        series = self._series.pop(key, None)
+        if series is None:
+            if self.series_size > self.max_size:
+                return
+            while self.size + self.series_size > self.max_size:
+                dropped, __ = self._series.popitem(last=False)
+                logger.debug('Dropping the history of %s', dropped)
+            series = dict((metric, [RingBuffer(resolution, size)
+                                    for resolution, size in self.resolutions])
+                          for metric in self.metrics)
+        # moved at the end, as the most recently updated
+        self._series[key] = series
+
+        for metric, value in values:
+            for ring in series[metric]:
+                ring.add(timestamp, value)
+
+    def get_series(self):
+        """Return a mapping of the watchers with a history to the pids of
+        their processes with a history."""
+        res = {}
+        for watcher, pid in self._series:
+            pids = res.setdefault(watcher, [])
+            if pid is not None:
+                pids.append(pid)
+        return res
+
+    def query(self, watcher, pid=None, resolution=None, metrics=None,
+              since=None):
+        """Return a mapping of *metrics* to the [timestamp, value] of
+        *watcher*, or of its process *pid*, at *resolution*.
+
+        The resolution defaults to the finest one and the metrics to all
+        of them. Raises KeyError if there is no history for the watcher or
+        the process, ValueError if the resolution or a metric is unknown.
+        """
+        if resolution is None:
+            index = 0
+        else:
+            resolutions = [res for res, size in self.resolutions]
+            if resolution not in resolutions:
+                raise ValueError('Unknown resolution %r' % resolution)
+            index = resolutions.index(resolution)
+
+        if metrics is None:
+            metrics = self.metrics
+        for metric in metrics:
+            if metric not in self.metrics:
+                raise ValueError('Unknown metric %r' % metric)
+
+        series = self._series[watcher, pid]
+        return dict((metric, series[metric][index].points(since))
+                    for metric in metrics)
@@ -1,28 +1,34 @@
 import zmq
-import zmq.utils.jsonapi as json
 from circus.py3compat import b
 
 from circus import logger
+from circus.pubsub import Publisher
 
 
-class StatsPublisher(object):
-    def __init__(self, stats_endpoint='tcp://127.0.0.1:5557', context=None):
+class StatsPublisher(Publisher):
+    def __init__(self, stats_endpoint='tcp://127.0.0.1:5557', context=None,
+                 encoding='json', batch_delay=0., loop=None, history=None):
         self.ctx = context or zmq.Context()
         self.destroy_context = context is None
         self.stats_endpoint = stats_endpoint
-        self.socket = self.ctx.socket(zmq.PUB)
-        self.socket.bind(self.stats_endpoint)
-        self.socket.linger = 0
+        socket = self.ctx.socket(zmq.PUB)
+        socket.bind(self.stats_endpoint)
+        socket.linger = 0
+        # the circus.stats.history.History the stats are added to
+        self.history = history
+        super(StatsPublisher, self).__init__(socket, encoding, batch_delay,
+                                             loop)
 
     def publish(self, name, stat):
+        if self.history is not None:
+            self.history.add(name, stat)
         try:
             topic = 'stat.%s' % str(name)
             if 'subtopic' in stat:
                 topic += '.%d' % stat['subtopic']
 
-            stat = json.dumps(stat)
-            logger.debug('Sending %s' % stat)
-            self.socket.send_multipart([b(topic), stat])
+            logger.debug('Sending %s', stat)
+            super(StatsPublisher, self).publish(b(topic), stat)
 
         except zmq.ZMQError:
             if self.socket.closed:
@@ -31,6 +37,10 @@ class StatsPublisher(object):
                 raise
 
     def stop(self):
+        try:
+            self.flush()
+        except zmq.ZMQError:
+            pass
         if self.destroy_context:
             self.ctx.destroy(0)
         logger.debug('Publisher stopped')
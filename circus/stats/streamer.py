@@ -1,5 +1,6 @@
 from collections import defaultdict
 from itertools import chain
+from multiprocessing.pool import ThreadPool
 import os
 import errno
 import socket
@@ -8,19 +9,33 @@ import zmq
 import zmq.utils.jsonapi as json
 from zmq.eventloop import ioloop, zmqstream
 
-from circus.commands import get_commands
+from circus.commands import get_commands, errors
+from circus.commands.base import ok, error
 from circus.client import CircusClient
-from circus.stats.collector import WatcherStatsCollector, SocketStatsCollector
+from circus.stats.collector import (ProcessesStatsCollector,
+                                    SocketStatsCollector,
+                                    ListenQueueStatsCollector, USE_TCP_INFO)
+from circus.stats.history import History
 from circus.stats.publisher import StatsPublisher
-from circus import logger
+from circus.pubsub import decode, split_frames
+from circus import logger, util
 from circus.py3compat import s
 
 
 class StatsStreamer(object):
+
+    pool = None
+
     def __init__(self, endpoint, pubsub_endoint, stats_endpoint,
-                 ssh_server=None, delay=1., loop=None):
+                 ssh_server=None, delay=1., loop=None, pool_size=4,
+                 encoding='json', batch_delay=0., history_size=0,
+                 history_endpoint=util.DEFAULT_ENDPOINT_STATS_HISTORY):
         self.topic = b'watcher.'
         self.delay = delay
+        self.pool_size = pool_size
+        # the watchers stats are collected in these threads, or in the
+        # IOLoop if pool_size is 0
+        self.pool = ThreadPool(pool_size) if pool_size > 0 else None
         self.ctx = zmq.Context()
         self.pubsub_endpoint = pubsub_endoint
         self.sub_socket = self.ctx.socket(zmq.SUB)
@@ -28,11 +43,28 @@ class StatsStreamer(object):
         self.sub_socket.connect(self.pubsub_endpoint)
         self.loop = loop or ioloop.IOLoop.instance()
         self.substream = zmqstream.ZMQStream(self.sub_socket, self.loop)
-        self.substream.on_recv(self.handle_recv)
+        self.substream.on_recv(self._handle_frames)
         self.client = CircusClient(context=self.ctx, endpoint=endpoint,
                                    ssh_server=ssh_server)
         self.cmds = get_commands()
-        self.publisher = StatsPublisher(stats_endpoint, self.ctx)
+
+        # the stats published are kept in history_size bytes and queried
+        # on history_endpoint
+        self.history = self.history_stream = None
+        if history_size > 0:
+            self.history = History(history_size)
+            self.history_endpoint = history_endpoint
+            history_socket = self.ctx.socket(zmq.ROUTER)
+            history_socket.linger = 0
+            history_socket.bind(history_endpoint)
+            self.history_stream = zmqstream.ZMQStream(history_socket,
+                                                      self.loop)
+            self.history_stream.on_recv(self.handle_history_request)
+
+        self.publisher = StatsPublisher(stats_endpoint, self.ctx,
+                                        encoding=encoding,
+                                        batch_delay=batch_delay,
+                                        loop=self.loop, history=self.history)
         self._initialize()
 
     def _initialize(self):
@@ -71,13 +103,16 @@ class StatsStreamer(object):
 
         return pids
 
-    def _add_callback(self, name, start=True, kind='watcher'):
+    def _add_callback(self, name, start=True, kind='processes'):
         logger.debug('Callback added for %s' % name)
 
-        if kind == 'watcher':
-            klass = WatcherStatsCollector
+        if kind == 'processes':
+            klass = ProcessesStatsCollector
         elif kind == 'socket':
-            klass = SocketStatsCollector
+            if USE_TCP_INFO:
+                klass = ListenQueueStatsCollector
+            else:
+                klass = SocketStatsCollector
         else:
             raise ValueError('Unknown callback kind %r' % kind)
 
@@ -103,10 +138,13 @@ class StatsStreamer(object):
 
         # getting the circus pids
         self.circus_pids = self.get_circus_pids()
-        if 'circus' not in self._callbacks:
-            self._add_callback('circus')
+
+        # the stats of the processes of all the watchers and of circus are
+        # collected together
+        if 'processes' not in self._callbacks:
+            self._add_callback('processes')
         else:
-            self._callbacks['circus'].start()
+            self._callbacks['processes'].start()
 
         # getting the initial list of sockets
         res = self.client.send_message('listsockets')
@@ -125,27 +163,16 @@ class StatsStreamer(object):
         self._add_callback('sockets', kind='socket')
 
     def stop_watcher(self, watcher):
-        for pid in self._pids[watcher]:
+        for pid in list(self._pids[watcher]):
             self.remove_pid(watcher, pid)
 
     def remove_pid(self, watcher, pid):
         if pid in self._pids[watcher]:
             logger.debug('Removing %d from %s' % (pid, watcher))
             self._pids[watcher].remove(pid)
-            if len(self._pids[watcher]) == 0:
-                logger.debug(
-                    'Stopping the periodic callback for {0}' .format(watcher))
-                self._callbacks[watcher].stop()
+            util.forget_process(pid)
 
     def _append_pid(self, watcher, pid):
-        if watcher not in self._pids or len(self._pids[watcher]) == 0:
-            logger.debug(
-                'Starting the periodic callback for {0}'.format(watcher))
-            if watcher not in self._callbacks:
-                self._add_callback(watcher)
-            else:
-                self._callbacks[watcher].start()
-
         if pid in self._pids[watcher]:
             return
         self._pids[watcher].append(pid)
@@ -176,17 +203,21 @@ class StatsStreamer(object):
                 break
         self.stop()
 
+    def _handle_frames(self, frames):
+        for topic, msg in split_frames(frames):
+            self.handle_recv([topic, msg])
+
     def handle_recv(self, data):
         """called each time circusd sends an event"""
-        # maintains a periodic callback to compute mem and cpu consumption for
-        # each pid.
+        # maintains the list of pids the mem and cpu consumption is computed
+        # for.
         logger.debug('Received an event from circusd: %s' % str(data))
         topic, msg = data
         try:
             topic = s(topic)
             watcher = topic.split('.')[1:-1][0]
             action = topic.split('.')[-1]
-            msg = json.loads(msg)
+            msg = decode(msg)
 
             if action in ('reap', 'kill'):
                 # a process was reaped
@@ -205,11 +236,64 @@ class StatsStreamer(object):
         except Exception:
             logger.exception('Failed to handle %r' % msg)
 
+    def handle_history_request(self, raw_msg):
+        """Answers the requests of the history of the stats.
+
+        The requests are sent like the circusd commands, e.g. with a
+        circus.client.CircusClient connected to the history endpoint:
+
+        - **list**: returns the watchers with a history and the pids of
+          their processes with a history, under *series*.
+        - **history**: returns the history of the *watcher*, or of its
+          process *pid*, at a *resolution* of 1, 10 or 60 seconds, under
+          *series*: a mapping of the *metrics* (cpu, mem and rss by
+          default) to their [timestamp, value]. If *since* is given, only
+          the values after this timestamp are returned.
+        """
+        cid, msg = raw_msg
+        mid = None
+        try:
+            msg = json.loads(msg)
+            mid = msg.get('id')
+            command = msg.get('command')
+            props = msg.get('properties', {})
+            if command == 'list':
+                resp = ok({'series': self.history.get_series()})
+            elif command == 'history':
+                if 'watcher' not in props:
+                    raise ValueError('the watcher is missing')
+                series = self.history.query(
+                    props['watcher'], props.get('pid'),
+                    props.get('resolution'), props.get('metrics'),
+                    props.get('since'))
+                resp = ok({'series': series})
+            else:
+                resp = error('unknown command: %r' % command,
+                             errno=errors.UNKNOWN_COMMAND)
+        except ValueError as e:
+            resp = error(str(e), errno=errors.MESSAGE_ERROR)
+        except KeyError as e:
+            resp = error('no history for %s' % e,
+                         errno=errors.MESSAGE_ERROR)
+        except Exception as e:
+            logger.exception('Failed to handle %r' % msg)
+            resp = error(str(e))
+
+        resp['id'] = mid
+        self.history_stream.send_multipart([cid, json.dumps(resp)])
+
     def stop(self):
         # stop all the periodic callbacks running
         for callback in self._callbacks.values():
             callback.stop()
 
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+        if self.history_stream is not None:
+            self.history_stream.close()
+
         self.loop.stop()
         self.ctx.destroy(0)
         self.publisher.stop()
@@ -3,10 +3,12 @@ import random
 
 from datetime import datetime
 try:
-    from queue import Queue, Empty
+    from queue import Queue, Empty, Full
 except ImportError:
-    from Queue import Queue, Empty  # NOQA
+    from Queue import Queue, Empty, Full  # NOQA
 
+from circus import logger
+from circus.fixed_threading import Thread
 from circus.util import resolve_name
 from circus.stream.file_stream import FileStream
 from circus.stream.file_stream import WatchedFileStream  # flake8: noqa
@@ -120,6 +122,118 @@ class FancyStdoutStream(StdoutStream):
                 self.out.flush()
 
 
+_STOP = object()
+
+
+class AsyncStream(object):
+    """
+    Writes to another stream from a dedicated thread, so slow disks don't
+    block circusd.
+
+    The data is pushed on a bounded queue consumed by the writer thread.
+    When the queue is full, **overflow** decides what happens:
+
+      - block: wait for the writer thread to make some room (default)
+      - drop_oldest: drop the oldest data of the queue
+      - drop_newest: drop the data being written
+
+    The number of dropped chunks and bytes are kept in the **dropped** and
+    **dropped_bytes** attributes.
+
+    **stream_class** is the class of the wrapped stream, as it would be
+    given to the *class* option, and all the other options are passed to
+    it. Here is an example: ::
+
+      [watcher:foo]
+      cmd = python -m myapp.server
+      stdout_stream.class = AsyncStream
+      stdout_stream.stream_class = FileStream
+      stdout_stream.filename = /var/log/circus/out.log
+      stdout_stream.queue_size = 1000
+      stdout_stream.overflow = drop_oldest
+    """
+    overflow_policies = ('block', 'drop_oldest', 'drop_newest')
+
+    def __init__(self, stream_class='FileStream', queue_size=1000,
+                 overflow='block', **kwargs):
+        if overflow not in self.overflow_policies:
+            raise ValueError("Invalid overflow policy: %r" % overflow)
+        kwargs['class'] = stream_class
+        self.stream = get_stream(kwargs)
+        self.overflow = overflow
+        self.dropped = 0
+        self.dropped_bytes = 0
+        self._dropping = False
+        self._queue = Queue(int(queue_size))
+        self._thread = None
+        self._start()
+
+    def _start(self):
+        self._thread = Thread(target=self._run,
+                              name='circus-stream-writer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            data = self._queue.get()
+            if data is _STOP:
+                break
+            try:
+                self.stream(data)
+            except Exception:
+                logger.exception("Could not write to %r", self.stream)
+
+    def _drop(self, data):
+        self.dropped += 1
+        self.dropped_bytes += len(data['data'])
+        if not self._dropping:
+            self._dropping = True
+            logger.warning("The queue of %r is full, dropping data",
+                           self.stream)
+
+    def __call__(self, data):
+        if self._thread is None:
+            # closed
+            self._drop(data)
+            return
+
+        if self.overflow == 'block':
+            self._queue.put(data)
+        elif self.overflow == 'drop_newest':
+            try:
+                self._queue.put_nowait(data)
+            except Full:
+                self._drop(data)
+                return
+        else:
+            while True:
+                try:
+                    self._queue.put_nowait(data)
+                    break
+                except Full:
+                    try:
+                        self._drop(self._queue.get_nowait())
+                    except Empty:
+                        pass
+        self._dropping = False
+
+    def open(self):
+        if hasattr(self.stream, 'open'):
+            self.stream.open()
+        if self._thread is None:
+            self._start()
+
+    def close(self):
+        """Writes the queued data, then closes the wrapped stream."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        if hasattr(self.stream, 'close'):
+            self.stream.close()
+
+
 def get_stream(conf, reload=False):
     if conf:
         # we can have 'stream' or 'class' or 'filename'
@@ -1,12 +1,176 @@
 import errno
 import os
+import sys
 import tempfile
 from datetime import datetime
 import time as time_
 import re
+import struct
 from stat import ST_DEV, ST_INO, ST_MTIME
 from circus import logger
+from circus.fixed_threading import Thread, RLock
 from circus.py3compat import s, PY2
+from circus.util import to_bool
+
+try:
+    import ctypes
+    import ctypes.util
+except ImportError:
+    ctypes = None
+
+
+# inotify(7) constants
+_IN_ATTRIB = 0x00000004
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_CLOEXEC = 0o2000000
+# struct inotify_event, without its name
+_EVENT = struct.Struct('iIII')
+
+
+def _load_libc():
+    if ctypes is None or not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+_libc = _load_libc()
+
+
+class _Inotify(object):
+    """An inotify instance shared by all the watched file streams.
+
+    A single thread reads its events and flags the watches they concern, so
+    checking for changes doesn't need any system call.
+    """
+
+    def __init__(self):
+        self.fd = _libc.inotify_init1(_IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        # wd -> the _FileChanges using it, as watching a file twice returns
+        # the same wd
+        self._watches = {}
+        self._lock = RLock()
+        # set when the events can't be read anymore, the files are then
+        # checked each time
+        self.failed = False
+        self._thread = Thread(target=self._run, name='circus-inotify')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def add_watch(self, filename, changes):
+        # unlinking a file we keep open only changes its links count, hence
+        # IN_ATTRIB
+        mask = _IN_MOVE_SELF | _IN_DELETE_SELF | _IN_ATTRIB
+        if not isinstance(filename, bytes):
+            filename = filename.encode(sys.getfilesystemencoding())
+        # locked until the watch is registered, so none of its events is
+        # missed
+        with self._lock:
+            wd = _libc.inotify_add_watch(self.fd, filename, mask)
+            if wd < 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err))
+            self._watches.setdefault(wd, set()).add(changes)
+        return wd
+
+    def rm_watch(self, wd, changes):
+        with self._lock:
+            watchers = self._watches.get(wd, set())
+            watchers.discard(changes)
+            if watchers or wd not in self._watches:
+                return
+            del self._watches[wd]
+            # fails if the kernel already removed the watch of a deleted
+            # file, which is fine
+            _libc.inotify_rm_watch(self.fd, wd)
+
+    def _run(self):
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except OSError as err:
+                if err.errno == errno.EINTR:
+                    continue
+                logger.exception("Could not read the inotify events, the "
+                                 "watched files are checked at each write")
+                with self._lock:
+                    self.failed = True
+                    self._changed_all()
+                return
+            self._handle_events(data)
+
+    def _handle_events(self, data):
+        with self._lock:
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size + length
+                if mask & _IN_Q_OVERFLOW:
+                    # events were lost, any file may have changed
+                    logger.warning("The inotify event queue overflowed")
+                    self._changed_all()
+                    continue
+                for changes in self._watches.get(wd, ()):
+                    changes._changed = True
+
+    def _changed_all(self):
+        for watchers in self._watches.values():
+            for changes in watchers:
+                changes._changed = True
+
+
+_inotify = None
+_inotify_lock = RLock()
+
+
+def _get_inotify():
+    global _inotify
+    with _inotify_lock:
+        if _inotify is None or _inotify.failed:
+            _inotify = _Inotify()
+    return _inotify
+
+
+class _FileChanges(object):
+    """Reports the moves, deletions and attribute changes of a file."""
+
+    def __init__(self, filename):
+        self._inotify = _get_inotify()
+        self._changed = False
+        self._wd = None
+        self.watch(filename)
+
+    def watch(self, filename):
+        wd = self._inotify.add_watch(filename, self)
+        # the file was replaced, its watch is not needed anymore
+        if self._wd is not None and self._wd != wd:
+            self._inotify.rm_watch(self._wd, self)
+        self._wd = wd
+
+    def changed(self):
+        if self._inotify.failed:
+            return True
+        if not self._changed:
+            return False
+        self._changed = False
+        return True
+
+    def close(self):
+        if self._wd is not None:
+            self._inotify.rm_watch(self._wd, self)
+            self._wd = None
 
 
 class _FileStreamBase(object):
@@ -151,7 +315,8 @@ class FileStream(_FileStreamBase):
 
 
 class WatchedFileStream(_FileStreamBase):
-    def __init__(self, filename=None, time_format=None, **kwargs):
+    def __init__(self, filename=None, time_format=None, check_interval=0,
+                 use_inotify=False, **kwargs):
         '''
         File writer handler which writes output to a file, allowing an external
         log rotation process to handle rotation, like Python's
@@ -164,6 +329,11 @@ class WatchedFileStream(_FileStreamBase):
         You may also configure the timestamp format as defined by
         datetime.strftime.
 
+        By default, the file is checked before each write. If check_interval
+        is given, it's checked at most every check_interval seconds. If
+        use_inotify is True and inotify is available, the file is only
+        checked once inotify reported a change.
+
         Here is an example: ::
 
           [watcher:foo]
@@ -171,10 +341,54 @@ class WatchedFileStream(_FileStreamBase):
           stdout_stream.class = WatchedFileStream
           stdout_stream.filename = /var/log/circus/out.log
           stdout_stream.time_format = %Y-%m-%d %H:%M:%S
+          stdout_stream.check_interval = 0.5
+          stdout_stream.use_inotify = True
         '''
         super(WatchedFileStream, self).__init__(filename, time_format)
+        self._check_interval = float(check_interval)
+        self._next_check = 0
+        self._use_inotify = to_bool(use_inotify) and _libc is not None
+        self._changes = None
         self.dev, self.ino = -1, -1
         self._statfile()
+        self._watch()
+
+    def _watch(self):
+        if not self._use_inotify:
+            return
+        try:
+            if self._changes is None:
+                self._changes = _FileChanges(self._filename)
+            else:
+                self._changes.watch(self._filename)
+        except OSError as err:
+            logger.warning("Could not watch %s with inotify: %s",
+                           self._filename, err)
+            self._use_inotify = False
+            if self._changes is not None:
+                self._changes.close()
+                self._changes = None
+
+    def open(self):
+        super(WatchedFileStream, self).open()
+        self._statfile()
+        self._watch()
+
+    def close(self):
+        super(WatchedFileStream, self).close()
+        if self._changes is not None:
+            self._changes.close()
+            self._changes = None
+
+    def _should_check(self):
+        if self._check_interval > 0:
+            now = time_.time()
+            if now < self._next_check:
+                return False
+            self._next_check = now + self._check_interval
+        if self._changes is not None:
+            return self._changes.changed()
+        return True
 
     def _statfile(self):
         stb = os.fstat(self._file.fileno())
@@ -193,12 +407,14 @@ class WatchedFileStream(_FileStreamBase):
     def __call__(self, data):
         # stat the filename to see if the file we opened still exists. If the
         # ino or dev doesn't match, we need to open a new file handle
-        dev, ino = self._statfilename()
-        if dev != self.dev or ino != self.ino:
-            self._file.flush()
-            self._file.close()
-            self._file = self._open()
-            self._statfile()
+        if self._should_check():
+            dev, ino = self._statfilename()
+            if dev != self.dev or ino != self.ino:
+                self._file.flush()
+                self._file.close()
+                self._file = self._open()
+                self._statfile()
+                self._watch()
 
         self.write_data(data)
 
@@ -1,9 +1,23 @@
 import errno
 import os
 import sys
+import time
+from collections import OrderedDict
 
 from zmq.eventloop import ioloop
 
+from circus.profiler import profiler
+
+
+if hasattr(os, 'readv'):
+    def _readinto(fd, buf):
+        return os.readv(fd, [buf])
+else:  # Python 2
+    def _readinto(fd, buf):
+        data = os.read(fd, len(buf))
+        buf[:len(data)] = data
+        return len(data)
+
 
 class Redirector(object):
 
@@ -19,30 +33,86 @@ class Redirector(object):
                 if events == ioloop.IOLoop.ERROR:
                     self.redirector.remove_fd(fd)
                 return
-            try:
-                data = os.read(fd, self.redirector.buffer)
-                if len(data) == 0:
-                    self.redirector.remove_fd(fd)
-                else:
-                    datamap = {'data': data, 'pid': self.process.pid,
-                               'name': self.name}
-                    self.redirector.redirect[self.name](datamap)
-            except IOError as ex:
-                if ex.args[0] != errno.EAGAIN:
-                    raise
+            with profiler.timer('redirector', self.process.name, self.name):
                 try:
-                    sys.exc_clear()
-                except Exception:
-                    pass
+                    if self.redirector.flush_interval > 0:
+                        self._read_buffered(fd)
+                    else:
+                        self._read(fd)
+                except IOError as ex:
+                    if ex.args[0] != errno.EAGAIN:
+                        raise
+                    try:
+                        sys.exc_clear()
+                    except Exception:
+                        pass
+
+        def _read(self, fd):
+            data = os.read(fd, self.redirector.buffer)
+            if len(data) == 0:
+                self.redirector.remove_fd(fd)
+            else:
+                datamap = {'data': data, 'pid': self.process.pid,
+                           'name': self.name}
+                self.redirector.redirect[self.name](datamap)
+
+        def _read_buffered(self, fd):
+            read_buffer = self.redirector.read_buffer
+            size = _readinto(fd, read_buffer)
+            if size == 0:
+                self.redirector.remove_fd(fd)
+            else:
+                self.redirector.buffer_data(self.name, self.process.pid,
+                                            memoryview(read_buffer)[:size])
 
     def __init__(self, stdout_redirect, stderr_redirect, buffer=1024,
-                 loop=None):
+                 loop=None, flush_interval=0, flush_size=65536):
+        """Redirects the processes outputs to the streams.
+
+        *buffer* is the maximum size of a read. If *flush_interval* is
+        not 0, the data read from a process stream is buffered and written
+        at most *flush_interval* seconds later, or as soon as
+        *flush_size* bytes are waiting, instead of being written on each
+        read.
+        """
         self.running = False
         self.pipes = {}
         self._active = {}
         self.redirect = {'stdout': stdout_redirect, 'stderr': stderr_redirect}
         self.buffer = buffer
         self.loop = loop or ioloop.IOLoop.instance()
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.read_buffer = bytearray(buffer) if flush_interval > 0 else None
+        # (stream name, pid) -> data waiting to be written
+        self._pending = OrderedDict()
+        self._flush_timeout = None
+
+    def buffer_data(self, stream_name, pid, data):
+        key = stream_name, pid
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = bytearray()
+        pending += data
+        if len(pending) >= self.flush_size:
+            del self._pending[key]
+            self._write(stream_name, pid, pending)
+        elif self._flush_timeout is None:
+            self._flush_timeout = self.loop.add_timeout(
+                time.time() + self.flush_interval, self.flush)
+
+    def flush(self):
+        """Writes all the buffered data to the streams."""
+        if self._flush_timeout is not None:
+            self.loop.remove_timeout(self._flush_timeout)
+            self._flush_timeout = None
+        pending, self._pending = self._pending, OrderedDict()
+        for (stream_name, pid), data in pending.items():
+            self._write(stream_name, pid, data)
+
+    def _write(self, stream_name, pid, data):
+        datamap = {'data': bytes(data), 'pid': pid, 'name': stream_name}
+        self.redirect[stream_name](datamap)
 
     def _start_one(self, fd, stream_name, process, pipe):
         if fd not in self._active:
@@ -72,6 +142,7 @@ class Redirector(object):
         for fd in list(self._active.keys()):
             count += self._stop_one(fd)
         self.running = False
+        self.flush()
         return count
 
     @staticmethod
@@ -107,6 +178,7 @@ class Redirector(object):
         process.redirected = False
 
     def change_stream(self, stream_name, redirect_writer):
+        self.flush()
         self.redirect[stream_name] = redirect_writer
 
     def get_stream(self, stream_name):
@@ -543,6 +543,9 @@ class FakeProcess(object):
     def stop(self):
         pass
 
+    def close_pidfd(self):
+        pass
+
 
 class MagicMockFuture(mock.MagicMock, tornado.concurrent.Future):
 
@@ -18,7 +18,7 @@ from circus.tests.support import (TestCircus, async_poll_for, truncate_file,
                                   EasyTestSuite, skipIf, get_ioloop, SLEEP,
                                   PYTHON)
 from circus.util import (DEFAULT_ENDPOINT_DEALER, DEFAULT_ENDPOINT_MULTICAST,
-                         DEFAULT_ENDPOINT_SUB)
+                         DEFAULT_ENDPOINT_SUB, IS_WINDOWS, tornado_sleep)
 from circus.tests.support import (MockWatcher, has_circusweb,
                                   poll_for_callable, get_available_port)
 from circus import watcher as watcher_mod
@@ -531,6 +531,35 @@ class TestTrainer(TestCircus):
         os.remove(datafile)
         yield self.stop_arbiter()
 
+    @tornado.testing.gen_test
+    def test_plugins_host(self):
+        fd, datafile = mkstemp()
+        os.close(fd)
+
+        plugin = 'circus.tests.test_arbiter.Plugin'
+        plugins = [{'use': plugin, 'name': 'plugin:one', 'file': datafile},
+                   {'use': plugin, 'name': 'plugin:two', 'file': datafile}]
+
+        yield self.start_arbiter(graceful_timeout=0, plugins=plugins,
+                                 arbiter_kw={'plugins_host': True},
+                                 loop=get_ioloop())
+        self.assertEqual([watcher.name for watcher in self.arbiter.watchers
+                          if watcher.name.startswith('plugin:')],
+                         ['plugin:host'])
+
+        res = yield async_poll_for(datafile, 'PLUGIN STARTEDPLUGIN STARTED')
+        self.assertTrue(res)
+        truncate_file(datafile)
+
+        cli = AsyncCircusClient(endpoint=self.arbiter.endpoint)
+        yield cli.send_message('incr', name='test')
+
+        # both plugins receive the event
+        res = yield async_poll_for(datafile, 'test:spawntest:spawn')
+        self.assertTrue(res)
+        os.remove(datafile)
+        yield self.stop_arbiter()
+
     @tornado.testing.gen_test
     def test_singleton(self):
         # yield self._stop_runners()
@@ -690,6 +719,58 @@ class TestArbiter(TestCircus):
         finally:
             yield arbiter.stop()
 
+    @tornado.testing.gen_test
+    def test_watchers_and_pids_index(self):
+        controller = "tcp://127.0.0.1:%d" % get_available_port()
+        sub = "tcp://127.0.0.1:%d" % get_available_port()
+        arbiter = Arbiter([], controller, sub, loop=get_ioloop(),
+                          check_delay=-1)
+        foo = arbiter.add_watcher('foo', SLEEP % 5)
+        bar = arbiter.add_watcher('bar', SLEEP % 5, priority=2)
+        try:
+            yield arbiter.start()
+            self.assertEqual(arbiter.iter_watchers(), [bar, foo])
+            self.assertEqual(arbiter.iter_watchers(reverse=False),
+                             [foo, bar])
+
+            # changing a priority invalidates the cached order
+            foo.priority = 3
+            self.assertEqual(arbiter.iter_watchers(), [foo, bar])
+
+            pid, process = list(foo.processes.items())[0]
+            self.assertEqual(arbiter.get_process(pid), (foo, process))
+
+            yield arbiter.rm_watcher('foo')
+            self.assertEqual(arbiter.iter_watchers(), [bar])
+            self.assertEqual(arbiter.get_process(pid), (None, None))
+        finally:
+            yield arbiter.stop()
+
+    @skipIf(IS_WINDOWS, "SIGCHLD is not available on Windows")
+    @tornado.testing.gen_test
+    def test_reap_on_sigchld(self):
+        controller = "tcp://127.0.0.1:%d" % get_available_port()
+        sub = "tcp://127.0.0.1:%d" % get_available_port()
+        # no periodic check: only SIGCHLD can get the process respawned
+        arbiter = Arbiter([], controller, sub, loop=get_ioloop(),
+                          check_delay=-1, reap_on_sigchld=True)
+        watcher = arbiter.add_watcher('foo', SLEEP % 5)
+        try:
+            yield arbiter.start()
+            old_pids = list(watcher.processes)
+            self.assertEqual(len(old_pids), 1)
+            os.kill(old_pids[0], signal.SIGKILL)
+
+            start = time()
+            while time() - start < 5:
+                if list(watcher.processes) != old_pids:
+                    break
+                yield tornado_sleep(0.1)
+            self.assertEqual(len(watcher.processes), 1)
+            self.assertNotEqual(list(watcher.processes), old_pids)
+        finally:
+            yield arbiter.stop()
+
 
 @skipIf(not has_circusweb(), 'Tests for circus-web')
 class TestCircusWeb(TestCircus):
@@ -4,9 +4,11 @@ import tempfile
 from tornado.testing import gen_test
 from tornado.gen import coroutine, Return
 
+from circus.exc import CallError
 from circus.util import tornado_sleep
-from circus.tests.support import TestCircus, EasyTestSuite, IS_WINDOWS
-from circus.client import make_message
+from circus.tests.support import (TestCircus, EasyTestSuite, IS_WINDOWS,
+                                  get_available_port)
+from circus.client import AsyncCircusClient, make_message
 from circus.stream import QueueStream
 
 
@@ -77,6 +79,73 @@ class TestClient(TestCircus):
                          self.arbiter.pubsub_endpoint)
         yield self.stop_arbiter()
 
+    @gen_test
+    def test_batch(self):
+        yield self.start_arbiter()
+        resp = yield self.cli.send_batch([
+            make_message("numwatchers"),
+            make_message("unknown"),
+            make_message("incr", name="test", waiting=True),
+            make_message("numprocesses", name="test"),
+            make_message("quit")])
+        self.assertEqual(resp['status'], 'ok')
+        results = resp['results']
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0]['numwatchers'], 1)
+        self.assertEqual(results[1]['status'], 'error')
+        self.assertEqual(results[2]['numprocesses'], 2)
+        self.assertEqual(results[3]['numprocesses'], 2)
+        self.assertEqual(results[4]['status'], 'error')
+
+        resp = yield self.cli.send_batch([make_message("list"),
+                                          make_message("list", name="test")],
+                                         concurrent=True)
+        watchers, pids = resp['results']
+        self.assertEqual(watchers['watchers'], ['test'])
+        self.assertEqual(len(pids['pids']), 2)
+        yield self.stop_arbiter()
+
+    @gen_test
+    def test_batch_synchronized_commands(self):
+        yield self.start_arbiter()
+        # each incr holds the arbiter lock until its processes are spawned
+        resp = yield self.cli.send_batch([
+            make_message("incr", name="test"),
+            make_message("incr", name="test"),
+            make_message("numprocesses", name="test")])
+        self.assertEqual(resp['status'], 'ok')
+        first, second, numprocesses = resp['results']
+        self.assertEqual(first['status'], 'ok')
+        self.assertEqual(second['status'], 'ok')
+        self.assertEqual(numprocesses['numprocesses'], 3)
+        yield self.stop_arbiter()
+
+    @gen_test
+    def test_concurrent_calls(self):
+        yield self.start_arbiter()
+        messages = [make_message("numwatchers"),
+                    make_message("list", name="test")] * 10
+        # the replies are matched to their call, whatever their order
+        resps = yield [self.cli.call(message) for message in messages]
+        for index, resp in enumerate(resps):
+            if index % 2:
+                self.assertEqual(len(resp['pids']), 1)
+            else:
+                self.assertEqual(resp['numwatchers'], 1)
+        self.assertEqual(self.cli._pending, {})
+        yield self.stop_arbiter()
+
+    @gen_test
+    def test_timeout(self):
+        endpoint = 'tcp://127.0.0.1:%d' % get_available_port()
+        client = AsyncCircusClient(endpoint=endpoint, timeout=0.1)
+        try:
+            with self.assertRaises(CallError):
+                yield client.call(make_message("numwatchers"))
+            self.assertEqual(client._pending, {})
+        finally:
+            client.stop()
+
 
 _, tmp_filename = tempfile.mkstemp(prefix='test_hook')
 
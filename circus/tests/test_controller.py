@@ -1,5 +1,6 @@
 from circus.tests.support import TestCase, EasyTestSuite, get_ioloop
 from circus.controller import Controller
+from circus.exc import ConflictError
 from circus.util import DEFAULT_ENDPOINT_MULTICAST
 from circus import logger
 import circus.controller
@@ -71,5 +72,44 @@ class TestController(TestCase):
             controller._init_multicast_endpoint()
             self.assertTrue(mock_logger_warn.called)
 
+    def test_handle_sigchld(self):
+        arbiter = mock.MagicMock()
+        loop = mock.MagicMock()
+        controller = Controller('endpoint', None, mock.sentinel.context,
+                                loop, arbiter)
+        controller.started = True
+
+        controller.handle_sigchld()
+        self.assertEqual(arbiter.manage_reaped_watchers.call_count, 1)
+        self.assertTrue(loop.add_future.called)
+
+        # a pass is running: delay the next one until it's over
+        controller.handle_sigchld()
+        self.assertEqual(arbiter.manage_reaped_watchers.call_count, 1)
+        self.assertTrue(controller._pending_sigchld)
+
+        controller._manage_watchers_cb(None)
+        self.assertEqual(arbiter.manage_reaped_watchers.call_count, 2)
+        self.assertFalse(controller._pending_sigchld)
+
+    def test_handle_sigchld_conflict(self):
+        arbiter = mock.MagicMock()
+        arbiter.manage_reaped_watchers.side_effect = ConflictError()
+        loop = mock.MagicMock()
+        controller = Controller('endpoint', None, mock.sentinel.context,
+                                loop, arbiter)
+        controller.started = True
+
+        controller.handle_sigchld()
+        controller.handle_sigchld()
+        self.assertTrue(controller._pending_sigchld)
+        # a single retry is scheduled
+        self.assertEqual(loop.add_timeout.call_count, 1)
+
+        arbiter.manage_reaped_watchers.side_effect = None
+        controller._retry_sigchld()
+        self.assertFalse(controller._pending_sigchld)
+        self.assertEqual(arbiter.manage_reaped_watchers.call_count, 3)
+
 
 test_suite = EasyTestSuite(__name__)
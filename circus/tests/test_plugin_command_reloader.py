@@ -1,9 +1,17 @@
 from mock import patch
+from tornado.concurrent import Future
 
+from circus.exc import CallError
 from circus.plugins.command_reloader import CommandReloader
 from circus.tests.support import TestCircus, EasyTestSuite
 
 
+def _future(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
 class TestCommandReloader(TestCircus):
 
     def setup_os_mock(self, realpath, mtime):
@@ -15,13 +23,13 @@ class TestCommandReloader(TestCircus):
         return os_mock
 
     def setup_call_mock(self, watcher_name):
-        patcher = patch.object(CommandReloader, 'call')
+        patcher = patch.object(CommandReloader, 'call_async')
         call_mock = patcher.start()
         self.addCleanup(patcher.stop)
         call_mock.side_effect = [
-            {'watchers': [watcher_name]},
-            {'options': {'cmd': watcher_name}},
-            None,
+            _future({'watchers': [watcher_name]}),
+            _future({'options': {'cmd': watcher_name}}),
+            _future(None),
         ]
         return call_mock
 
@@ -85,6 +93,18 @@ class TestCommandReloader(TestCircus):
 
         self.assertNotIn('foo', plugin.cmd_files)
 
+    @patch.object(CommandReloader, 'call_async')
+    def test_look_after_call_error(self, call_mock):
+        call_mock.side_effect = CallError('Timed out.')
+        plugin = self.make_plugin(CommandReloader, active=True)
+        plugin.cmd_files = {'foo': {'path': 'foo', 'mtime': 1}}
+
+        future = plugin.look_after()
+
+        self.assertIsNone(future.result())
+        self.assertEqual(plugin.cmd_files, {'foo': {'path': 'foo',
+                                                    'mtime': 1}})
+
     def test_handle_recv_implemented(self):
         plugin = self.make_plugin(CommandReloader, active=True)
         plugin.handle_recv('whatever')
@@ -1,7 +1,11 @@
 from mock import patch
+from tornado.concurrent import Future
+from tornado.testing import gen_test
 
+from circus.exc import CallError
 from circus.tests.support import TestCircus, EasyTestSuite
 from circus.plugins.flapping import Flapping
+from circus.util import tornado_sleep
 
 
 class TestFlapping(TestCircus):
@@ -72,4 +76,55 @@ class TestFlapping(TestCircus):
         cast_mock.assert_called_with("stop", name="test")
         self.assertTrue(timer_mock.called)
 
+    @gen_test
+    def test_reaps_during_the_conf_lookup(self):
+        plugin = self.make_plugin(Flapping, active=True)
+        options = Future()
+        with patch.object(Flapping, 'call_async',
+                          return_value=options) as call_mock, \
+                patch.object(Flapping, 'cast') as cast_mock, \
+                patch('circus.plugins.flapping.Timer'):
+            # a burst of reaps before the conf of the watcher is known
+            for i in range(3):
+                plugin.handle_recv(['watcher.test.reap', None])
+            options.set_result({'options': {}})
+            yield tornado_sleep(0.01)
+
+        self.assertEqual(call_mock.call_count, 1)
+        cast_mock.assert_called_once_with("stop", name="test")
+        self.assertEqual(plugin.timelines['test'], [])
+        self.assertEqual(plugin.tries['test'], 1)
+
+    @patch.object(Flapping, 'cast')
+    @patch('circus.plugins.flapping.Timer')
+    @patch.object(Flapping, 'call_async', side_effect=CallError('Timed out.'))
+    def test_failed_conf_lookup_is_retried(self, call_mock, timer_mock,
+                                           cast_mock):
+        plugin = self.make_plugin(Flapping, active=True)
+        plugin.handle_recv(['watcher.test.reap', None])
+        # the defaults are used meanwhile, without being cached
+        plugin.handle_recv(['watcher.test.reap', None])
+        self.assertEqual(call_mock.call_count, 1)
+        self.assertFalse('test' in plugin.configs)
+
+        # looked up again once the retry delay is over, which doubles
+        failures, retry_at = plugin._failed_lookups['test']
+        with patch('circus.plugins.flapping.time') as time_mock:
+            time_mock.time.return_value = retry_at
+            plugin.handle_recv(['watcher.test.reap', None])
+        self.assertEqual(call_mock.call_count, 2)
+        self.assertEqual(plugin._failed_lookups['test'][0], 2)
+        self.assertEqual(plugin._failed_lookups['test'][1] - retry_at, 2)
+
+        options = Future()
+        options.set_result({'options': {'flapping.attempts': '5'}})
+        call_mock.side_effect = None
+        call_mock.return_value = options
+        with patch('circus.plugins.flapping.time') as time_mock:
+            time_mock.time.return_value = retry_at + 2
+            plugin.handle_recv(['watcher.test.reap', None])
+        self.assertEqual(plugin.configs['test'], {'attempts': 5})
+        self.assertFalse('test' in plugin._failed_lookups)
+
+
 test_suite = EasyTestSuite(__name__)
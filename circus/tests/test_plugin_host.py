@@ -0,0 +1,85 @@
+from circus.plugins import CircusPlugin, get_host_config, _cfg2str, _str2cfg
+from circus.plugins.host import PluginHost
+from circus.tests.support import TestCircus, EasyTestSuite
+
+
+class Recorder(CircusPlugin):
+    name = 'recorder'
+
+    def __init__(self, *args, **config):
+        super(Recorder, self).__init__(*args, **config)
+        self.received = []
+        self.stopped = False
+
+    def handle_init(self):
+        if self.config.get('fail_init'):
+            raise ValueError('init')
+
+    def handle_recv(self, data):
+        if self.config.get('fail_recv'):
+            raise ValueError('recv')
+        self.received.append(data)
+
+    def handle_stop(self):
+        self.stopped = True
+
+
+recorder = 'circus.tests.test_plugin_host.Recorder'
+
+
+class TestPluginHost(TestCircus):
+
+    def _make_host(self, *plugins):
+        config = get_host_config(plugins)
+        # as circus-plugin gets it
+        config = _str2cfg(_cfg2str(config))
+        del config['use']
+        return self.make_plugin(PluginHost, **config)
+
+    def test_get_host_config(self):
+        config = get_host_config([
+            {'name': 'plugin:one', 'use': recorder, 'priority': 2},
+            {'use': recorder}])
+        self.assertEqual(config['name'], 'plugin:host')
+        self.assertEqual(config['use'], 'circus.plugins.host.PluginHost')
+        self.assertEqual(config['plugins'], 'one,' + recorder)
+        self.assertEqual(config['one.priority'], 2)
+        self.assertEqual(config['%s.use' % recorder], recorder)
+        self.assertRaises(ImportError, get_host_config, [{'use': 'bad.Foo'}])
+
+    def test_plugins_are_loaded_with_their_config(self):
+        host = self._make_host(
+            {'name': 'plugin:one', 'use': recorder, 'key': 'a'},
+            {'name': 'plugin:one.two', 'use': recorder, 'key': 'b'},
+            {'name': 'plugin:off', 'use': recorder, 'active': 'false'},
+            # raises in its constructor without a watcher option
+            {'name': 'plugin:bad',
+             'use': 'circus.plugins.resource_watcher.ResourceWatcher'})
+
+        one, two = host.plugins
+        self.assertEqual(one.config['key'], 'a')
+        self.assertEqual(one.config['name'], 'plugin:one')
+        self.assertEqual(two.config['key'], 'b')
+        for plugin in host.plugins:
+            self.assertIs(plugin.loop, host.loop)
+            self.assertIs(plugin._pending, host._pending)
+
+    def test_errors_are_isolated(self):
+        host = self._make_host(
+            {'name': 'plugin:init', 'use': recorder, 'fail_init': '1'},
+            {'name': 'plugin:recv', 'use': recorder, 'fail_recv': '1'},
+            {'name': 'plugin:ok', 'use': recorder})
+        failing_recv, ok = host.plugins[1:]
+
+        host.handle_init()
+        self.assertEqual(host.plugins, [failing_recv, ok])
+
+        host.handle_recv([b'watcher.test.spawn', b'{}'])
+        self.assertEqual(ok.received, [[b'watcher.test.spawn', b'{}']])
+
+        host.handle_stop()
+        self.assertTrue(failing_recv.stopped)
+        self.assertTrue(ok.stopped)
+
+
+test_suite = EasyTestSuite(__name__)
@@ -3,6 +3,7 @@ import time
 import os
 import warnings
 
+from mock import patch
 from tornado.testing import gen_test
 
 from circus.tests.support import TestCircus, Process, async_poll_for
@@ -70,4 +71,62 @@ class TestPluginWatchDog(TestCircus):
         self.assertEqual(len(pid_status), 0, pid_status)
         yield self.stop_arbiter()
 
+
+class TestWatchDogHeartbeats(TestCircus):
+
+    def _make_watchdog(self):
+        plugin = self.make_plugin(WatchDog, port=0, loop_rate=0.1,
+                                  max_count=1)
+        plugin._bind_socket()
+        self.addCleanup(plugin.sock.close)
+        plugin.starting = False
+        for pid in ('1', '2', '3'):
+            plugin._add_pid(pid, 'test')
+        return plugin
+
+    def _send(self, plugin, *messages):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            for message in messages:
+                sock.sendto(message, plugin.sock.getsockname())
+        finally:
+            sock.close()
+        time.sleep(0.05)
+
+    def test_all_the_heartbeats_are_read(self):
+        plugin = self._make_watchdog()
+        before = time.time()
+        self._send(plugin, b'1;0', b'garbage', b'4;0', b'\xff', b'2;0')
+
+        plugin.receive_udp_socket(plugin.sock.fileno(), None)
+
+        self.assertTrue(plugin.pid_status['1']['last_activity'] >= before)
+        self.assertTrue(plugin.pid_status['2']['last_activity'] >= before)
+        self.assertTrue(plugin.pid_status['3']['last_activity'] < before)
+
+    @patch.object(WatchDog, 'cast')
+    def test_only_the_expired_pids_are_killed(self, cast_mock):
+        plugin = self._make_watchdog()
+        time.sleep(0.1)
+        self._send(plugin, b'1;0')
+        plugin.receive_udp_socket(plugin.sock.fileno(), None)
+
+        plugin.look_after()
+
+        self.assertEqual(sorted(call[1]['pid']
+                                for call in cast_mock.call_args_list),
+                         [2, 3])
+        self.assertEqual(list(plugin.pid_status), ['1'])
+        self.assertEqual(len(plugin._deadlines), 1)
+
+        # the pid is not checked again before its new deadline
+        cast_mock.reset_mock()
+        plugin.look_after()
+        self.assertFalse(cast_mock.called)
+
+        time.sleep(0.15)
+        plugin.look_after()
+        cast_mock.assert_called_with('kill', name='test', pid=1)
+        self.assertEqual(plugin.pid_status, {})
+
 test_suite = EasyTestSuite(__name__)
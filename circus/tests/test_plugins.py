@@ -0,0 +1,65 @@
+import zmq
+import zmq.utils.jsonapi as json
+from tornado import gen
+
+from circus.exc import CallError
+from circus.plugins import CircusPlugin
+from circus.tests.support import TestCircus, EasyTestSuite
+from circus.tests.support import get_available_port
+
+
+class DummyPlugin(CircusPlugin):
+    name = 'dummy'
+
+    def handle_recv(self, data):
+        pass
+
+
+class TestCallAsync(TestCircus):
+
+    def _make_plugin(self, **config):
+        endpoint = 'tcp://127.0.0.1:%d' % get_available_port()
+        plugin = self.make_plugin(DummyPlugin, endpoint=endpoint, **config)
+        plugin.initialize()
+        self.addCleanup(plugin.context.destroy)
+
+        # plays circusd
+        circusd = plugin.context.socket(zmq.ROUTER)
+        circusd.linger = 0
+        circusd.rcvtimeo = 5000
+        circusd.bind(endpoint)
+        return plugin, circusd
+
+    def test_replies_are_matched_to_their_call(self):
+        plugin, circusd = self._make_plugin()
+
+        @gen.coroutine
+        def run():
+            futures = [plugin.call_async('status', name=name)
+                       for name in ('a', 'b')]
+            requests = [circusd.recv_multipart() for name in ('a', 'b')]
+            # the second call is answered first
+            for cid, msg in reversed(requests):
+                msg = json.loads(msg)
+                resp = {'id': msg['id'], 'status': 'ok',
+                        'name': msg['properties']['name']}
+                circusd.send_multipart([cid, json.dumps(resp)])
+            res = yield futures
+            raise gen.Return(res)
+
+        res = plugin.loop.run_sync(run, timeout=5)
+        self.assertEqual([resp['name'] for resp in res], ['a', 'b'])
+        self.assertEqual(plugin._pending, {})
+
+    def test_timeout(self):
+        plugin, circusd = self._make_plugin(call_timeout=0.1)
+
+        @gen.coroutine
+        def run():
+            yield plugin.call_async('status', name='a')
+
+        self.assertRaises(CallError, plugin.loop.run_sync, run, timeout=5)
+        self.assertEqual(plugin._pending, {})
+
+
+test_suite = EasyTestSuite(__name__)
@@ -1,8 +1,14 @@
 import os
+import signal
+import subprocess
 import sys
 import time
 
+import tornado
+
+from circus import process as process_module
 from circus.process import Process
+from circus.watcher import Watcher
 from circus.tests.support import (TestCircus, skipIf, EasyTestSuite, DEBUG,
                                   poll_for, IS_WINDOWS, PYTHON, SLEEP)
 import circus.py3compat
@@ -38,6 +44,14 @@ finally:
 
 """
 
+SESSION = """\
+import os, sys
+
+with open(sys.argv[1], 'w') as f:
+    f.write('%s END' % (os.getsid(0) == os.getpid()))
+"""
+
+
 # On Windows we can't close the fds if we are
 # redirecting stdout or stderr
 USE_FDS = IS_WINDOWS
@@ -69,6 +83,24 @@ class TestProcess(TestCircus):
         finally:
             process.stop()
 
+    @skipIf(not hasattr(os, 'pidfd_open'), "pidfds are not supported")
+    def test_pidfd(self):
+        process = Process('test', 1, PYTHON,
+                          args=['-c', 'import time; time.sleep(10)'])
+        try:
+            pidfd = process.pidfd
+            self.assertTrue(pidfd is not None)
+            process.send_signal(signal.SIGKILL)
+            process.wait(5)
+            self.assertFalse(process.is_alive())
+            # the pid was reaped, it can't be signaled anymore
+            self.assertRaises(process_module.NoSuchProcess,
+                              process.send_signal, signal.SIGTERM)
+        finally:
+            process.stop()
+        self.assertEqual(process.pidfd, None)
+        self.assertRaises(OSError, os.fstat, pidfd)
+
     @skipIf(DEBUG, 'Py_DEBUG=1')
     @skipIf(IS_WINDOWS, "RLIMIT is not supported on Windows")
     def test_rlimits(self):
@@ -140,6 +172,48 @@ class TestProcess(TestCircus):
         self.assertEqual(['yeah', 'macchiato'], p3.format_args())
         os.environ.pop('coffee_type')
 
+    def test_args_template(self):
+        watcher = Watcher('test', 'make-me-a-coffee',
+                          args='$(circus.wid) --fd $(circus.sockets.cup) '
+                               '--type $(circus.env.type)',
+                          env={'type': 'macchiato'}, use_sockets=USE_FDS)
+
+        def format_args(wid):
+            process = Process('test', wid, watcher.cmd, watcher.args,
+                              spawn=False, env=watcher.env, watcher=watcher,
+                              use_fds=USE_FDS)
+            return process.format_args(sockets_fds={'cup': wid + 10})
+
+        self.assertEqual(format_args(1), ['make-me-a-coffee', '1', '--fd',
+                                          '11', '--type', 'macchiato'])
+        template = watcher._args_template
+        self.assertEqual(format_args(2), ['make-me-a-coffee', '2', '--fd',
+                                          '12', '--type', 'macchiato'])
+        self.assertTrue(watcher._args_template is template)
+
+        # the options are formatted again once one of them changes
+        watcher.set_opt('env', {'type': 'latte'})
+        self.assertEqual(format_args(3), ['make-me-a-coffee', '3', '--fd',
+                                          '13', '--type', 'latte'])
+        self.assertFalse(watcher._args_template is template)
+
+    @tornado.testing.gen_test
+    def test_args_template_numprocesses_changed(self):
+        watcher = Watcher('test', 'make-me-a-coffee',
+                          args='--cups $(circus.numprocesses)',
+                          numprocesses=1)
+
+        def format_args():
+            process = Process('test', 1, watcher.cmd, watcher.args,
+                              spawn=False, env=watcher.env, watcher=watcher,
+                              use_fds=USE_FDS)
+            return process.format_args()
+
+        self.assertEqual(format_args(), ['make-me-a-coffee', '--cups', '1'])
+        # as Watcher.incr does
+        yield watcher.set_numprocesses(2)
+        self.assertEqual(format_args(), ['make-me-a-coffee', '--cups', '2'])
+
     @skipIf(DEBUG, 'Py_DEBUG=1')
     @skipIf(_nose_no_s(), 'Nose runs without -s')
     @skipIf(IS_WINDOWS, "Streams not supported")
@@ -201,5 +275,42 @@ class TestProcess(TestCircus):
         p1 = Process('test', '1', cmd, args=args, gid=gid, uid=uid)
         p1.stop()
 
+    @skipIf(not process_module.SPAWN_WITHOUT_PREEXEC,
+            "Popen can't replace the preexec function")
+    def test_popen_options(self):
+        process = Process('test', 1, PYTHON, spawn=False)
+        self.assertEqual(process._get_popen_options(),
+                         {'start_new_session': True,
+                          'stdin': subprocess.DEVNULL})
+
+        # these need python code in the child
+        process = Process('test', 1, PYTHON, spawn=False,
+                          rlimits={'nofile': 20})
+        self.assertEqual(process._get_popen_options(), None)
+        process = Process('test', 1, PYTHON, spawn=False,
+                          close_child_stdout=True)
+        self.assertEqual(process._get_popen_options(), None)
+
+        process = Process('test', 1, PYTHON, spawn=False,
+                          pipe_stdout=False, close_child_stdout=True)
+        self.assertEqual(process._get_popen_options()['stdout'],
+                         subprocess.DEVNULL)
+
+    @skipIf(not process_module.SPAWN_WITHOUT_PREEXEC,
+            "Popen can't replace the preexec function")
+    def test_spawn_without_preexec(self):
+        script_file = self.get_tmpfile(SESSION)
+        output_file = self.get_tmpfile()
+
+        process = Process('test', 1, PYTHON, args=[script_file, output_file])
+        try:
+            poll_for(output_file, 'END')
+        finally:
+            process.stop()
+
+        # the process leads its own session
+        with open(output_file) as f:
+            self.assertEqual(f.read(), 'True END')
+
 
 test_suite = EasyTestSuite(__name__)
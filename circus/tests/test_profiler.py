@@ -0,0 +1,94 @@
+import mock
+from tornado.testing import gen_test
+
+from circus.commands.profile import Profile
+from circus.profiler import Histogram, Profiler, PROFILE_TOPIC
+from circus.tests.support import TestCircus, EasyTestSuite
+from circus.util import tornado_sleep
+
+
+class HistogramTest(TestCircus):
+
+    def test_add(self):
+        histogram = Histogram()
+        for duration in (0.00005, 0.0003, 0.0003, 0.02, 42.):
+            histogram.add(duration)
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.max, 42.)
+        self.assertAlmostEqual(histogram.total, 42.02065)
+
+        stats = histogram.to_dict()
+        self.assertEqual(stats['buckets'],
+                         [[0.0001, 1], [0.0005, 2], [0.025, 1], [None, 1]])
+        self.assertEqual(stats['p50'], 0.0005)
+        self.assertEqual(stats['p99'], 42.)
+
+    def test_empty(self):
+        stats = Histogram().to_dict()
+        self.assertEqual(stats['count'], 0)
+        self.assertEqual(stats['avg'], 0.)
+        self.assertEqual(stats['p99'], 0.)
+        self.assertEqual(stats['buckets'], [])
+
+
+class ProfilerTest(TestCircus):
+
+    def test_disabled(self):
+        profiler = Profiler()
+        with profiler.timer('hook', 'test', 'before_start'):
+            pass
+        profiler.record('loop.lag', 1.)
+        self.assertEqual(profiler.histograms, {})
+
+    @gen_test
+    def test_start_stop(self):
+        profiler = Profiler(lag_interval=0.01)
+        socket = mock.Mock(closed=False)
+        profiler.start(self.io_loop, socket, interval=0.05)
+        try:
+            with profiler.timer('hook', 'test', 'before_start'):
+                pass
+            yield tornado_sleep(0.2)
+        finally:
+            profiler.stop()
+
+        stats = profiler.snapshot()['stats']
+        self.assertEqual(stats['hook.test.before_start']['count'], 1)
+        self.assertTrue(stats['loop.lag']['count'] > 1)
+        self.assertTrue(socket.send_multipart.called)
+        topic, _ = socket.send_multipart.call_args[0][0]
+        self.assertEqual(topic, PROFILE_TOPIC)
+
+        # no more recording once stopped
+        profiler.record('loop.lag', 1.)
+        self.assertEqual(profiler.snapshot()['stats'], stats)
+
+
+class ProfileCommandTest(TestCircus):
+
+    def test_execute(self):
+        cmd = Profile()
+        with mock.patch('circus.commands.profile.profiler',
+                        Profiler()) as profiler:
+            profiler.enabled = True
+            profiler.record('command.list', 0.002)
+
+            props = cmd.message(reset=True)['properties']
+            res = cmd.execute(None, props)
+            self.assertEqual(res['stats']['command.list']['count'], 1)
+            self.assertEqual(cmd.execute(None, {})['stats'], {})
+
+    def test_console_msg(self):
+        cmd = Profile()
+        histogram = Histogram()
+        histogram.add(0.002)
+        msg = {'status': 'ok', 'enabled': True,
+               'stats': {'command.list': histogram.to_dict()}}
+        self.assertEqual(cmd.console_msg(msg),
+                         'command.list: count=1 avg=2.000ms p50<=2.000ms '
+                         'p99<=2.000ms max=2.000ms')
+        msg = {'status': 'ok', 'enabled': False, 'stats': {}}
+        self.assertIn('disabled', cmd.console_msg(msg))
+
+
+test_suite = EasyTestSuite(__name__)
@@ -0,0 +1,67 @@
+import mock
+
+import zmq.utils.jsonapi as json
+
+from circus import pubsub
+from circus.pubsub import Publisher, decode, encode, split_frames
+from circus.tests.support import TestCase, EasyTestSuite, skipIf
+
+
+class TestEncoding(TestCase):
+
+    def test_json(self):
+        body = encode({'pid': 1})
+        self.assertEqual(body, json.dumps({'pid': 1}))
+        self.assertEqual(decode(body), {'pid': 1})
+
+    @skipIf(pubsub.msgpack is None, "msgpack is not installed")
+    def test_msgpack(self):
+        msg = dict(('key%d' % i, i) for i in range(20))
+        for msg in ({'pid': 1}, msg):
+            body = encode(msg, 'msgpack')
+            self.assertNotEqual(body, json.dumps(msg))
+            self.assertEqual(decode(body), msg)
+
+    def test_split_frames(self):
+        self.assertEqual(split_frames([b'topic', b'1']), [(b'topic', b'1')])
+        self.assertEqual(split_frames([b'topic', b'1', b'2']),
+                         [(b'topic', b'1'), (b'topic', b'2')])
+
+
+class TestPublisher(TestCase):
+
+    def test_unbatched(self):
+        socket = mock.MagicMock()
+        publisher = Publisher(socket)
+        publisher.publish(b'topic', {'pid': 1})
+        socket.send_multipart.assert_called_with([b'topic',
+                                                  json.dumps({'pid': 1})])
+
+    def test_batches_keep_the_order(self):
+        socket = mock.MagicMock()
+        socket.closed = False
+        loop = mock.MagicMock()
+        publisher = Publisher(socket, batch_delay=0.1, loop=loop)
+        for topic, body in ((b'spawn', b'1'), (b'spawn', b'2'),
+                            (b'reap', b'1'), (b'spawn', b'3')):
+            publisher.send_multipart([topic, body])
+
+        self.assertFalse(socket.send_multipart.called)
+        self.assertEqual(loop.add_timeout.call_count, 1)
+
+        publisher.flush()
+        self.assertEqual([call[0][0] for call in
+                          socket.send_multipart.call_args_list],
+                         [[b'spawn', b'1', b'2'], [b'reap', b'1'],
+                          [b'spawn', b'3']])
+
+        # the next message starts a new batch
+        publisher.send_multipart([b'reap', b'2'])
+        self.assertEqual(loop.add_timeout.call_count, 2)
+
+    def test_unknown_encoding(self):
+        self.assertRaises(ValueError, Publisher, mock.MagicMock(),
+                          encoding='xml')
+
+
+test_suite = EasyTestSuite(__name__)
@@ -0,0 +1,86 @@
+import os
+import time
+
+import mock
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from circus.sampler import Sampler, BATCH_SIZE
+from circus.tests.support import TestCase, EasyTestSuite
+
+
+class TestSampler(TestCase):
+
+    def _get_sampler(self, pids):
+        sampler = Sampler(history=3)
+        sampler._get_pids = lambda: pids
+        return sampler
+
+    def test_cpu_is_computed_between_samples(self):
+        sampler = self._get_sampler([os.getpid()])
+        self.assertEqual(sampler.get_info(os.getpid()), None)
+
+        sampler.sample()
+        start = time.time()
+        while time.time() - start < 0.2:
+            pass
+        sampler.sample()
+
+        info = sampler.get_info(os.getpid())
+        self.assertEqual(info['pid'], os.getpid())
+        self.assertTrue(info['cpu'] > 10, info['cpu'])
+        for key in ('mem_info1', 'mem_info2', 'mem', 'ctime', 'username',
+                    'cmdline', 'age', 'fds'):
+            self.assertTrue(key in info)
+
+        # the reads don't change the samples
+        self.assertEqual(sampler.get_info(os.getpid())['cpu'], info['cpu'])
+
+    def test_history_and_exited_processes(self):
+        pids = [os.getpid()]
+        sampler = self._get_sampler(pids)
+        for i in range(5):
+            sampler.sample()
+        self.assertEqual(len(sampler.get_samples(os.getpid())), 3)
+
+        pids.pop()
+        sampler.sample()
+        self.assertEqual(sampler.get_samples(os.getpid()), [])
+        self.assertEqual(sampler.get_info(os.getpid()), None)
+
+    def test_reused_pid(self):
+        pid = os.getpid()
+        sampler = self._get_sampler([pid])
+        sampler.sample()
+        sampler.sample()
+        sampler._static[pid]['cmdline'] = 'exited process'
+
+        # the process which had the pid started at another time
+        sampler._started[pid] -= 1
+        sampler.sample()
+        self.assertEqual(len(sampler.get_samples(pid)), 1)
+        self.assertNotEqual(sampler.get_info(pid)['cmdline'],
+                            'exited process')
+
+    def test_processes_are_sampled_by_batches(self):
+        loop = IOLoop()
+        self.addCleanup(loop.close)
+        sampler = self._get_sampler(range(1, 2 * BATCH_SIZE + 1))
+        sampler._loop = loop
+        order = []
+
+        @gen.coroutine
+        def run():
+            loop.add_callback(order.append, 'callback')
+            yield sampler.sample()
+
+        with mock.patch.object(sampler, '_sample',
+                               lambda pid, now: order.append(pid)):
+            loop.run_sync(run)
+
+        self.assertEqual(len(order), 2 * BATCH_SIZE + 1)
+        # the loop ran its callbacks after the first batch
+        self.assertEqual(order.index('callback'), BATCH_SIZE)
+
+
+test_suite = EasyTestSuite(__name__)
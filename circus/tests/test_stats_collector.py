@@ -1,13 +1,18 @@
 import socket
 import time
 from collections import defaultdict
+from multiprocessing.pool import ThreadPool
 from circus.fixed_threading import Thread
 
 from zmq.eventloop import ioloop
 
 from circus.stats import collector as collector_module
-from circus.stats.collector import SocketStatsCollector, WatcherStatsCollector
-from circus.tests.support import TestCase, EasyTestSuite
+from circus.stats.collector import (SocketStatsCollector,
+                                    ListenQueueStatsCollector,
+                                    USE_TCP_INFO,
+                                    WatcherStatsCollector,
+                                    ProcessesStatsCollector)
+from circus.tests.support import TestCase, EasyTestSuite, skipIf
 
 
 class TestCollector(TestCase):
@@ -48,8 +53,13 @@ class TestCollector(TestCase):
                 return self.circus_pids
 
             def get_pids(this, name):
+                if name == 'circus':
+                    return list(self.circus_pids)
                 return self.pids[name]
 
+            def get_watchers(this):
+                return self.pids.keys()
+
             @property
             def publisher(this):
                 return this
@@ -136,6 +146,62 @@ class TestCollector(TestCase):
         finally:
             collector_module.util.get_info = old_info
 
+    def _collect_processes_stats(self, pool_size):
+        def _get_info(pid):
+            if pid == 2355:
+                raise collector_module.util.NoSuchProcess(pid)
+            # longer than the tick budget
+            time.sleep(0.15)
+            return {'pid': pid, 'cpu': 1., 'mem': 2., 'age': 3.}
+
+        self.pids['firefox'] = [2353, 2354, 2355]
+        self.pids['chrome'] = []
+        self.circus_pids = {1234: 'circusd'}
+        streamer = self._get_streamer()
+        streamer.stats = []
+        streamer.pool_size = pool_size
+        streamer.pool = ThreadPool(pool_size) if pool_size else None
+        loop = ioloop.IOLoop()
+        old_info = collector_module.util.get_info
+        collector_module.util.get_info = _get_info
+        try:
+            collector = ProcessesStatsCollector(streamer, callback_time=0.1,
+                                                io_loop=loop)
+            collector.start()
+            loop.add_timeout(time.time() + 0.5, loop.stop)
+            loop.start()
+            collector.stop()
+        finally:
+            collector_module.util.get_info = old_info
+            if streamer.pool is not None:
+                streamer.pool.terminate()
+            loop.close()
+        return streamer.stats
+
+    def test_processes_stats(self):
+        stats = self._collect_processes_stats(pool_size=2)
+
+        # ticks are skipped while a collection is running
+        self.assertTrue(0 < len(stats) <= 15)
+
+        # circus, then firefox, chrome has no process
+        self.assertEqual(stats[0]['name'], 'circusd')
+        self.assertEqual(stats[1]['pid'], [1234])
+        self.assertEqual([stat['subtopic'] for stat in stats[2:4]],
+                         [2353, 2354])
+        aggregate = stats[4]
+        self.assertEqual(sorted(aggregate['pid']), [2353, 2354])
+        self.assertEqual(aggregate['mem'], 4.)
+        self.assertEqual(aggregate['collector']['budget'], 0.1)
+        self.assertTrue(aggregate['collector']['duration'] > 0.1)
+        self.assertEqual(aggregate['collector']['overruns'], 1)
+
+    def test_processes_stats_without_pool(self):
+        stats = self._collect_processes_stats(pool_size=0)
+        self.assertTrue(len(stats) >= 5)
+        self.assertEqual(sorted(stat['subtopic'] for stat in stats[:5]
+                                if 'subtopic' in stat), [1234, 2353, 2354])
+
     def test_collector_aggregation(self):
         collector = WatcherStatsCollector(self._get_streamer(), 'firefox')
         aggregate = {}
@@ -194,4 +260,21 @@ class TestCollector(TestCase):
         self.assertTrue(stat['fd'] in self.fds)
         self.assertTrue(stat['reads'] > 1)
 
+    @skipIf(not USE_TCP_INFO, 'tcp_info is only read on Linux')
+    def test_listenqueuestats(self):
+        collector = ListenQueueStatsCollector(self._get_streamer(), 'sockets')
+        stats = list(collector.collect_stats())
+        self.assertEqual(len(stats), 11)
+
+        # each client waits to be accepted
+        for stat in stats[:-1]:
+            self.assertTrue(stat['fd'] in self.fds)
+            self.assertEqual(stat['queued'], 1)
+            self.assertEqual(stat['backlog'], 1)
+
+        total = stats[-1]
+        self.assertEqual(total['queued'], 10)
+        self.assertEqual(len(total['addresses']), 10)
+        self.assertTrue(total['listen_overflows'] >= 0)
+
 test_suite = EasyTestSuite(__name__)
@@ -0,0 +1,103 @@
+import mock
+
+import zmq.utils.jsonapi as json
+
+from circus.stats.history import History, RingBuffer
+from circus.stats.streamer import StatsStreamer
+from circus.tests.support import TestCase, EasyTestSuite
+
+
+class TestRingBuffer(TestCase):
+
+    def test_values_are_averaged_by_bucket(self):
+        ring = RingBuffer(10, 3)
+        for timestamp, value in ((100, 1.), (105, 3.), (110, 4.)):
+            ring.add(timestamp, value)
+        self.assertEqual(ring.points(), [[100, 2.], [110, 4.]])
+        self.assertEqual(ring.points(since=110), [[110, 4.]])
+
+    def test_old_buckets_are_overwritten(self):
+        ring = RingBuffer(1, 3)
+        for timestamp in range(5):
+            ring.add(timestamp, timestamp)
+        self.assertEqual(ring.points(), [[2, 2.], [3, 3.], [4, 4.]])
+
+        # the buckets without values are skipped
+        ring.add(6, 6.)
+        self.assertEqual(ring.points(), [[4, 4.], [6, 6.]])
+        ring.add(20, 20.)
+        self.assertEqual(ring.points(), [[20, 20.]])
+
+        # values in the past are ignored
+        ring.add(10, 10.)
+        self.assertEqual(ring.points(), [[20, 20.]])
+
+
+class TestHistory(TestCase):
+
+    def test_add_and_query(self):
+        history = History(resolutions=((1, 10), (10, 10)))
+        for timestamp in range(100, 112):
+            history.add('web', {'subtopic': 12, 'cpu': 1., 'mem': 'N/A',
+                                'rss': 1024}, timestamp)
+            history.add('web', {'pid': [12], 'cpu': 1., 'rss': 1024},
+                        timestamp)
+        history.add('sockets', {'fd': 3, 'reads': 1})
+
+        self.assertEqual(history.get_series(), {'web': [12]})
+        series = history.query('web', 12, resolution=10)
+        self.assertEqual(series['rss'], [[100, 1024.], [110, 1024.]])
+        self.assertEqual(series['mem'], [])
+        self.assertEqual(len(history.query('web', metrics=['cpu'])['cpu']),
+                         10)
+
+        self.assertRaises(KeyError, history.query, 'web', 13)
+        self.assertRaises(ValueError, history.query, 'web', resolution=5)
+        self.assertRaises(ValueError, history.query, 'web', metrics=['io'])
+
+    def test_least_recently_updated_are_dropped(self):
+        history = History(resolutions=((1, 10),), metrics=('rss',))
+        history.max_size = history.series_size * 2
+        history.add('web', {'subtopic': 1, 'rss': 1}, 100)
+        history.add('web', {'subtopic': 2, 'rss': 1}, 100)
+        history.add('web', {'subtopic': 1, 'rss': 1}, 101)
+        history.add('web', {'subtopic': 3, 'rss': 1}, 101)
+        self.assertEqual(sorted(history.get_series()['web']), [1, 3])
+        self.assertEqual(history.size, history.max_size)
+
+
+class TestHistoryRequests(TestCase):
+
+    def _request(self, command, **props):
+        streamer = StatsStreamer.__new__(StatsStreamer)
+        streamer.history = History()
+        streamer.history.add('web', {'subtopic': 12, 'rss': 1024}, 100)
+        streamer.history_stream = mock.MagicMock()
+        msg = {'id': 'mid', 'command': command, 'properties': props}
+        streamer.handle_history_request([b'cid', json.dumps(msg)])
+
+        frames = streamer.history_stream.send_multipart.call_args[0][0]
+        self.assertEqual(frames[0], b'cid')
+        resp = json.loads(frames[1])
+        self.assertEqual(resp['id'], 'mid')
+        return resp
+
+    def test_list(self):
+        resp = self._request('list')
+        self.assertEqual(resp['status'], 'ok')
+        self.assertEqual(resp['series'], {'web': [12]})
+
+    def test_history(self):
+        resp = self._request('history', watcher='web', pid=12,
+                             metrics=['rss'])
+        self.assertEqual(resp['status'], 'ok')
+        self.assertEqual(resp['series'], {'rss': [[100, 1024.]]})
+
+    def test_errors(self):
+        self.assertEqual(self._request('history')['status'], 'error')
+        self.assertEqual(self._request('history', watcher='db')['status'],
+                         'error')
+        self.assertEqual(self._request('restart')['status'], 'error')
+
+
+test_suite = EasyTestSuite(__name__)
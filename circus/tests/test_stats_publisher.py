@@ -36,4 +36,21 @@ class TestStatsPublisher(TestCase):
         stat = {'subtopic': 1, 'foo': 'bar'}
         publisher.publish('foobar', stat)
 
+    def test_publish_batched(self):
+        publisher = StatsPublisher(batch_delay=1., loop=mock.MagicMock())
+        publisher.socket.close()
+        publisher.socket = mock.MagicMock()
+        publisher.socket.closed = False
+        stats = [{'subtopic': 1, 'foo': 'bar'}, {'subtopic': 1, 'foo': 'baz'},
+                 {'foo': 'aggregated'}]
+        for stat in stats:
+            publisher.publish('foobar', stat)
+        publisher.flush()
+
+        # the stats of a process keep their topic
+        self.assertEqual(publisher.socket.send_multipart.call_args_list, [
+            mock.call([b'stat.foobar.1', json.dumps(stats[0]),
+                       json.dumps(stats[1])]),
+            mock.call([b'stat.foobar', json.dumps(stats[2])])])
+
 test_suite = EasyTestSuite(__name__)
@@ -91,12 +91,15 @@ class TestStatsStreamer(TestCircus):
 
     def test_remove_pid(self):
         streamer = FakeStreamer()
-        streamer._callbacks['foobar'] = mock.MagicMock()
-        streamer._pids = {'foobar': [1234, 1235]}
+        streamer._pids['foobar'] = [1234, 1235]
         streamer.remove_pid('foobar', 1234)
-        self.assertFalse(streamer._callbacks['foobar'].stop.called)
+        self.assertEqual(streamer.get_pids('foobar'), [1235])
 
+        # the processes of all the watchers are collected by one callback,
+        # which keeps running without them
+        streamer._callbacks['processes'] = mock.MagicMock()
         streamer.remove_pid('foobar', 1235)
-        self.assertTrue(streamer._callbacks['foobar'].stop.called)
+        self.assertEqual(streamer.get_pids('foobar'), [])
+        self.assertFalse(streamer._callbacks['processes'].stop.called)
 
 test_suite = EasyTestSuite(__name__)
@@ -1,8 +1,11 @@
+import errno
 import time
 import sys
 import os
 import tempfile
+import threading
 import tornado
+import mock
 
 from datetime import datetime
 from circus.py3compat import StringIO
@@ -13,6 +16,8 @@ from circus.tests.support import TestCase, EasyTestSuite, skipIf, IS_WINDOWS
 from circus.stream import FileStream, WatchedFileStream
 from circus.stream import TimedRotatingFileStream
 from circus.stream import FancyStdoutStream
+from circus.stream import QueueStream, Redirector, AsyncStream
+from circus.stream import file_stream
 
 
 def run_process(testfile, *args, **kw):
@@ -369,5 +374,263 @@ class TestWatchedFileStream(TestFileStream):
         os.unlink(test_filename)
         os.unlink(file1)
 
+    @skipIf(IS_WINDOWS, "On Windows")
+    def test_check_interval(self):
+        _test_fd, test_filename = tempfile.mkstemp()
+        stream = self.get_real_stream(filename=test_filename,
+                                      check_interval=3600)
+        file1 = test_filename + '.1'
+
+        stream({'data': 'line 1\n'})
+        os.rename(test_filename, file1)
+        # not checked yet, so still written in the moved file
+        stream({'data': 'line 2\n'})
+        stream._next_check = 0
+        stream({'data': 'line 3\n'})
+        stream.close()
+
+        with open(test_filename) as f:
+            self.assertEqual(f.read(), 'line 3\n')
+        with open(file1) as f:
+            self.assertEqual(f.read(), 'line 1\nline 2\n')
+
+        os.unlink(test_filename)
+        os.unlink(file1)
+
+    def wait_for_change(self, stream, timeout=5):
+        # the inotify events are read by a thread
+        deadline = time.time() + timeout
+        while not stream._changes._changed and time.time() < deadline:
+            time.sleep(0.01)
+
+    @skipIf(file_stream._libc is None, "inotify not available")
+    def test_inotify(self):
+        _test_fd, test_filename = tempfile.mkstemp()
+        stream = self.get_real_stream(filename=test_filename,
+                                      use_inotify='true')
+        self.assertIsNotNone(stream._changes)
+        file1 = test_filename + '.1'
+
+        with mock.patch.object(stream, '_statfilename',
+                               wraps=stream._statfilename) as stat:
+            stream({'data': 'line 1\n'})
+            stream({'data': 'line 2\n'})
+            self.assertEqual(stat.call_count, 0)
+
+            os.rename(test_filename, file1)
+            self.wait_for_change(stream)
+            stream({'data': 'line 3\n'})
+            self.assertEqual(stat.call_count, 1)
+
+            # the file is deleted while we have it open
+            os.unlink(test_filename)
+            self.wait_for_change(stream)
+            stream({'data': 'line 4\n'})
+            self.assertEqual(stat.call_count, 2)
+        stream.close()
+
+        with open(test_filename) as f:
+            self.assertEqual(f.read(), 'line 4\n')
+        with open(file1) as f:
+            self.assertEqual(f.read(), 'line 1\nline 2\n')
+
+        os.unlink(test_filename)
+        os.unlink(file1)
+
+    @skipIf(file_stream._libc is None, "inotify not available")
+    def test_inotify_watches(self):
+        _test_fd, test_filename = tempfile.mkstemp()
+        stream = self.get_real_stream(filename=test_filename,
+                                      use_inotify='true')
+        other = self.get_real_stream(filename=test_filename,
+                                     use_inotify='true')
+        inotify = stream._changes._inotify
+        # one inotify instance and thread for all the streams
+        self.assertIs(other._changes._inotify, inotify)
+
+        def watches(stream):
+            return [wd for wd, watchers in inotify._watches.items()
+                    if stream._changes in watchers]
+
+        for i in range(3):
+            os.rename(test_filename, test_filename + '.1')
+            self.wait_for_change(stream)
+            stream({'data': 'line\n'})
+            # the watch of the moved file is removed
+            self.assertEqual(watches(stream), [stream._changes._wd])
+
+        # still watching the moved file
+        self.assertEqual(watches(other), [other._changes._wd])
+        changes, wd = other._changes, other._changes._wd
+        other.close()
+        self.assertFalse(changes in inotify._watches.get(wd, ()))
+        stream.close()
+
+        os.unlink(test_filename)
+        os.unlink(test_filename + '.1')
+
+    @skipIf(file_stream._libc is None, "inotify not available")
+    def test_inotify_overflow(self):
+        _test_fd, test_filename = tempfile.mkstemp()
+        stream = self.get_real_stream(filename=test_filename,
+                                      use_inotify='true')
+        self.assertFalse(stream._changes.changed())
+
+        # the events lost may concern any watched file
+        stream._changes._inotify._handle_events(file_stream._EVENT.pack(
+            -1, file_stream._IN_Q_OVERFLOW, 0, 0))
+        self.assertTrue(stream._changes.changed())
+        stream.close()
+        os.unlink(test_filename)
+
+    @skipIf(file_stream._libc is None, "inotify not available")
+    def test_inotify_read_error(self):
+        _test_fd, test_filename = tempfile.mkstemp()
+        stream = self.get_real_stream(filename=test_filename,
+                                      use_inotify='true')
+        with mock.patch.object(file_stream, 'os') as os_mock, \
+                mock.patch.object(file_stream, 'logger') as logger_mock:
+            os_mock.read.side_effect = OSError(errno.EBADF, 'Bad fd')
+            inotify = file_stream._Inotify()
+            inotify._thread.join(5)
+        os.close(inotify.fd)
+        self.assertFalse(inotify._thread.is_alive())
+        self.assertTrue(inotify.failed)
+        self.assertTrue(logger_mock.exception.called)
+
+        # the file is then checked at each write
+        stream._changes._inotify = inotify
+        self.assertTrue(stream._changes.changed())
+        self.assertTrue(stream._changes.changed())
+        # and the next streams use another instance
+        with mock.patch.object(file_stream, '_inotify', inotify):
+            self.assertFalse(file_stream._get_inotify() is inotify)
+        stream.close()
+        os.unlink(test_filename)
+
+
+@skipIf(IS_WINDOWS, "Streams not supported")
+class TestRedirector(TestCase):
+
+    def get_handler(self, redirector):
+        read_fd, write_fd = os.pipe()
+        stdout = os.fdopen(read_fd, 'rb')
+        self.addCleanup(stdout.close)
+        self.addCleanup(os.close, write_fd)
+        process = mock.Mock(pid=333, pipe_stdout=True, pipe_stderr=False,
+                            stdout=stdout)
+        redirector.add_redirections(process)
+        redirector.start()
+        handler = redirector.loop.add_handler.call_args[0][1]
+
+        def write(data):
+            os.write(write_fd, data)
+            handler(read_fd, tornado.ioloop.IOLoop.READ)
+
+        return write
+
+    def test_buffered(self):
+        stream = QueueStream()
+        redirector = Redirector(stream, None, loop=mock.Mock(),
+                                flush_interval=1, flush_size=10)
+        write = self.get_handler(redirector)
+
+        write(b'abc')
+        write(b'def')
+        self.assertTrue(stream.empty())
+        self.assertEqual(redirector.loop.add_timeout.call_count, 1)
+        redirector.flush()
+        self.assertEqual(stream.get_nowait(),
+                         {'data': b'abcdef', 'pid': 333, 'name': 'stdout'})
+
+        # written as soon as flush_size is reached
+        write(b'0123456789')
+        self.assertEqual(stream.get_nowait()['data'], b'0123456789')
+
+        # pending data is written when stopping
+        write(b'xyz')
+        self.assertTrue(stream.empty())
+        redirector.stop()
+        self.assertEqual(stream.get_nowait()['data'], b'xyz')
+
+    def test_read_size(self):
+        stream = QueueStream()
+        redirector = Redirector(stream, None, loop=mock.Mock(), buffer=4)
+        write = self.get_handler(redirector)
+
+        write(b'abcdef')
+        self.assertEqual(stream.get_nowait()['data'], b'abcd')
+
+
+class BlockedStream(QueueStream):
+    """Doesn't write anything until unblocked."""
+
+    def __init__(self, **kwargs):
+        super(BlockedStream, self).__init__(**kwargs)
+        self.unblocked = threading.Event()
+        self.closed = False
+
+    def __call__(self, data):
+        self.unblocked.wait()
+        super(BlockedStream, self).__call__(data)
+
+    def close(self):
+        self.closed = True
+
+
+class TestAsyncStream(TestCase):
+
+    def get_stream(self, **kw):
+        stream = AsyncStream(
+            stream_class='circus.tests.test_stream.BlockedStream', **kw)
+        self.addCleanup(stream.stream.unblocked.set)
+        return stream
+
+    def fill(self, stream, *chunks):
+        for chunk in chunks:
+            stream({'data': chunk, 'pid': 333, 'name': 'stdout'})
+        stream.stream.unblocked.set()
+        stream.close()
+        written = []
+        while not stream.stream.empty():
+            written.append(stream.stream.get_nowait()['data'])
+        return written
+
+    def test_write(self):
+        stream = self.get_stream()
+        self.assertEqual(self.fill(stream, b'a', b'b', b'c'),
+                         [b'a', b'b', b'c'])
+        self.assertTrue(stream.stream.closed)
+
+        # the writer is restarted on open
+        stream.open()
+        self.assertEqual(self.fill(stream, b'd'), [b'd'])
+
+    def test_drop_newest(self):
+        stream = self.get_stream(queue_size='2', overflow='drop_newest')
+        stream({'data': b'a', 'pid': 333, 'name': 'stdout'})
+        # 'a' is held by the writer thread, 'bb' and 'ccc' are queued
+        deadline = time.time() + 5
+        while not stream._queue.empty() and time.time() < deadline:
+            time.sleep(0.01)
+        written = self.fill(stream, b'bb', b'ccc', b'dddd', b'eeeee')
+        self.assertEqual(written, [b'a', b'bb', b'ccc'])
+        self.assertEqual(stream.dropped_bytes, len(b'dddd' + b'eeeee'))
+
+    def test_drop_oldest(self):
+        stream = self.get_stream(queue_size='2', overflow='drop_oldest')
+        written = self.fill(stream, b'a', b'bb', b'ccc', b'dddd', b'eeeee')
+        self.assertEqual(written[-2:], [b'dddd', b'eeeee'])
+        self.assertEqual(stream.dropped, 5 - len(written))
+
+    def test_dropped_when_closed(self):
+        stream = self.get_stream()
+        self.fill(stream)
+        stream({'data': b'abc', 'pid': 333, 'name': 'stdout'})
+        self.assertEqual(stream.dropped_bytes, 3)
+
+    def test_invalid_overflow(self):
+        self.assertRaises(ValueError, AsyncStream, overflow='explode')
+
 
 test_suite = EasyTestSuite(__name__)
@@ -1,4 +1,5 @@
 from __future__ import unicode_literals
+from collections import OrderedDict
 import tempfile
 import shutil
 import os
@@ -50,6 +51,38 @@ class TestUtil(TestCase):
         else:
             self.assertEqual(info['nice'], 0)
 
+    def test_get_info_caches_processes(self):
+        worker = Popen(["python", "-c", SLEEP % 5])
+        try:
+            with mock.patch('circus.util._PROCS', OrderedDict()) as procs:
+                with mock.patch('circus.util.PROCS_CACHE_SIZE', 2):
+                    info = get_info(worker.pid)
+                    self.assertEqual(info['pid'], worker.pid)
+                    process = procs[worker.pid]
+                    get_info(worker.pid)
+                    self.assertTrue(procs[worker.pid] is process)
+
+                    # the least recently used handle is dropped
+                    get_info(os.getpid())
+                    get_info(worker.pid)
+                    get_info(os.getppid())
+                    self.assertEqual(list(procs), [worker.pid, os.getppid()])
+
+                    util.forget_process(worker.pid)
+                    self.assertEqual(list(procs), [os.getppid()])
+
+                    # dead processes are dropped too
+                    get_info(worker.pid)
+                    self.assertTrue(worker.pid in procs)
+                    worker.terminate()
+                    worker.wait()
+                    self.assertRaises(util.NoSuchProcess, get_info,
+                                      worker.pid)
+                    self.assertFalse(worker.pid in procs)
+        finally:
+            if worker.poll() is None:
+                worker.terminate()
+
     def test_get_info_still_works_when_denied_access(self):
         def access_denied():
             return mock.MagicMock(side_effect=util.AccessDenied)
@@ -16,10 +16,12 @@ except ImportError:
         captured_output = None  # NOQA
 
 import tornado
+from tornado.concurrent import Future
 import mock
+from psutil import NoSuchProcess
 
 from circus import logger
-from circus.process import RUNNING, UNEXISTING
+from circus.process import Process, RUNNING, UNEXISTING, DEAD_OR_ZOMBIE
 
 from circus.stream import QueueStream
 from circus.tests.support import TestCircus, truncate_file
@@ -28,6 +30,7 @@ from circus.tests.support import MagicMockFuture, skipIf, IS_WINDOWS
 from circus.tests.support import PYTHON
 from circus.util import get_python_version, tornado_sleep
 from circus.watcher import Watcher
+from circus import watcher as watcher_mod
 from circus.py3compat import s
 
 if hasattr(signal, 'SIGKILL'):
@@ -41,9 +44,10 @@ warnings.filterwarnings('ignore',
 
 class FakeProcess(object):
 
-    def __init__(self, pid, status, started=1, age=1):
+    def __init__(self, pid, status, started=1, age=1, wid=None):
         self.status = status
         self.pid = pid
+        self.wid = wid
         self.started = started
         self.age = age
         self.stopping = False
@@ -60,6 +64,9 @@ class FakeProcess(object):
     def stop(self):
         pass
 
+    def close_pidfd(self):
+        pass
+
     def wait(self, *args, **kwargs):
         pass
 
@@ -189,6 +196,29 @@ class TestWatcher(TestCircus):
                          self.arbiter)
         yield self.stop_arbiter()
 
+    def test_nextwid(self):
+        watcher = Watcher("foo", "foobar", numprocesses=2)
+
+        def add_process(pid):
+            wid = watcher._nextwid
+            watcher._add_process(FakeProcess(pid, status=RUNNING, wid=wid))
+            return wid
+
+        self.assertEqual([add_process(pid) for pid in range(4)], [1, 2, 3, 4])
+        self.assertRaises(RuntimeError, getattr, watcher, '_nextwid')
+
+        # the smallest free wid is reused first
+        watcher._remove_process(2)
+        watcher._remove_process(1)
+        self.assertEqual(add_process(4), 2)
+        self.assertEqual(add_process(5), 3)
+
+        # and new wids are available once numprocesses grows
+        watcher.numprocesses = 3
+        self.assertEqual(add_process(6), 5)
+        watcher.numprocesses = 1
+        self.assertRaises(RuntimeError, getattr, watcher, '_nextwid')
+
 
 class TestWatcherInitialization(TestCircus):
 
@@ -610,6 +640,11 @@ class RespawnTest(TestCircus):
             resp = yield self.call("numprocesses", name="test")
             self.assertEqual(resp['numprocesses'], 1)
 
+            # a running process is not waited for by the reap
+            for process in list(watcher.processes.values()):
+                while process.is_alive():
+                    yield tornado_sleep(0.1)
+
             # let's reap processes and explicitely ask for process management
             yield watcher.reap_and_manage_processes()
 
@@ -649,4 +684,166 @@ class RespawnTest(TestCircus):
         # And be sure we don't spawn new processes in the meantime.
         self.assertFalse(watcher.spawn_processes.called)
 
+    @tornado.testing.gen_test
+    def test_removing_extra_dead_process(self):
+        watcher = Watcher("foo", "foobar", respawn=False, numprocesses=1)
+        watcher._status = "started"
+
+        class DyingProcess(FakeProcess):
+            # running when the dead processes are removed, dead when the
+            # extra ones are
+            statuses = [RUNNING, DEAD_OR_ZOMBIE]
+
+            @property
+            def status(self):
+                return self.statuses.pop(0) if self.statuses else \
+                    DEAD_OR_ZOMBIE
+
+            @status.setter
+            def status(self, value):
+                pass
+
+        process = DyingProcess(1234, status=None, started=1)
+        process.close_pidfd = mock.MagicMock()
+        watcher.processes = {1234: process,
+                             1235: FakeProcess(1235, status=RUNNING,
+                                               started=2)}
+        yield watcher.manage_processes()
+        self.assertEqual(list(watcher.processes), [1235])
+        self.assertTrue(process.close_pidfd.called)
+
+
+@skipIf(IS_WINDOWS, "Windows processes are reaped with psutil")
+class ReapTest(TestCircus):
+
+    def _get_watcher(self, stopping=True):
+        watcher = Watcher("foo", "foobar", graceful_timeout=0)
+        watcher._status = "active"
+        process = FakeProcess(1234, status=RUNNING)
+        process.stopping = stopping
+        watcher.processes = {1234: process}
+        return watcher
+
+    @tornado.testing.gen_test
+    def test_reap_process_yields_to_the_loop(self):
+        watcher = self._get_watcher()
+        ticks = []
+        self.io_loop.add_callback(ticks.append, 1)
+        registered = []
+
+        def waitpid(pid, options):
+            registered.append(pid in watcher.processes)
+            if len(registered) < 3:
+                return 0, 0
+            return pid, 0
+
+        with mock.patch('os.waitpid', waitpid):
+            yield watcher.reap_process(1234)
+
+        # the process stays managed until it exited
+        self.assertEqual(registered, [True, True, True])
+        self.assertEqual(ticks, [1])
+        self.assertEqual(watcher.processes, {})
+
+    @tornado.testing.gen_test
+    def test_reap_process_gives_up(self):
+        watcher = self._get_watcher()
+        waitpid = mock.MagicMock(return_value=(0, 0))
+
+        with mock.patch('os.waitpid', waitpid):
+            with mock.patch.object(watcher_mod, '_REAP_MAX_RETRIES', 3):
+                yield watcher.reap_process(1234)
+
+        self.assertEqual(waitpid.call_count, 4)
+        # the process is still running, we keep it
+        self.assertEqual(list(watcher.processes), [1234])
+
+    @tornado.testing.gen_test
+    def test_reap_running_process(self):
+        watcher = self._get_watcher(stopping=False)
+        waitpid = mock.MagicMock(return_value=(0, 0))
+
+        with mock.patch('os.waitpid', waitpid):
+            yield watcher.reap_process(1234)
+
+        # a process which isn't stopped is not waited for
+        self.assertEqual(waitpid.call_count, 1)
+        self.assertEqual(list(watcher.processes), [1234])
+
+
+class SpawnTest(TestCircus):
+
+    @tornado.testing.gen_test
+    def test_spawn_processes_by_batches(self):
+        watcher = Watcher("foo", "foobar", numprocesses=5,
+                          spawn_concurrency=2, warmup_delay=10)
+        watcher._status = "active"
+        spawned = []
+
+        def spawn_process():
+            pid = 1234 + len(watcher.processes)
+            watcher.processes[pid] = FakeProcess(pid, status=RUNNING)
+            spawned.append(pid)
+            future = Future()
+            future.set_result(time.time())
+            return future
+
+        sleeps = []
+
+        def fake_sleep(delay):
+            sleeps.append((len(spawned), delay))
+            future = Future()
+            future.set_result(None)
+            return future
+
+        watcher.spawn_process = spawn_process
+        with mock.patch.object(watcher_mod, 'tornado_sleep', fake_sleep):
+            yield watcher.spawn_processes()
+
+        self.assertEqual(len(watcher.processes), 5)
+        # warmup_delay is waited once per batch of spawn_concurrency
+        self.assertEqual([count for count, _ in sleeps], [2, 4, 5])
+        for _, delay in sleeps:
+            self.assertTrue(9 < delay <= 10)
+
+
+@skipIf(not hasattr(os, 'pidfd_open'), "pidfds are not supported")
+class PidfdTest(TestCircus):
+
+    @tornado.testing.gen_test
+    def test_kill_process_is_notified_of_the_exit(self):
+        watcher = Watcher("foo", PYTHON, graceful_timeout=10,
+                          loop=self.io_loop)
+        process = Process('foo', 1, PYTHON,
+                          args=['-c', 'import time; time.sleep(10)'])
+        self.assertTrue(process.pidfd is not None)
+        watcher._add_process(process)
+
+        started = time.time()
+        killed = yield watcher.kill_process(process)
+        self.assertTrue(killed)
+        # woken up by the exit, not after 100ms of polling
+        self.assertTrue(time.time() - started < 0.1)
+        self.assertFalse(process.is_alive())
+        self.assertEqual(process.pidfd, None)
+
+    @tornado.testing.gen_test
+    def test_kill_process_failing_sigkill(self):
+        watcher = Watcher("foo", PYTHON, graceful_timeout=10,
+                          loop=self.io_loop)
+        process = Process('foo', 1, PYTHON,
+                          args=['-c', 'import time; time.sleep(10)'])
+        watcher._add_process(process)
+
+        # the process exits between the check and the SIGKILL
+        with mock.patch.object(process, 'is_alive', return_value=True), \
+                mock.patch.object(watcher, 'send_signal_process',
+                                  side_effect=NoSuchProcess(process.pid)):
+            with self.assertRaises(NoSuchProcess):
+                yield watcher.kill_process(process)
+        self.assertFalse(process.stopping)
+        self.assertEqual(process.pidfd, None)
+        process.stop()
+
+
 test_suite = EasyTestSuite(__name__)
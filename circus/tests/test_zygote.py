@@ -0,0 +1,177 @@
+import os
+import signal
+import socket
+from tempfile import mkstemp
+
+import mock
+import psutil
+import tornado
+
+from circus import zygote, zygote_process
+from circus.process import UNEXISTING
+from circus.tests.support import TestCircus, TestCase, EasyTestSuite
+from circus.tests.support import PYTHON, IS_WINDOWS, skipIf
+from circus.py3compat import PY2
+from circus.util import tornado_sleep
+from circus.watcher import Watcher
+
+
+# writes the pid of its parent and whether colorsys was preloaded
+WORKER = """
+import os, sys, time
+with open(%r, 'a') as f:
+    f.write('%%d %%s\\n' %% (os.getppid(), 'colorsys' in sys.modules))
+time.sleep(30)
+"""
+
+
+class TestSupported(TestCase):
+
+    @skipIf(PY2 or IS_WINDOWS, "The zygote mode needs python 3.3+")
+    def test_supported(self):
+        # the other tests of the module are skipped otherwise
+        self.assertTrue(zygote.SUPPORTED)
+
+
+@skipIf(not zygote.SUPPORTED, "The zygote mode needs python 3.3+")
+class TestChannel(TestCase):
+
+    def test_messages_and_fds(self):
+        left, right = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        sender, receiver = zygote.Channel(left), zygote.Channel(right)
+        read, write = os.pipe()
+        try:
+            sender.send({'first': 1})
+            sender.send({'second': 2}, [write])
+            self.assertEqual(receiver.receive(), ({'first': 1}, []))
+            message, fds = receiver.receive()
+            self.assertEqual(message, {'second': 2})
+            self.assertEqual(len(fds), 1)
+
+            os.write(fds[0], b'data')
+            os.close(fds[0])
+            self.assertEqual(os.read(read, 4), b'data')
+
+            self.assertEqual(receiver.receive(block=False), None)
+            sender.close()
+            self.assertRaises(EOFError, receiver.receive)
+        finally:
+            receiver.close()
+            os.close(read)
+            os.close(write)
+
+
+@skipIf(not zygote.SUPPORTED, "The zygote mode needs python 3.3+")
+class TestZygoteWatcher(TestCircus):
+
+    @tornado.testing.gen_test
+    def test_processes_are_forked_by_the_zygote(self):
+        fd, output = mkstemp()
+        os.close(fd)
+        self.files.append(output)
+        watcher = Watcher('zygote', PYTHON, args=['-c', WORKER % output],
+                          numprocesses=2, use_zygote=True,
+                          zygote_preload='colorsys', graceful_timeout=1)
+        yield watcher._start()
+        try:
+            zygote_process = watcher._zygote
+            self.assertEqual(len(watcher.processes), 2)
+
+            lines = []
+            for i in range(50):
+                with open(output) as f:
+                    lines = f.read().splitlines()
+                if len(lines) == 2:
+                    break
+                yield tornado_sleep(0.1)
+            self.assertEqual(lines, ['%d True' % zygote_process.pid] * 2)
+        finally:
+            yield watcher._stop()
+
+        self.assertEqual(watcher.processes, {})
+        self.assertTrue(zygote_process.closed)
+
+    @tornado.testing.gen_test
+    def test_exit_is_reported(self):
+        code = 'import sys, time; time.sleep(0.5); sys.exit(3)'
+        watcher = Watcher('zygote', PYTHON, args=['-c', code],
+                          use_zygote=True, respawn=False)
+        yield watcher._start()
+        try:
+            process = list(watcher.processes.values())[0]
+            for i in range(50):
+                if process.returncode() is not None:
+                    break
+                yield tornado_sleep(0.1)
+            self.assertEqual(process.returncode(), 3)
+            self.assertEqual(process.status, UNEXISTING)
+        finally:
+            yield watcher._stop()
+
+    @tornado.testing.gen_test
+    def test_wait(self):
+        code = 'import sys, time; time.sleep(0.5); sys.exit(3)'
+        watcher = Watcher('zygote', PYTHON, args=['-c', code],
+                          use_zygote=True, respawn=False)
+        yield watcher._start()
+        try:
+            process = list(watcher.processes.values())[0]
+            with self.assertRaises(psutil.TimeoutExpired):
+                yield process.wait(0.01)
+            returncode = yield process.wait(5)
+            self.assertEqual(returncode, 3)
+        finally:
+            yield watcher._stop()
+
+    @tornado.testing.gen_test
+    def test_unanswered_spawn(self):
+        watcher = Watcher('zygote', PYTHON,
+                          args=['-c', 'import time; time.sleep(30)'],
+                          numprocesses=1, use_zygote=True, graceful_timeout=1)
+        watcher._status = 'active'
+        stuck = watcher.get_zygote()
+        yield stuck.ready
+        os.kill(stuck.pid, signal.SIGSTOP)
+        try:
+            with mock.patch.object(zygote_process, 'ZYGOTE_TIMEOUT', 0.2):
+                spawned = watcher.spawn_process()
+                # the answer of the zygote is waited for by the loop
+                self.assertFalse(spawned.done())
+                res = yield spawned
+            self.assertTrue(isinstance(res, float))
+            # tried again with a new zygote
+            self.assertTrue(stuck.closed)
+            process = list(watcher.processes.values())[0]
+            self.assertFalse(process.zygote is stuck)
+        finally:
+            os.kill(stuck.pid, signal.SIGCONT)
+            yield watcher._stop()
+
+    @tornado.testing.gen_test
+    def test_requests_sent_together(self):
+        watcher = Watcher('zygote', PYTHON,
+                          args=['-c', 'import time; time.sleep(30)'],
+                          numprocesses=2, use_zygote=True, graceful_timeout=1)
+        watcher._status = 'active'
+        forking = watcher.get_zygote()
+        yield forking.ready
+        try:
+            with mock.patch.object(zygote_process, 'ZYGOTE_TIMEOUT', 2):
+                # both requests are read by the zygote at once
+                os.kill(forking.pid, signal.SIGSTOP)
+                spawned = [watcher.spawn_process(), watcher.spawn_process()]
+                os.kill(forking.pid, signal.SIGCONT)
+                res = yield spawned
+            self.assertTrue(all(isinstance(r, float) for r in res))
+            self.assertFalse(forking.closed)
+            for process in watcher.processes.values():
+                self.assertTrue(process.zygote is forking)
+        finally:
+            yield watcher._stop()
+
+    def test_shell_is_refused(self):
+        self.assertRaises(ValueError, Watcher, 'zygote', PYTHON,
+                          use_zygote=True, shell=True)
+
+
+test_suite = EasyTestSuite(__name__)
@@ -6,6 +6,7 @@ import re
 import shlex
 import socket
 import sys
+import threading
 import time
 import traceback
 import json
@@ -45,6 +46,8 @@ try:
 except ImportError:
     from urlparse import urlparse  # NOQA
 
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import timedelta
 from functools import wraps
 import signal
@@ -59,7 +62,7 @@ except (ImportError, AttributeError):
 from zmq import ssh
 
 
-from psutil import AccessDenied, NoSuchProcess, Process
+from psutil import AccessDenied, NoSuchProcess, Process, virtual_memory
 
 from circus.exc import ConflictError
 from circus import logger
@@ -70,6 +73,7 @@ from circus.py3compat import string_types
 DEFAULT_ENDPOINT_DEALER = "tcp://127.0.0.1:5555"
 DEFAULT_ENDPOINT_SUB = "tcp://127.0.0.1:5556"
 DEFAULT_ENDPOINT_STATS = "tcp://127.0.0.1:5557"
+DEFAULT_ENDPOINT_STATS_HISTORY = "tcp://127.0.0.1:5558"
 DEFAULT_ENDPOINT_MULTICAST = "udp://237.219.251.97:12027"
 
 
@@ -191,8 +195,82 @@ def human2bytes(s):
     return int(num * prefix[letter])
 
 
-# XXX weak dict ?
-_PROCS = {}
+# psutil handles of the pids given to get_info(), kept between calls so
+# the cpu percentages can be computed. The least recently used handles are
+# dropped once there are more than PROCS_CACHE_SIZE of them. get_info() can
+# be called from several threads by circusd-stats, hence the lock.
+PROCS_CACHE_SIZE = 8192
+_PROCS = OrderedDict()
+_PROCS_LOCK = threading.Lock()
+_TOTAL_MEMORY = []
+
+
+def _get_process(pid):
+    with _PROCS_LOCK:
+        process = _PROCS.pop(pid, None)
+        if process is not None:
+            _PROCS[pid] = process
+            return process
+
+    process = Process(pid)
+    with _PROCS_LOCK:
+        _PROCS[pid] = process
+        while len(_PROCS) > PROCS_CACHE_SIZE:
+            _PROCS.popitem(last=False)
+    return process
+
+
+def forget_process(pid):
+    """Drops the cached handle of a pid, to call once it was reaped."""
+    with _PROCS_LOCK:
+        _PROCS.pop(pid, None)
+
+
+def pidfd_open(pid):
+    """Return a pidfd of *pid*: a file descriptor referring to the process,
+    which becomes readable once it exits. Returns None if pidfds are not
+    supported (Linux >= 5.3 and Python >= 3.9)."""
+    if not hasattr(os, 'pidfd_open'):
+        return None
+    try:
+        return os.pidfd_open(pid)
+    except OSError:
+        # ENOSYS on older kernels, ESRCH if the process is gone
+        return None
+
+
+def _total_memory():
+    if not _TOTAL_MEMORY:
+        _TOTAL_MEMORY.append(virtual_memory().total)
+    return _TOTAL_MEMORY[0]
+
+
+def memory_percent(rss):
+    """Return the percentage of the system memory *rss* bytes are."""
+    # same as psutil's memory_percent(), without reading the system memory
+    # each time
+    return round(rss * 100. / _total_memory(), 3)
+
+
+def format_cpu_time(seconds):
+    """Format a cpu time as minutes:seconds.hundredths."""
+    ctime = timedelta(seconds=seconds)
+    return "%s:%s.%s" % (ctime.seconds // 60 % 60,
+                         str((ctime.seconds % 60)).zfill(2),
+                         str(ctime.microseconds)[:2])
+
+
+@contextmanager
+def _oneshot(process):
+    # psutil >= 5.0 reads the /proc files once for all the calls made in
+    # a oneshot() context
+    try:
+        oneshot = process.oneshot
+    except (AttributeError, AccessDenied):
+        yield
+    else:
+        with oneshot():
+            yield
 
 
 def get_info(process=None, interval=0, with_childs=False):
@@ -200,30 +278,40 @@ def get_info(process=None, interval=0, with_childs=False):
 
     If process is None, will return the information about the current process.
     """
-    # XXX moce get_info to circus.process ?
-    from circus.process import (get_children, get_memory_info,
-                                get_cpu_percent, get_memory_percent,
-                                get_cpu_times, get_nice, get_cmdline,
-                                get_create_time, get_username)
-
     if process is None or isinstance(process, int):
         if process is None:
             pid = os.getpid()
         else:
             pid = process
+        process = _get_process(pid)
+    else:
+        pid = None
+
+    try:
+        with _oneshot(process):
+            return _get_info(process, interval, with_childs)
+    except NoSuchProcess:
+        if pid is not None:
+            forget_process(pid)
+        raise
 
-        if pid in _PROCS:
-            process = _PROCS[pid]
-        else:
-            _PROCS[pid] = process = Process(pid)
+
+def _get_info(process, interval, with_childs):
+    # XXX moce get_info to circus.process ?
+    from circus.process import (get_children, get_memory_info,
+                                get_cpu_percent, get_cpu_times, get_nice,
+                                get_cmdline, get_create_time, get_username)
 
     info = {}
     try:
         mem_info = get_memory_info(process)
         info['mem_info1'] = bytes2human(mem_info[0])
         info['mem_info2'] = bytes2human(mem_info[1])
+        info['mem'] = memory_percent(mem_info[0])
+        info['rss'] = mem_info[0]
     except AccessDenied:
         info['mem_info1'] = info['mem_info2'] = "N/A"
+        info['mem'] = info['rss'] = "N/A"
 
     try:
         info['cpu'] = get_cpu_percent(process, interval=interval)
@@ -231,16 +319,7 @@ def get_info(process=None, interval=0, with_childs=False):
         info['cpu'] = "N/A"
 
     try:
-        info['mem'] = round(get_memory_percent(process), 3)
-    except AccessDenied:
-        info['mem'] = "N/A"
-
-    try:
-        cpu_times = get_cpu_times(process)
-        ctime = timedelta(seconds=sum(cpu_times))
-        ctime = "%s:%s.%s" % (ctime.seconds // 60 % 60,
-                              str((ctime.seconds % 60)).zfill(2),
-                              str(ctime.microseconds)[:2])
+        ctime = format_cpu_time(sum(get_cpu_times(process)))
     except AccessDenied:
         ctime = "N/A"
 
@@ -278,10 +357,8 @@ def get_info(process=None, interval=0, with_childs=False):
         info['create_time'] = 'N/A'
 
     try:
-        info['age'] = time.time() - get_create_time(process)
+        info['age'] = time.time() - info['create_time']
     except TypeError:
-        info['create_time'] = get_create_time(process)
-    except AccessDenied:
         info['age'] = 'N/A'
 
     info['cmdline'] = cmdline
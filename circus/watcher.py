@@ -1,5 +1,6 @@
 import copy
 import errno
+import heapq
 import os
 import signal
 import time
@@ -12,21 +13,32 @@ except ImportError:
     # noinspection PyUnresolvedReferences
     from itertools import izip_longest  # NOQA
 import site
-from tornado import gen
+from tornado import gen, concurrent
 
 from psutil import NoSuchProcess, TimeoutExpired
-import zmq.utils.jsonapi as json
 from zmq.eventloop import ioloop
 
 from circus.process import Process, DEAD_OR_ZOMBIE, UNEXISTING
 from circus.papa_process_proxy import PapaProcessProxy
+from circus.zygote_process import Zygote, ZygoteProcess
 from circus import logger
 from circus import util
+from circus.profiler import profiler
+from circus.pubsub import encode
 from circus.stream import get_stream, Redirector
 from circus.stream.papa_redirector import PapaRedirector
 from circus.util import parse_env_dict, resolve_name, tornado_sleep, IS_WINDOWS
 from circus.util import papa
-from circus.py3compat import bytestring, is_callable, b, PY2
+from circus import zygote
+from circus.py3compat import bytestring, is_callable, b, PY2, string_types
+
+
+# reap_process polls the status of a process being stopped which has not
+# exited yet with an exponential backoff between these delays, a bounded
+# number of times
+_REAP_MIN_DELAY = 0.001
+_REAP_MAX_DELAY = 0.1
+_REAP_MAX_RETRIES = 50
 
 
 class Watcher(object):
@@ -126,6 +138,30 @@ class Watcher(object):
 
       This is not supported on Windows.
 
+    - **stream_read_size**: maximum number of bytes read from a process
+      stdout or stderr at once. (default: 1024)
+
+    - **stream_flush_interval**: if not 0, the output of the processes is
+      buffered and written to the streams at most every
+      *stream_flush_interval* seconds, so the chunks read from a process
+      are written in a single call. (default: 0)
+
+    - **stream_flush_size**: when the output is buffered, the number of
+      bytes of a process output after which it is written without waiting
+      for *stream_flush_interval*. (default: 65536)
+
+    - **spawn_concurrency**: number of processes spawned in a row before
+      waiting for *warmup_delay*. (default: 1)
+
+    - **use_zygote**: If True, the processes are forked from a zygote,
+      a python process started by the watcher which imports the
+      *zygote_preload* modules once. The command must run a python script,
+      module or code, see :class:`circus.zygote_process.ZygoteProcess`.
+      Needs python 3.3 or higher. default: False.
+
+    - **zygote_preload**: list of the modules the zygote imports, or a
+      comma-separated string. default: None.
+
     - **priority** -- integer that defines a priority for the watcher. When
       the Arbiter do some operations on all watchers, it will sort them
       with this field, from the bigger number to the smallest.
@@ -209,13 +245,17 @@ class Watcher(object):
                  stdin_socket=None, close_child_stdin=True,
                  close_child_stdout=False,
                  close_child_stderr=False, virtualenv_py_ver=None,
-                 use_papa=False, **options):
+                 use_papa=False, stream_read_size=1024,
+                 stream_flush_interval=0., stream_flush_size=65536,
+                 spawn_concurrency=1, use_zygote=False, zygote_preload=None,
+                 **options):
         self.name = name
         self.use_sockets = use_sockets
         self.on_demand = on_demand
         self.res_name = name.lower().replace(" ", "_")
         self.numprocesses = int(numprocesses)
         self.warmup_delay = warmup_delay
+        self.spawn_concurrency = max(1, int(spawn_concurrency))
         self.cmd = cmd
         self.args = args
         self._status = "stopped"
@@ -228,6 +268,9 @@ class Watcher(object):
         self.stdout_stream = get_stream(self.stdout_stream_conf)
         self.stderr_stream = get_stream(self.stderr_stream_conf)
         self.stream_redirector = None
+        self.stream_read_size = int(stream_read_size)
+        self.stream_flush_interval = float(stream_flush_interval)
+        self.stream_flush_size = int(stream_flush_size)
         self.max_retry = int(max_retry)
         self._options = options
         self.singleton = singleton
@@ -248,12 +291,29 @@ class Watcher(object):
         self.close_child_stdout = close_child_stdout
         self.close_child_stderr = close_child_stderr
         self.use_papa = use_papa and papa is not None
+        self.use_zygote = use_zygote
+        if isinstance(zygote_preload, string_types):
+            zygote_preload = [module.strip()
+                              for module in zygote_preload.split(',')]
+        self.zygote_preload = [module for module in zygote_preload or ()
+                               if module]
+        self._zygote = None
+        # arguments of the processes, see Process.format_args
+        self._args_template = None
         self.loop = loop or ioloop.IOLoop.instance()
 
         if singleton and self.numprocesses not in (0, 1):
             raise ValueError("Cannot have %d processes with a singleton "
                              " watcher" % self.numprocesses)
 
+        if use_zygote:
+            if not zygote.SUPPORTED:
+                raise NotImplementedError("The zygote mode needs python 3.3 "
+                                          "or higher on a posix system.")
+            if shell:
+                raise ValueError("Cannot run the command of a zygote "
+                                 "watcher in a shell")
+
         if IS_WINDOWS:
             if self.stdout_stream or self.stderr_stream:
                 raise NotImplementedError("Streams are not supported"
@@ -275,7 +335,10 @@ class Watcher(object):
                           "stdout_stream_conf", "on_demand",
                           "stderr_stream_conf", "max_age", "max_age_variance",
                           "close_child_stdin", "close_child_stdout",
-                          "close_child_stderr", "use_papa") +
+                          "close_child_stderr", "use_papa",
+                          "stream_read_size", "stream_flush_interval",
+                          "stream_flush_size", "spawn_concurrency",
+                          "use_zygote", "zygote_preload") +
                          tuple(options.keys()))
 
         if not working_dir:
@@ -284,6 +347,11 @@ class Watcher(object):
 
         self.working_dir = working_dir
         self.processes = {}
+        # wid -> number of processes using it
+        self._used_wids = {}
+        # heap of the wids which may be free, see _nextwid
+        self._free_wids = []
+        self._max_free_wid = 0
         self.shell = shell
         self.shell_args = shell_args
         self.uid = uid
@@ -340,7 +408,33 @@ class Watcher(object):
 
     @property
     def _process_class(self):
-        return PapaProcessProxy if self.use_papa else Process
+        if self.use_papa:
+            return PapaProcessProxy
+        return ZygoteProcess if self.use_zygote else Process
+
+    def get_zygote(self):
+        """Return the zygote the processes are forked from, starting it if
+        needed."""
+        if self._zygote is None or self._zygote.closed:
+            self._zygote = Zygote(self)
+        return self._zygote
+
+    @gen.coroutine
+    def _start_zygote(self):
+        # wait for the zygote to preload the modules without blocking the
+        # loop, spawn_process() would otherwise
+        if not self.use_zygote:
+            return
+        try:
+            yield self.get_zygote().ready
+        except OSError as e:
+            logger.warning('error in %r: %s', self.name, str(e))
+
+    def _retire_zygote(self):
+        # the running processes keep their zygote until they exit
+        if self._zygote is not None:
+            self._zygote.retire()
+            self._zygote = None
 
     def _reload_stream(self, key, val):
         parts = key.split('.', 1)
@@ -360,8 +454,7 @@ class Watcher(object):
         if self.stream_redirector:
             self.stream_redirector.change_stream(stream_type, new_stream)
         else:
-            self.stream_redirector = self._redirector_class(
-                self.stdout_stream, self.stderr_stream, loop=self.loop)
+            self.stream_redirector = self._new_redirector()
 
         if old_stream:
             if hasattr(old_stream, 'close'):
@@ -375,11 +468,17 @@ class Watcher(object):
         if self.stdout_stream or self.stderr_stream:
             if self.stream_redirector:
                 self.stream_redirector.stop()
-            self.stream_redirector = self._redirector_class(
-                self.stdout_stream, self.stderr_stream, loop=self.loop)
+            self.stream_redirector = self._new_redirector()
         else:
             self.stream_redirector = None
 
+    def _new_redirector(self):
+        return self._redirector_class(
+            self.stdout_stream, self.stderr_stream, loop=self.loop,
+            buffer=self.stream_read_size,
+            flush_interval=self.stream_flush_interval,
+            flush_size=self.stream_flush_size)
+
     def _resolve_hook(self, name, callable_or_name, ignore_failure,
                       reload_module=False):
         if is_callable(callable_or_name):
@@ -420,6 +519,37 @@ class Watcher(object):
         self.evpub_socket = evpub_socket
         self.sockets = sockets
         self.arbiter = arbiter
+        if arbiter is not None:
+            for process in self.processes.values():
+                arbiter.register_process(self, process)
+
+    @property
+    def priority(self):
+        return self._priority
+
+    @priority.setter
+    def priority(self, priority):
+        self._priority = priority
+        # the arbiter caches its watchers sorted by priority
+        if getattr(self, 'arbiter', None) is not None:
+            self.arbiter.watchers_changed()
+
+    def _add_process(self, process):
+        self.processes[process.pid] = process
+        self._used_wids[process.wid] = self._used_wids.get(process.wid, 0) + 1
+        if self.arbiter is not None:
+            self.arbiter.register_process(self, process)
+
+    def _remove_process(self, pid):
+        process = self.processes.pop(pid)
+        count = self._used_wids.pop(process.wid, 0) - 1
+        if count > 0:
+            self._used_wids[process.wid] = count
+        elif count == 0:
+            heapq.heappush(self._free_wids, process.wid)
+        if self.arbiter is not None:
+            self.arbiter.unregister_process(process)
+        return process
 
     def __len__(self):
         return len(self.processes)
@@ -432,42 +562,75 @@ class Watcher(object):
         """Publish a message on the event publisher channel"""
 
         name = bytestring(self.res_name)
+        # the socket may also be a raw zmq PUB socket
+        encoding = getattr(self.evpub_socket, 'encoding', 'json')
 
-        multipart_msg = [b("watcher.%s.%s" % (name, topic)), json.dumps(msg)]
+        multipart_msg = [b("watcher.%s.%s" % (name, topic)),
+                         encode(msg, encoding)]
 
         if self.evpub_socket is not None and not self.evpub_socket.closed:
             self.evpub_socket.send_multipart(multipart_msg)
 
+    @gen.coroutine
     @util.debuglog
     def reap_process(self, pid, status=None):
-        """ensure that the process is killed (and not a zombie)"""
-        if pid not in self.processes:
+        """ensure that the process is killed (and not a zombie)
+
+        The process stays managed by the watcher until its exit is seen.
+        If it is being stopped, its status is polled again without
+        blocking the loop, a bounded number of times.
+        """
+        process = self.processes.get(pid)
+        if process is None:
             return
-        process = self.processes.pop(pid)
 
-        timeout = 0.001
+        delay = _REAP_MIN_DELAY
+        retries = 0
 
         while status is None:
+            exited = True
             if IS_WINDOWS:
                 try:
                     # On Windows we can't use waitpid as it's blocking,
                     # so we use psutils' wait
-                    status = process.wait(timeout=timeout)
+                    status = process.wait(timeout=0)
                 except TimeoutExpired:
-                    continue
+                    exited = False
             else:
                 try:
                     resulting_pid, status = os.waitpid(pid, os.WNOHANG)
                     if (resulting_pid, status) == (0, 0):
                         status = None
-                        time.sleep(timeout)
-                        continue
+                        exited = False
                 except OSError as e:
                     if e.errno == errno.ECHILD:
                         status = None
+                        if process.is_alive():
+                            # not a child of circusd, such as a process
+                            # forked by a zygote, and still running
+                            return
                     else:
                         raise
 
+            if not exited:
+                if not (process.stopping or self.is_stopping()):
+                    # a running process, nothing to reap
+                    return
+                if retries >= _REAP_MAX_RETRIES:
+                    logger.warning('giving up reaping process %s [%s], it '
+                                   'did not exit', pid, self.name)
+                    if self.is_stopping():
+                        self._remove_process(pid)
+                        process.stop()
+                    return
+                retries += 1
+                yield tornado_sleep(delay)
+                delay = min(delay * 2, _REAP_MAX_DELAY)
+                if self.processes.get(pid) is not process:
+                    # reaped meanwhile, by the arbiter on SIGCHLD
+                    return
+                continue
+
             if status is None:
                 # nothing to do here, we do not have any child
                 # process running
@@ -477,6 +640,7 @@ class Watcher(object):
                 # the underlying process.
                 logger.debug('reaping already dead process %s [%s]',
                              pid, self.name)
+                self._remove_process(pid)
                 self.notify_event(
                     "reap",
                     {"process_pid": pid,
@@ -485,6 +649,8 @@ class Watcher(object):
                 process.stop()
                 return
 
+        self._remove_process(pid)
+
         # get return code
         if hasattr(os, 'WIFSIGNALED'):
             exit_code = 0
@@ -519,6 +685,7 @@ class Watcher(object):
                            "time": time.time(),
                            "exit_code": exit_code})
 
+    @gen.coroutine
     @util.debuglog
     def reap_processes(self):
         """Reap all the processes for this watcher.
@@ -528,8 +695,7 @@ class Watcher(object):
             return
 
         # reap_process changes our dict, look through the copy of keys
-        for pid in list(self.processes.keys()):
-            self.reap_process(pid)
+        yield [self.reap_process(pid) for pid in list(self.processes.keys())]
 
     @gen.coroutine
     @util.debuglog
@@ -537,11 +703,13 @@ class Watcher(object):
         """Manage processes."""
         if self.is_stopped():
             return
+        started = time.time()
 
         # remove dead or zombie processes first
         for process in list(self.processes.values()):
             if process.status in (DEAD_OR_ZOMBIE, UNEXISTING):
-                self.processes.pop(process.pid)
+                self._remove_process(process.pid)
+                process.close_pidfd()
 
         if self.max_age:
             yield self.remove_expired_processes()
@@ -560,7 +728,8 @@ class Watcher(object):
                                   key=lambda process: process.started,
                                   reverse=True)[self.numprocesses:]:
                 if process.status in (DEAD_OR_ZOMBIE, UNEXISTING):
-                    self.processes.pop(process.pid)
+                    self._remove_process(process.pid)
+                    process.close_pidfd()
                 else:
                     processes_to_kill.append(process)
 
@@ -568,7 +737,10 @@ class Watcher(object):
                              for process in processes_to_kill]
             for i, process in enumerate(processes_to_kill):
                 if removes[i]:
-                    self.processes.pop(process.pid)
+                    self._remove_process(process.pid)
+
+        profiler.record('manage_processes.' + self.name,
+                        time.time() - started)
 
     @gen.coroutine
     @util.debuglog
@@ -579,7 +751,7 @@ class Watcher(object):
         removes = yield [self.kill_process(x) for x in expired_processes]
         for i, process in enumerate(expired_processes):
             if removes[i]:
-                self.processes.pop(process.pid)
+                self._remove_process(process.pid)
 
     @gen.coroutine
     @util.debuglog
@@ -587,7 +759,7 @@ class Watcher(object):
         """Reap & manage processes."""
         if self.is_stopped():
             return
-        self.reap_processes()
+        yield self.reap_processes()
         yield self.manage_processes()
 
     @gen.coroutine
@@ -601,18 +773,28 @@ class Watcher(object):
             self._status = "stopped"
             return
         for i in self._found_wids:
-            self.spawn_process(i)
+            yield self.spawn_process(i)
             yield tornado_sleep(0)
         self._found_wids = {}
 
-        for i in range(self.numprocesses - len(self.processes)):
-            res = self.spawn_process()
-            if res is False:
-                yield self._stop()
-                break
+        # the processes are spawned by batches of spawn_concurrency, with
+        # warmup_delay between the start of two batches
+        to_spawn = self.numprocesses - len(self.processes)
+        if to_spawn > 0:
+            yield self._start_zygote()
+        while to_spawn > 0:
+            started = None
+            for i in range(min(self.spawn_concurrency, to_spawn)):
+                res = yield self.spawn_process()
+                if res is False:
+                    yield self._stop()
+                    return
+                if started is None and isinstance(res, float):
+                    started = res
+                to_spawn -= 1
             delay = self.warmup_delay
-            if isinstance(res, float):
-                delay -= (time.time() - res)
+            if started is not None:
+                delay -= (time.time() - started)
                 if delay < 0:
                     delay = 0
             yield tornado_sleep(delay)
@@ -632,18 +814,18 @@ class Watcher(object):
                                 self.stdin_socket)
             return self.sockets[self.stdin_socket].fileno()
 
+    @gen.coroutine
     def spawn_process(self, recovery_wid=None):
         """Spawn process.
 
         Return True if ok, False if the watcher must be stopped
         """
         if self.is_stopped():
-            return True
+            raise gen.Return(True)
 
         if not recovery_wid and not self.call_hook('before_spawn'):
-            return False
+            raise gen.Return(False)
 
-        cmd = util.replace_gnu_args(self.cmd, env=self.env)
         nb_tries = 0
 
         # start the redirector now so we can catch any startup errors
@@ -659,7 +841,7 @@ class Watcher(object):
             ProcCls = self._process_class
             try:
                 process = ProcCls(self.name, recovery_wid or self._nextwid,
-                                  cmd, args=self.args,
+                                  self.cmd, args=self.args,
                                   working_dir=self.working_dir,
                                   shell=self.shell, uid=self.uid, gid=self.gid,
                                   env=self.env, rlimits=self.rlimits,
@@ -670,18 +852,26 @@ class Watcher(object):
                                   close_child_stdin=self.close_child_stdin,
                                   close_child_stdout=self.close_child_stdout,
                                   close_child_stderr=self.close_child_stderr)
+                spawned = getattr(process, 'spawned', None)
+                if spawned is not None:
+                    # forked by the zygote, without blocking the loop
+                    try:
+                        yield spawned
+                    except OSError:
+                        process = None
+                        raise
 
                 # stream stderr/stdout if configured
                 if self.stream_redirector:
                     self.stream_redirector.add_redirections(process)
 
-                self.processes[process.pid] = process
+                self._add_process(process)
                 logger.debug('running %s process [pid %d]', self.name,
                              process.pid)
                 if not self.call_hook('after_spawn', pid=process.pid):
                     self.kill_process(process)
-                    del self.processes[process.pid]
-                    return False
+                    self._remove_process(process.pid)
+                    raise gen.Return(False)
 
             # catch ValueError as well, as a misconfigured rlimit setting could
             # lead to bad infinite retries here
@@ -694,8 +884,8 @@ class Watcher(object):
             else:
                 self.notify_event("spawn", {"process_pid": process.pid,
                                             "time": process.started})
-                return process.started
-        return False
+                raise gen.Return(process.started)
+        raise gen.Return(False)
 
     @util.debuglog
     def send_signal_process(self, process, signum, recursive=False):
@@ -751,26 +941,55 @@ class Watcher(object):
             raise gen.Return(False)
 
         process.stopping = True
-        waited = 0
-        while waited < graceful_timeout:
-            if not process.is_alive():
-                break
-            yield tornado_sleep(0.1)
-            waited += 0.1
-        if waited >= graceful_timeout:
-            # On Windows we can't send a SIGKILL signal, but the
-            # process.stop function will terminate the process
-            # later anyway
-            if hasattr(signal, 'SIGKILL'):
-                # We are not smart anymore
-                self.send_signal_process(process, signal.SIGKILL,
-                                         recursive=True)
+        try:
+            yield self._wait_process_exit(process, graceful_timeout)
+            if process.is_alive():
+                # On Windows we can't send a SIGKILL signal, but the
+                # process.stop function will terminate the process
+                # later anyway
+                if hasattr(signal, 'SIGKILL'):
+                    # We are not smart anymore
+                    self.send_signal_process(process, signal.SIGKILL,
+                                             recursive=True)
+        finally:
+            # the exit is not waited for anymore, even if the SIGKILL failed
+            process.stopping = False
+            process.close_pidfd()
         if self.stream_redirector:
             self.stream_redirector.remove_redirections(process)
-        process.stopping = False
         process.stop()
         raise gen.Return(True)
 
+    @gen.coroutine
+    def _wait_process_exit(self, process, timeout):
+        """Wait until *process* exits, at most *timeout* seconds.
+
+        The exit is notified by the pidfd of the process when it has one,
+        and polled every 100ms otherwise.
+        """
+        pidfd = getattr(process, 'pidfd', None)
+        if pidfd is None:
+            waited = 0
+            while waited < timeout:
+                if not process.is_alive():
+                    break
+                yield tornado_sleep(0.1)
+                waited += 0.1
+            return
+
+        future = concurrent.Future()
+
+        def exited(*args):
+            if future.done():
+                return
+            self.loop.remove_handler(pidfd)
+            self.loop.remove_timeout(timer)
+            future.set_result(None)
+
+        self.loop.add_handler(pidfd, exited, self.loop.READ)
+        timer = self.loop.add_timeout(time.time() + timeout, exited)
+        yield future
+
     @gen.coroutine
     @util.debuglog
     def kill_processes(self, stop_signal=None, graceful_timeout=None):
@@ -865,12 +1084,14 @@ class Watcher(object):
             # We ignore the hook result
             self.call_hook('before_stop')
             yield self.kill_processes()
-            self.reap_processes()
+            yield self.reap_processes()
 
         # stop redirectors
         if self.stream_redirector:
             self.stream_redirector.stop()
             self.stream_redirector = None
+        if not skip:
+            self._retire_zygote()
         if close_output_streams:
             if self.stdout_stream and hasattr(self.stdout_stream, 'close'):
                 self.stdout_stream.close()
@@ -904,13 +1125,20 @@ class Watcher(object):
 
     @property
     def _nextwid(self):
-        used_wids = set([p.wid for p in self.processes.values()])
-        all_wids = set(range(1, self.numprocesses * 2 + 1))
-        available_wids = sorted(all_wids - used_wids)
-        try:
-            return available_wids[0]
-        except IndexError:
+        max_wid = self.numprocesses * 2
+        free_wids = self._free_wids
+        # the heap gets the new wids when numprocesses grows, and the wid
+        # of a process once it is removed. The wids used since they were
+        # pushed are dropped when they reach its top.
+        for wid in range(self._max_free_wid + 1, max_wid + 1):
+            heapq.heappush(free_wids, wid)
+        self._max_free_wid = max(self._max_free_wid, max_wid)
+
+        while free_wids and free_wids[0] in self._used_wids:
+            heapq.heappop(free_wids)
+        if not free_wids or free_wids[0] > max_wid:
             raise RuntimeError("Process count > numproceses*2")
+        return free_wids[0]
 
     def call_hook(self, hook_name, **kwargs):
         """Call a hook function"""
@@ -919,7 +1147,8 @@ class Watcher(object):
         hook_kwargs.update(kwargs)
         if hook_name in self.hooks:
             try:
-                result = self.hooks[hook_name](**hook_kwargs)
+                with profiler.timer('hook', self.name, hook_name):
+                    result = self.hooks[hook_name](**hook_kwargs)
                 self.notify_event("hook_success",
                                   {"name": hook_name, "time": time.time()})
             except Exception as error:
@@ -952,7 +1181,7 @@ class Watcher(object):
 
         if not self.is_stopped():
             if len(self.processes) < self.numprocesses:
-                self.reap_processes()
+                yield self.reap_processes()
                 yield self.spawn_processes()
             return
 
@@ -969,7 +1198,7 @@ class Watcher(object):
             self.stderr_stream.open()
 
         self._create_redirectors()
-        self.reap_processes()
+        yield self.reap_processes()
         yield self.spawn_processes()
 
         # If not self.processes, the before_spawn or after_spawn hooks have
@@ -1034,16 +1263,20 @@ class Watcher(object):
                 logger.info("SENDING HUP to %s" % process.pid)
                 process.send_signal(signal.SIGHUP)
         else:
+            # the new processes are forked from a zygote importing the
+            # modules again
+            self._retire_zygote()
+            yield self._start_zygote()
             if sequential:
                 active_processes = self.get_active_processes()
                 for process in active_processes:
                     yield self.kill_process(process)
-                    self.reap_process(process.pid)
-                    self.spawn_process()
+                    yield self.reap_process(process.pid)
+                    yield self.spawn_process()
                     yield tornado_sleep(self.warmup_delay)
             else:
                 for i in range(self.numprocesses):
-                    self.spawn_process()
+                    yield self.spawn_process()
                 yield self.manage_processes()
         self.notify_event("reload", {"time": time.time()})
         logger.info('%s reloaded', self.name)
@@ -1054,6 +1287,9 @@ class Watcher(object):
             np = 0
         if self.singleton and np > 1:
             raise ValueError('Singleton watcher has a single process')
+        if np != self.numprocesses:
+            # the arguments may use numprocesses
+            self._args_template = None
         self.numprocesses = np
         yield self.manage_processes()
         raise gen.Return(self.numprocesses)
@@ -1083,6 +1319,8 @@ class Watcher(object):
         - 1: trigger a graceful reload of the processes;
         """
         action = 0
+        # the arguments may use any option
+        self._args_template = None
 
         if key in self._options:
             self._options[key] = val
@@ -1096,6 +1334,8 @@ class Watcher(object):
             self.numprocesses = val
         elif key == "warmup_delay":
             self.warmup_delay = float(val)
+        elif key == "spawn_concurrency":
+            self.spawn_concurrency = max(1, int(val))
         elif key == "working_dir":
             self.working_dir = val
             action = 1
@@ -0,0 +1,413 @@
+"""Zygote of the watchers in zygote mode.
+
+The zygote is a python process started by circusd for a watcher. It imports
+the modules to preload once, then forks the processes of the watcher when
+circusd asks for them, so they share the memory of the preloaded modules
+and don't have to import them again.
+
+circusd and the zygote exchange json messages, one per line, over a unix
+socket. The file descriptors the processes need (sockets, stdin, the pipes
+of their stdout and stderr) are passed along with the messages.
+
+This module only depends on the standard library since it is run by the
+interpreter of the watcher.
+"""
+import argparse
+import array
+import atexit
+import errno
+import fcntl
+import json
+import os
+import runpy
+import select
+import signal
+import socket
+import sys
+import traceback
+try:
+    import resource
+except ImportError:
+    resource = None     # NOQA
+
+
+# the zygote mode needs to pass file descriptors between processes
+SUPPORTED = (hasattr(socket, 'AF_UNIX') and
+             hasattr(socket.socket, 'sendmsg'))
+
+# maximum number of file descriptors received at once
+MAX_FDS = 256
+
+# descriptors of the zygote itself, closed in the forked processes
+_PRIVATE_FDS = []
+
+
+class Channel(object):
+    """Exchanges json messages and file descriptors over a unix socket."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._buffer = b''
+        # file descriptors received but not attached to a message yet
+        self._fds = []
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def close(self):
+        for fd in self._fds:
+            os.close(fd)
+        self._fds = []
+        self.sock.close()
+
+    def send(self, message, fds=()):
+        message = dict(message, fds=len(fds))
+        data = json.dumps(message).encode('utf8') + b'\n'
+        ancdata = []
+        if fds:
+            ancdata.append((socket.SOL_SOCKET, socket.SCM_RIGHTS,
+                            array.array('i', fds).tobytes()))
+        # the descriptors are received no later than the first byte of the
+        # message, which is enough to attach them to it
+        sent = self.sock.sendmsg([data], ancdata)
+        if sent < len(data):
+            self.sock.sendall(data[sent:])
+
+    def _read(self):
+        itemsize = array.array('i').itemsize
+        data, ancdata, _, _ = self.sock.recvmsg(
+            65536, socket.CMSG_SPACE(MAX_FDS * itemsize))
+        for level, kind, cdata in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds = array.array('i')
+                fds.frombytes(cdata[:len(cdata) - len(cdata) % itemsize])
+                self._fds.extend(fds)
+        if not data:
+            raise EOFError()
+        self._buffer += data
+
+    def receive(self, block=True):
+        """Return the next message and its file descriptors.
+
+        If *block* is False, None is returned when no complete message is
+        waiting. EOFError is raised once the other side is closed.
+        """
+        while b'\n' not in self._buffer:
+            if not block and not select.select([self.sock], [], [], 0)[0]:
+                return None
+            self._read()
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        message = json.loads(line.decode('utf8'))
+        count = message.pop('fds', 0)
+        fds, self._fds = self._fds[:count], self._fds[count:]
+        return message, fds
+
+
+def run_python(args):
+    """Run *args*, the arguments given to a python interpreter, in the
+    current process. The options of the interpreter itself are ignored.
+    """
+    args = list(args)
+    while args and args[0].startswith('-') and args[0] not in ('-m', '-c'):
+        args.pop(0)
+    if not args:
+        raise ValueError('no script, module or command to run')
+
+    if args[0] == '-m':
+        sys.argv = args[1:]
+        runpy.run_module(args[1], run_name='__main__', alter_sys=True)
+    elif args[0] == '-c':
+        sys.argv = ['-c'] + args[2:]
+        code = compile(args[1], '<string>', 'exec')
+        exec(code, {'__name__': '__main__', '__builtins__': __builtins__})
+    else:
+        sys.argv = args
+        sys.path[0] = os.path.dirname(os.path.abspath(args[0]))
+        runpy.run_path(args[0], run_name='__main__')
+
+
+def _null_streams(fds):
+    devnull = os.open(os.devnull, os.O_RDWR)
+    try:
+        for fd in fds:
+            os.dup2(devnull, fd)
+    finally:
+        os.close(devnull)
+
+
+def _set_rlimits(rlimits):
+    for limit, value in rlimits.items():
+        res = getattr(resource, 'RLIMIT_%s' % limit.upper(), None)
+        if res is None:
+            raise ValueError('unknown rlimit "%s"' % limit)
+        try:
+            resource.setrlimit(res, (value, value))
+        except ValueError:
+            # same fallback as Process.spawn, see there
+            if res == resource.RLIMIT_NOFILE and \
+                    value == resource.RLIM_INFINITY:
+                _soft, value = resource.getrlimit(res)
+                resource.setrlimit(res, (value, value))
+            else:
+                raise
+
+
+def _move_above(fds, lowest):
+    moved = [fcntl.fcntl(fd, fcntl.F_DUPFD, lowest) for fd in fds]
+    for fd in fds:
+        os.close(fd)
+    return moved
+
+
+def _close_fds_but(keep):
+    keep = sorted(set(fd for fd in keep if fd > 2))
+    start = 3
+    for fd in keep:
+        os.closerange(start, fd)
+        start = fd + 1
+    os.closerange(start, _max_fd())
+
+
+def _max_fd():
+    if resource:
+        maxfd = resource.getrlimit(resource.RLIMIT_NOFILE)[1]
+        if maxfd != resource.RLIM_INFINITY:
+            return min(maxfd, 65536)
+    return 4096
+
+
+def _setup_child(request, fds, pipes, lowest):
+    """Set the forked process up the way Process.spawn does."""
+    targets = request['targets']
+    fds = _move_above(fds, lowest)
+    pipes = _move_above(pipes, lowest)
+
+    for name, target in (('pipe_stdout', 1), ('pipe_stderr', 2)):
+        if request[name]:
+            fd = pipes.pop(0)
+            os.dup2(fd, target)
+            os.close(fd)
+
+    os.chdir(request['working_dir'])
+    _null_streams([fd for fd, close in
+                   enumerate((request['close_child_stdin'],
+                              request['close_child_stdout'],
+                              request['close_child_stderr'])) if close])
+    os.setsid()
+
+    if resource:
+        _set_rlimits(request['rlimits'])
+
+    if request['gid']:
+        os.setgid(request['gid'])
+        if request['username'] is not None:
+            try:
+                os.initgroups(request['username'], request['gid'])
+            except (OSError, AttributeError):
+                pass
+    if request['uid']:
+        os.setuid(request['uid'])
+
+    # no exec follows, the copies are usable whatever their close-on-exec
+    # flag is
+    for fd, target in zip(fds, targets):
+        os.dup2(fd, target)
+        os.close(fd)
+
+    os.environ.clear()
+    os.environ.update(request['env'])
+
+
+def _run_child(request, fds, pipes, errpipe):
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    for fd in _PRIVATE_FDS:
+        os.close(fd)
+
+    # move the descriptors we need above the ones they are copied to
+    lowest = max(request['targets'] + [2]) + 1
+    errpipe, = _move_above([errpipe], lowest)
+    try:
+        _setup_child(request, fds, pipes, lowest)
+        if not request['use_fds']:
+            _close_fds_but([errpipe])
+    except Exception as e:
+        os.write(errpipe, ('%s: %s' % (e.__class__.__name__,
+                                       e)).encode('utf8'))
+        os._exit(1)
+    os.close(errpipe)
+
+    # the forked processes would generate the same numbers otherwise
+    if 'random' in sys.modules:
+        sys.modules['random'].seed()
+
+    code = 0
+    try:
+        run_python(request['args'])
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            sys.stderr.write('%s\n' % e.code)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    try:
+        atexit._run_exitfuncs()
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        os._exit(code)
+
+
+def spawn(request, fds):
+    """Fork a process for *request* and return its pid and the read ends of
+    its stdout and stderr pipes.
+    """
+    pipes, child_pipes = [], []
+    for name in ('pipe_stdout', 'pipe_stderr'):
+        if request[name]:
+            read, write = os.pipe()
+            pipes.append(read)
+            child_pipes.append(write)
+    errpipe_read, errpipe_write = os.pipe()
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        pid = os.fork()
+        if pid == 0:
+            # the forked process must never return to the zygote loop
+            try:
+                for fd in pipes + [errpipe_read]:
+                    os.close(fd)
+                _run_child(request, fds, child_pipes, errpipe_write)
+            finally:
+                os._exit(1)
+    except Exception:
+        for fd in pipes:
+            os.close(fd)
+        os.close(errpipe_read)
+        raise
+    finally:
+        for fd in child_pipes + [errpipe_write]:
+            os.close(fd)
+
+    # the child closes the error pipe once it is set up
+    error = b''
+    try:
+        while True:
+            data = os.read(errpipe_read, 4096)
+            if not data:
+                break
+            error += data
+    finally:
+        os.close(errpipe_read)
+
+    if error:
+        os.waitpid(pid, 0)
+        for fd in pipes:
+            os.close(fd)
+        raise OSError(error.decode('utf8', 'replace'))
+    return pid, pipes
+
+
+def _reap(channel):
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except OSError as e:
+            if e.errno == errno.ECHILD:
+                return
+            raise
+        if not pid:
+            return
+        channel.send({'exit': pid, 'status': status})
+
+
+def serve(channel):
+    """Fork the processes circusd asks for and report their exits, until
+    circusd closes the channel."""
+    wakeup_read, wakeup_write = os.pipe()
+    for fd in (wakeup_read, wakeup_write):
+        flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+        fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.set_wakeup_fd(wakeup_write)
+    _PRIVATE_FDS[:] = [channel.fileno(), wakeup_read, wakeup_write]
+
+    try:
+        while True:
+            try:
+                ready = select.select([channel, wakeup_read], [], [])[0]
+            except (select.error, OSError) as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+
+            if wakeup_read in ready:
+                try:
+                    while os.read(wakeup_read, 4096):
+                        pass
+                except OSError as e:
+                    if e.errno != errno.EAGAIN:
+                        raise
+            _reap(channel)
+
+            if channel not in ready:
+                continue
+            # several requests may have been read at once, circusd waits
+            # for the answers of all of them
+            while True:
+                try:
+                    received = channel.receive(block=False)
+                except EOFError:
+                    return
+                if received is None:
+                    break
+                _serve(channel, *received)
+    finally:
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        os.close(wakeup_read)
+        os.close(wakeup_write)
+
+
+def _serve(channel, message, fds):
+    try:
+        pid, pipes = spawn(message['spawn'], fds)
+    except Exception as e:
+        channel.send({'error': str(e)})
+    else:
+        channel.send({'pid': pid}, pipes)
+        for fd in pipes:
+            os.close(fd)
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Zygote of a watcher.')
+    parser.add_argument('--fd', type=int, required=True,
+                        help='file descriptor of the unix socket to circusd')
+    parser.add_argument('--preload', action='append', default=[],
+                        help='module to import before forking')
+    args = parser.parse_args(args)
+
+    sock = socket.fromfd(args.fd, socket.AF_UNIX, socket.SOCK_STREAM)
+    os.close(args.fd)
+    channel = Channel(sock)
+
+    for module in args.preload:
+        __import__(module)
+
+    channel.send({'ready': os.getpid()})
+    serve(channel)
+    channel.close()
@@ -0,0 +1,307 @@
+import collections
+import os
+import shlex
+import socket
+import subprocess
+import time
+
+import psutil
+from tornado import gen
+from tornado.concurrent import Future
+from zmq.eventloop import ioloop
+
+import circus
+from circus import logger, zygote
+from circus.process import Process, debuglog
+from circus.util import replace_gnu_args
+
+
+# how long circusd waits for the zygote to answer, in seconds
+ZYGOTE_TIMEOUT = 30.
+
+_BOOTSTRAP = ('import sys; sys.path.append(%r); '
+              'from circus.zygote import main; main()')
+
+
+def exit_code(status):
+    """Convert a waitpid status to a Popen returncode."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class Zygote(object):
+    """Starts and talks to the zygote of a watcher, see circus.zygote.
+
+    The zygote is run by the python interpreter of the watcher command,
+    in the watcher working directory and environment.
+    """
+    def __init__(self, watcher):
+        self.watcher = watcher
+        self.loop = watcher.loop
+        # pid -> ZygoteProcess of the processes still running
+        self.processes = {}
+        self.retired = False
+        self.closed = False
+        self.ready = Future()
+        # (future, process) of the spawn requests waiting for an answer, the
+        # zygote answers them in order
+        self._spawns = collections.deque()
+
+        cmd = replace_gnu_args(watcher.cmd, env=watcher.env)
+        python = watcher.executable or shlex.split(cmd)[0]
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        path = os.path.dirname(os.path.dirname(circus.__file__))
+        args = [python, '-c', _BOOTSTRAP % path, '--fd', str(child.fileno())]
+        for module in watcher.zygote_preload:
+            args += ['--preload', module]
+        try:
+            self._process = subprocess.Popen(
+                args, cwd=watcher.working_dir, env=watcher.env,
+                pass_fds=[child.fileno()], start_new_session=True)
+        except Exception:
+            parent.close()
+            raise
+        finally:
+            child.close()
+
+        logger.debug('zygote of %s started [pid %d]', watcher.name,
+                     self._process.pid)
+        self.channel = zygote.Channel(parent)
+        self.loop.add_handler(self.channel.fileno(), self._handle_events,
+                              ioloop.IOLoop.READ)
+
+    @property
+    def pid(self):
+        return self._process.pid
+
+    def _handle_events(self, fd, events):
+        self.poll()
+
+    def poll(self):
+        """Handle the messages waiting, without blocking."""
+        while not self.closed:
+            try:
+                received = self.channel.receive(block=False)
+            except (EOFError, socket.error):
+                self._closed()
+                return
+            if received is None:
+                return
+            self._dispatch(*received)
+
+    def _dispatch(self, message, fds):
+        if 'pid' in message:
+            spawned, process = self._spawns.popleft()
+            self.processes[message['pid']] = process
+            spawned.set_result((message['pid'], fds))
+            return
+
+        for fd in fds:
+            os.close(fd)
+        if 'error' in message:
+            spawned, process = self._spawns.popleft()
+            spawned.set_exception(OSError(message['error']))
+        elif 'ready' in message:
+            logger.debug('zygote of %s is ready', self.watcher.name)
+            self.ready.set_result(True)
+        elif 'exit' in message:
+            process = self.processes.pop(message['exit'], None)
+            if process is not None:
+                process.exit_status = message['status']
+                process.exited.set_result(message['status'])
+                if not self.watcher.is_stopped():
+                    self.loop.add_callback(self.watcher.reap_process,
+                                           process.pid, message['status'])
+            if self.retired and not self.processes:
+                self.stop()
+
+    def _closed(self, error=None):
+        if self.closed:
+            return
+        self.closed = True
+        self.loop.remove_handler(self.channel.fileno())
+        self.channel.close()
+        if error is None:
+            error = 'the zygote of %s exited' % self.watcher.name
+        if not self.ready.done():
+            self.ready.set_exception(OSError(error))
+        while self._spawns:
+            spawned, process = self._spawns.popleft()
+            spawned.set_exception(OSError(error))
+        if self.processes:
+            logger.warning('zygote of %s exited, %d processes left over',
+                           self.watcher.name, len(self.processes))
+            # nobody can report their exit anymore
+            for process in self.processes.values():
+                process.exited.set_result(None)
+
+    @gen.coroutine
+    def spawn(self, process, request, fds):
+        """Fork a process for *request*, passing it *fds*.
+
+        Return a future of its pid and the read ends of its stdout and
+        stderr pipes. The answer of the zygote is read by the loop.
+        """
+        if self.closed:
+            raise OSError('the zygote of %s exited' % self.watcher.name)
+        yield self.ready
+
+        spawned = Future()
+        self._spawns.append((spawned, process))
+        self.channel.send({'spawn': request}, fds)
+        timeout = self.loop.add_timeout(time.time() + ZYGOTE_TIMEOUT,
+                                        self._timed_out)
+        try:
+            res = yield spawned
+        finally:
+            self.loop.remove_timeout(timeout)
+        raise gen.Return(res)
+
+    def _timed_out(self):
+        # its answers can't be matched with the requests anymore
+        self._closed('the zygote of %s did not answer' % self.watcher.name)
+        self.stop()
+
+    def retire(self):
+        """Stop the zygote once its processes have exited.
+
+        Used when new processes must not be forked from it anymore, for
+        example when the watcher is reloaded.
+        """
+        self.retired = True
+        if not self.processes:
+            self.stop()
+
+    def stop(self):
+        # the zygote exits when circusd closes its end of the channel
+        self._closed()
+        self._reap(time.time() + 1)
+
+    def _reap(self, deadline):
+        # polled from the loop, killed if still running after a second
+        if self._process.poll() is not None:
+            return
+        if deadline is not None and time.time() >= deadline:
+            self._process.kill()
+            deadline = None
+        self.loop.add_timeout(time.time() + 0.1, self._reap, deadline)
+
+
+class ZygoteProcessWorker(psutil.Process):
+    # noinspection PyMissingConstructor
+    def __init__(self, proxy, pid, stdout, stderr):
+        try:
+            self._init(pid, _ignore_nsp=True)
+        except AttributeError:
+            raise NotImplementedError(
+                'ZygoteProcessWorker requires psutil 2.0.0 or higher. '
+                'You probably have 1.x installed.')
+        self._proxy = proxy
+        self.stdout = stdout
+        self.stderr = stderr
+
+    def wait(self, timeout=None):
+        return self._proxy.wait(timeout)
+
+
+class ZygoteProcess(Process):
+    """A process forked by the zygote of its watcher instead of being run
+    by circusd.
+
+    The command must run a python script, module or code. The options of
+    the interpreter are ignored, and the command can't be run in a shell.
+    """
+    def __init__(self, *args, **kwargs):
+        self.zygote = None
+        # done once the zygote forked the process, see spawn()
+        self.spawned = None
+        # waitpid status, reported by the zygote once the process exited
+        self.exit_status = None
+        self.exited = Future()
+        super(ZygoteProcess, self).__init__(*args, **kwargs)
+
+    def spawn(self):
+        """Ask the zygote to fork the process.
+
+        The process is forked without blocking the loop: its pid is known
+        once the future :attr:`spawned` is done.
+        """
+        self.started = time.time()
+        sockets_fds = self._get_sockets_fds()
+        args = self.format_args(sockets_fds=sockets_fds)
+
+        fds, targets = [], []
+        stdin_socket_fd = self._get_stdin_socket_fd()
+        if stdin_socket_fd is not None:
+            fds.append(stdin_socket_fd)
+            targets.append(0)
+        if self.use_fds and sockets_fds:
+            for fd in sorted(set(sockets_fds.values())):
+                fds.append(fd)
+                targets.append(fd)
+
+        request = {'args': args[1:], 'env': self.env,
+                   'working_dir': self.working_dir, 'uid': self.uid,
+                   'gid': self.gid, 'username': self.username,
+                   'rlimits': self.rlimits, 'use_fds': self.use_fds,
+                   'targets': targets, 'pipe_stdout': self.pipe_stdout,
+                   'pipe_stderr': self.pipe_stderr,
+                   'close_child_stdin': self.close_child_stdin,
+                   'close_child_stdout': self.close_child_stdout,
+                   'close_child_stderr': self.close_child_stderr}
+
+        self.spawned = self._spawn(request, fds)
+
+    @gen.coroutine
+    def _spawn(self, request, fds):
+        self.zygote = self.watcher.get_zygote()
+        try:
+            pid, pipes = yield self.zygote.spawn(self, request, fds)
+        finally:
+            # let go of sockets created only for the process to inherit
+            self._sockets = []
+
+        stdout = stderr = None
+        if self.pipe_stdout:
+            stdout = os.fdopen(pipes.pop(0), 'rb', 0)
+        if self.pipe_stderr:
+            stderr = os.fdopen(pipes.pop(0), 'rb', 0)
+        self._worker = ZygoteProcessWorker(self, pid, stdout, stderr)
+
+    def returncode(self):
+        if self.exit_status is None:
+            return None
+        return exit_code(self.exit_status)
+
+    @debuglog
+    def poll(self):
+        if self.exit_status is None:
+            self.zygote.poll()
+        return self.returncode()
+
+    @gen.coroutine
+    def wait(self, timeout=None):
+        """Wait for the process to exit, without blocking the loop.
+
+        Return a future of its returncode, None if its zygote exited before
+        reporting it.
+        """
+        waiter = self.exited
+        if timeout is not None and not waiter.done():
+            loop = self.zygote.loop
+            waiter = Future()
+
+            def done(*args):
+                if not waiter.done():
+                    waiter.set_result(None)
+
+            loop.add_future(self.exited, done)
+            timer = loop.add_timeout(time.time() + timeout, done)
+            yield waiter
+            loop.remove_timeout(timer)
+            if not self.exited.done():
+                raise psutil.TimeoutExpired(timeout, self.pid)
+        else:
+            yield waiter
+        raise gen.Return(self.returncode())